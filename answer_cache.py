@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+
+class AnswerCache:
+    """Semantic cache of answers to first-turn questions.
+    Questions are embedded and kept in a small in-memory FAISS index (inner product over
+    normalized vectors, i.e. cosine similarity); a new question whose similarity to a cached
+    one is at least `threshold` gets the cached answer. Entries expire after `ttl` seconds,
+    and at most `max_entries` are kept (the least recently used one is dropped first)."""
+
+    def __init__(self, embeddings=None, threshold: float = 0.92, ttl: float = 24 * 3600,
+                 max_entries: int = 1000, k: int = 4):
+        self._embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.k = k
+        self._index = None
+        # FAISS id -> (question, answer, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            # imported here: langchain_openai/openai dominate the import time of this module
+            from langchain_openai import OpenAIEmbeddings
+            self._embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+        return self._embeddings
+
+    def embed(self, question: str) -> np.ndarray:
+        """normalized embedding of a question, as a (1, dim) float32 array"""
+        vector = np.array([self.embeddings.embed_query(question)], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _remove(self, ids: list):
+        for i in ids:
+            del self._entries[i]
+        if ids:
+            self._index.remove_ids(np.array(ids, dtype=np.int64))
+
+    def lookup(self, vector: np.ndarray):
+        """cached answer for the question with this embedding, or None"""
+        now = time.time()
+        with self._lock:
+            if not self._entries:
+                return None
+            scores, ids = self._index.search(vector, min(self.k, len(self._entries)))
+            expired, answer = [], None
+            for score, i in zip(scores[0], ids[0]):
+                i = int(i)
+                if i < 0:
+                    continue
+                if self._entries[i][2] <= now:
+                    expired.append(i)
+                elif answer is None and score >= self.threshold:
+                    answer = self._entries[i][1]
+                    self._entries.move_to_end(i)
+            self._remove(expired)
+            return answer
+
+    def store(self, vector: np.ndarray, question: str, answer: str):
+        now = time.time()
+        with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            self._index.add_with_ids(vector, np.array([self._next_id], dtype=np.int64))
+            self._entries[self._next_id] = (question, answer, now + self.ttl)
+            self._next_id += 1
+            # drop the least recently used entries over the limit, and expired ones
+            dropped = [i for i, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+            excess = len(self._entries) - len(dropped) - self.max_entries
+            if excess > 0:
+                expired = set(dropped)
+                dropped += [i for i in self._entries if i not in expired][:excess]
+            self._remove(dropped)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._index is not None:
+                self._index.reset()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,173 @@
+"""
+Offline end-to-end chat benchmark: chat turns through the Gradio handler (LangGraph app,
+call_model, tools, summaries) with fake OpenAI and Jina backends, a local Neshan HTTP stub
+and a fake embedder for the local knowledge search. No API keys or network needed.
+
+    python benchmarks/bench_chat.py [--turns 200] [--concurrency 16] [--mix answer=4,search=3,map=2,both=1]
+                                    [--distinct 0] [--first-token 0.3] [--jina-delay 0.8] [--sync]
+
+Reports latency percentiles per stage and end to end, and throughput. --distinct N repeats
+N questions (0: every question is new) to show the effect of the caches.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from offline import (PLACES, FakeChatModel, FakeEmbeddings, FakeJina, NeshanStub, Stats, offline_environment,
+                     words)
+
+STAGES = ("end to end", "first update", "history trim", "model call", "tools (all of a turn)", "tool jina_search",
+          "local knowledge", "web search", "result summaries", "tool geocode_address")
+
+# tool calls the fake model makes for each kind of question
+KINDS = {
+    "answer": lambda q: [],
+    "search": lambda q: [("jina_search", {"query": q})],
+    "map": lambda q: [("geocode_address", {"input": {"address": q}})],
+    "both": lambda q: [("jina_search", {"query": q}), ("geocode_address", {"input": {"address": q}})],
+}
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in KINDS:
+            raise SystemExit(f"unknown question kind {kind!r}, expected one of {', '.join(KINDS)}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def make_questions(turns: int, mix: dict, distinct: int, seed: int = 1) -> list:
+    """(question, kind) per turn"""
+    rng = random.Random(seed)
+    pool = distinct or turns
+    unique = []
+    for i in range(pool):
+        kind = rng.choices(list(mix), weights=list(mix.values()))[0]
+        unique.append((f"{kind} {rng.choice(PLACES)} {words(str(i), 6)} {i}", kind))
+    return [unique[i % pool] for i in range(turns)]
+
+
+def instrument(main, stats: Stats):
+    """patches that time the stages of a turn"""
+    patches = [
+        patch.object(main, "stream_model", stats.wrap("model call", main.stream_model)),
+        patch.object(main, "astream_model", stats.wrap("model call", main.astream_model)),
+        patch.object(main, "execute_tool_calls", stats.wrap("tools (all of a turn)", main.execute_tool_calls)),
+        patch.object(main, "lookup_knowledge", stats.wrap("local knowledge", main.lookup_knowledge)),
+        patch.object(main, "search_web", stats.wrap("web search", main.search_web)),
+        patch.object(main, "summarize_results", stats.wrap("result summaries", main.summarize_results)),
+        patch.object(main.history, "trim", stats.wrap("history trim", main.history.trim)),
+        patch.dict(main.TOOL_HANDLERS, {name: stats.wrap(f"tool {name}", handler)
+                                        for name, handler in main.TOOL_HANDLERS.items()}),
+    ]
+    return patches
+
+
+async def run_async(main, questions, concurrency, stats):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def turn(i, question):
+        async with semaphore:
+            start = time.perf_counter()
+            first, reply = None, ""
+            async for reply in main.achat_with_bot(question, [], SimpleNamespace(session_hash=f"bench-{i}")):
+                if first is None:
+                    first = time.perf_counter() - start
+            stats.add("first update", first)
+            stats.add("end to end", time.perf_counter() - start)
+            return reply
+
+    return await asyncio.gather(*(turn(i, q) for i, (q, _) in enumerate(questions)))
+
+
+def run_sync(main, questions, concurrency, stats):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def turn(i, question):
+        start = time.perf_counter()
+        reply = main.chat_with_bot(question, [], SimpleNamespace(session_hash=f"bench-{i}"))
+        stats.add("end to end", time.perf_counter() - start)
+        return reply
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(turn, range(len(questions)), [q for q, _ in questions]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline end-to-end chat benchmark")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default="answer=4,search=3,map=2,both=1")
+    parser.add_argument("--distinct", type=int, default=0, help="number of distinct questions (0: all distinct)")
+    parser.add_argument("--first-token", type=float, default=0.3, help="chat model latency to the first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="chat model delay between tokens (s)")
+    parser.add_argument("--tokens", type=int, default=60, help="tokens per answer")
+    parser.add_argument("--nano-latency", type=float, default=0.4, help="nano_model summary latency (s)")
+    parser.add_argument("--jina-delay", type=float, default=0.8, help="Jina search latency (s)")
+    parser.add_argument("--neshan-delay", type=float, default=0.15, help="Neshan stub latency (s)")
+    parser.add_argument("--embed-delay", type=float, default=0.05, help="embedding request latency (s)")
+    parser.add_argument("--semantic-cache", action="store_true", help="enable the semantic answer cache")
+    parser.add_argument("--sync", action="store_true", help="use the sync handler (app.invoke) in threads")
+    parser.add_argument("--verbose", action="store_true", help="show the application's own output")
+    args = parser.parse_args()
+
+    questions = make_questions(args.turns, parse_mix(args.mix), args.distinct)
+    devnull = open(os.devnull, "w")
+    quiet = contextlib.nullcontext if args.verbose else lambda: contextlib.redirect_stdout(devnull)
+    with tempfile.TemporaryDirectory() as tmp, NeshanStub(args.neshan_delay) as neshan:
+        offline_environment()
+        os.environ["NESHAN_GEOCODING_URL"] = neshan.url
+        import knowledge
+        import main as chat
+        from answer_cache import AnswerCache
+        from files import FAISSManager
+
+        plans = dict(questions)
+        model = FakeChatModel(args.first_token, args.token_delay, args.tokens,
+                              tool_calls=lambda q: KINDS[plans[q]](q) if q in plans else [])
+        nano = FakeChatModel(args.nano_latency, 0.0, 40)
+        embeddings = FakeEmbeddings(delay=args.embed_delay)
+        guides = FAISSManager(db_dir=os.path.join(tmp, "db"), embeddings=embeddings, cache_embeddings=False)
+        with quiet():
+            guides.add_document(raw_text="\n".join(f"# {place}\n{words(place, 80)}" for place in PLACES))
+        answers = AnswerCache(embeddings) if args.semantic_cache else None
+
+        stats = Stats(STAGES)
+        with patch.object(chat, "model_with_tools", model), patch.object(chat, "nano_model", nano), \
+                patch.object(chat, "jina_tool", FakeJina(args.jina_delay)), \
+                patch.object(chat, "answer_cache", answers), patch.object(knowledge, "_knowledge_base", guides):
+            patches = instrument(chat, stats)
+            for p in patches:
+                p.start()
+            try:
+                with quiet():
+                    start = time.perf_counter()
+                    if args.sync:
+                        replies = run_sync(chat, questions, args.concurrency, stats)
+                    else:
+                        replies = asyncio.run(run_async(chat, questions, args.concurrency, stats))
+                    wall = time.perf_counter() - start
+            finally:
+                for p in reversed(patches):
+                    p.stop()
+
+        errors = sum(1 for reply in replies if not reply or reply.startswith("⚠️"))
+        mode = "sync" if args.sync else "async"
+        stats.report(f"{args.turns} turns ({mode}, concurrency {args.concurrency}, mix {args.mix}), "
+                     f"{errors} errors, {neshan.requests} Neshan requests")
+        print(f"  throughput: {args.turns / wall:.1f} turns/s ({wall:.2f} s wall)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+DOCX conversion benchmark: fast single-pass mode (utils/docx2text.py) vs the
+mammoth -> HTML -> markdownify fidelity mode (utils/docx2md.py).
+
+    python benchmarks/bench_docx.py [--sections 2000] [--runs 3] [files.docx ...]
+
+Without files, a large synthetic Persian DOCX (headings, paragraphs, lists, tables) is generated.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.docx2md import docx_to_markdown
+from utils.docx2text import docx_to_text
+
+NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+PKG = "http://schemas.openxmlformats.org/package/2006"
+REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+SENTENCE = "شهر اصفهان با میدان نقش جهان، سی‌وسه‌پل و کاخ چهلستون یکی از مقصدهای اصلی گردشگری ایران است."
+
+
+def _p(text, style=None, num_id=None):
+    ppr = f'<w:pStyle w:val="{style}"/>' if style else ""
+    ppr += f'<w:numPr><w:ilvl w:val="0"/><w:numId w:val="{num_id}"/></w:numPr>' if num_id else ""
+    return f'<w:p><w:pPr>{ppr}</w:pPr><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def make_large_docx(path, sections):
+    body = []
+    for i in range(sections):
+        body.append(_p(f"بخش {i}", style="Heading1"))
+        body.append(_p(f"مقدمه {i}", style="Heading2"))
+        body.extend(_p(SENTENCE * 3) for _ in range(4))
+        body.extend(_p(f"مورد {j}", num_id=1) for j in range(3))
+        rows = "".join(
+            "<w:tr>" + "".join(f"<w:tc>{_p(f'خانه {r}-{c}')}</w:tc>" for c in range(3)) + "</w:tr>"
+            for r in range(4)
+        )
+        body.append(f"<w:tbl>{rows}</w:tbl>")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", (
+            f'<Types xmlns="{PKG}/content-types">'
+            f'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>'
+        ))
+        docx.writestr("_rels/.rels", (
+            f'<Relationships xmlns="{PKG}/relationships">'
+            f'<Relationship Id="rId1" Type="{REL}/officeDocument" Target="word/document.xml"/></Relationships>'
+        ))
+        docx.writestr("word/_rels/document.xml.rels", (
+            f'<Relationships xmlns="{PKG}/relationships">'
+            f'<Relationship Id="rId1" Type="{REL}/styles" Target="styles.xml"/>'
+            f'<Relationship Id="rId2" Type="{REL}/numbering" Target="numbering.xml"/></Relationships>'
+        ))
+        docx.writestr("word/styles.xml", (
+            f'<w:styles {NS}>'
+            '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/></w:style>'
+            '<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/></w:style></w:styles>'
+        ))
+        docx.writestr("word/numbering.xml", (
+            f'<w:numbering {NS}><w:abstractNum w:abstractNumId="0"><w:lvl w:ilvl="0"><w:numFmt w:val="bullet"/>'
+            '</w:lvl></w:abstractNum><w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num></w:numbering>'
+        ))
+        docx.writestr("word/document.xml", f'<w:document {NS}><w:body>{"".join(body)}</w:body></w:document>')
+    return path
+
+
+def measure(convert, path, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = convert(path)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    convert(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak, len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare DOCX conversion modes")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--sections", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    files = args.files
+    if not files:
+        tmp = tempfile.mkdtemp()
+        files = [make_large_docx(os.path.join(tmp, "large_fa.docx"), args.sections)]
+
+    for path in files:
+        print(f"{os.path.basename(path)} ({os.path.getsize(path) / 1e3:.0f} KB compressed)")
+        for mode, convert in (("fast", docx_to_text), ("fidelity", docx_to_markdown)):
+            seconds, peak, chars = measure(convert, path, args.runs)
+            print(f"  {mode:<9} median {seconds * 1000:8.1f} ms   peak memory {peak / 1e6:7.1f} MB   {chars} chars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+HTML extraction benchmark: streaming event parser (utils/html2text.py) vs the
+BeautifulSoup get_text fidelity mode of HtmlLoader.
+
+    python benchmarks/bench_html.py [--sections 2000] [--runs 3] [pages.html ...]
+
+Without files, a large synthetic Persian tourism page (scripts, menus, headings, tables) is generated.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.loaders.html_loader import HtmlLoader
+
+SENTENCE = "شهر اصفهان با میدان نقش جهان، سی‌وسه‌پل و کاخ چهلستون یکی از مقصدهای اصلی گردشگری ایران است."
+
+
+def make_large_page(path, sections):
+    parts = ["<html><head><title>راهنمای سفر</title><style>body { margin: 0 }</style></head><body>"]
+    for i in range(sections):
+        parts.append(f"<script>window.dataLayer.push({{section: {i}, html: '<div>{SENTENCE}</div>'}});</script>")
+        parts.append(f"<nav><ul><li><a href='/a'>خانه</a></li><li><a href='/b'>شهرها</a></li></ul></nav>")
+        parts.append(f"<h2>بخش {i}</h2><div class='content'>")
+        parts.extend(f"<p><span>{SENTENCE}</span> <b>{j}</b></p>" for j in range(4))
+        parts.append("<table>" + "".join(
+            f"<tr><td>خانه {r}-1</td><td>خانه {r}-2</td><td>{r}</td></tr>" for r in range(4)
+        ) + "</table></div><noscript>javascript لازم است</noscript>")
+    parts.append("</body></html>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(parts))
+    return path
+
+
+def measure(loader, path, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = loader.load(path=path)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    loader.load(path=path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak, len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare HTML extraction modes")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--sections", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    files = args.files
+    if not files:
+        tmp = tempfile.mkdtemp()
+        files = [make_large_page(os.path.join(tmp, "large_fa.html"), args.sections)]
+
+    for path in files:
+        print(f"{os.path.basename(path)} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        for mode in ("fast", "fidelity"):
+            seconds, peak, chars = measure(HtmlLoader(mode=mode), path, args.runs)
+            print(f"  {mode:<9} median {seconds * 1000:8.1f} ms   peak memory {peak / 1e6:7.1f} MB   {chars} chars")
+
+
+if __name__ == "__main__":
+    main()
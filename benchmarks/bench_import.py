@@ -0,0 +1,50 @@
+"""
+Startup benchmark: wall time of `import utils.input_adapter` and `import files`
+in fresh interpreters, and which heavy third-party modules each import pulls in.
+
+    python benchmarks/bench_import.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MODULES = ["utils.input_adapter", "files"]
+HEAVY = ["mammoth", "markdownify", "bs4", "pypdf", "openai", "langchain_openai", "faiss"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="measure module import times")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in MODULES:
+        results = [measure(module) for _ in range(args.runs)]
+        times = [r["seconds"] * 1000 for r in results]
+        print(f"import {module}: median {statistics.median(times):.1f} ms "
+              f"(min {min(times):.1f}, max {max(times):.1f}, {args.runs} runs)")
+        print(f"  heavy modules loaded: {', '.join(results[-1]['loaded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Offline ingestion and retrieval benchmark: DocumentPipeline.run, FAISSManager.add_document,
+FAISSManager.ingest and search latency, with a fake embedder that waits --embed-delay seconds
+per embeddings request. No API keys or network needed.
+
+    python benchmarks/bench_ingest.py [--files 20] [--lines 2000] [--queries 500] [--embed-delay 0.05]
+
+Synthetic Persian guides (same generator as bench_text_processing.py) are written to a
+temporary directory. Reports latency percentiles per stage and throughput.
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_text_processing import CORPORA, make_corpus
+from offline import PLACES, FakeEmbeddings, Stats, offline_environment, words
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline ingestion and retrieval benchmark")
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=2000, help="lines per file")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--embed-delay", type=float, default=0.05, help="embedding request latency (s)")
+    parser.add_argument("--workers", type=int, default=None, help="parse processes of FAISSManager.ingest")
+    parser.add_argument("--verbose", action="store_true", help="show the application's own output")
+    args = parser.parse_args()
+
+    offline_environment()
+    from files import DocumentPipeline, FAISSManager
+
+    devnull = open(os.devnull, "w")
+    quiet = contextlib.nullcontext if args.verbose else lambda: contextlib.redirect_stdout(devnull)
+    stats = Stats(("pipeline run", "add_document", "ingest (all files)", "search", "search (one file)"))
+    with tempfile.TemporaryDirectory() as tmp:
+        paths, mixes = [], list(CORPORA.values())
+        for i in range(args.files):
+            path = os.path.join(tmp, f"guide_{i}.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(make_corpus(mixes[i % len(mixes)], args.lines, seed=i))
+            paths.append(path)
+
+        chunks = 0
+        for path in paths:
+            with stats.timed("pipeline run"):
+                chunks += len(DocumentPipeline(path).run()[0])
+
+        embeddings = FakeEmbeddings(delay=args.embed_delay)
+        one_by_one = FAISSManager(db_dir=os.path.join(tmp, "db_add"), embeddings=embeddings, cache_embeddings=False)
+        start = time.perf_counter()
+        with quiet():
+            for path in paths:
+                with stats.timed("add_document"):
+                    one_by_one.add_document(file_path=path)
+        add_seconds = time.perf_counter() - start
+
+        bulk = FAISSManager(db_dir=os.path.join(tmp, "db_ingest"), embeddings=embeddings, cache_embeddings=False)
+        with quiet(), stats.timed("ingest (all files)"):
+            report = bulk.ingest(paths, workers=args.workers)
+        ingest_seconds = stats.samples["ingest (all files)"][0]
+        failed = [entry for entry in report if entry["status"] != "added"]
+
+        rng = random.Random(1)
+        filenames = [os.path.basename(path) for path in paths]
+        start = time.perf_counter()
+        for i in range(args.queries):
+            query = f"{rng.choice(PLACES)} {words(str(i), 5)}"
+            with stats.timed("search"):
+                bulk.search_with_scores(query, k=4)
+        search_seconds = time.perf_counter() - start
+        for i in range(args.queries):
+            with stats.timed("search (one file)"):
+                bulk.search_with_scores(words(str(i), 5), k=4, filename=rng.choice(filenames))
+
+    stats.report(f"{args.files} files x {args.lines} lines, {chunks} chunks, embed delay {args.embed_delay * 1000:.0f} ms"
+                 + (f", {len(failed)} files not added" if failed else ""))
+    print(f"  add_document throughput: {chunks / add_seconds:.0f} chunks/s")
+    print(f"  ingest throughput:       {chunks / ingest_seconds:.0f} chunks/s")
+    print(f"  search throughput:       {args.queries / search_seconds:.0f} queries/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Deterministic local stand-ins for the external services, shared by the offline benchmarks:
+a fake chat model with configurable latency and tool calls, a fake JinaSearch, a local HTTP
+stub for the Neshan geocoding API and a fake embedder, plus latency statistics.
+
+Call `offline_environment()` (and set NESHAN_GEOCODING_URL to a stub's `url`) before
+importing main or map: their API keys and caches are read at import time.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+
+PLACES = ("اصفهان", "شیراز", "یزد", "کاشان", "تبریز", "مشهد", "کرمان", "همدان")
+WORDS = ("میدان نقش جهان کاخ چهلستون باغ ارم حافظیه تخت جمشید بازار مسجد امام پل خواجو "
+         "بازدید بلیت هتل رستوران سفر فصل بهار").split()
+
+
+def offline_environment(cache_dir: str = ""):
+    """settings that keep main/map/knowledge away from the network and from ./db"""
+    for key in ("OPENAI_API_KEY", "JINA_API_KEY", "NESHAN_API_KEY"):
+        os.environ.setdefault(key, "offline")
+    # the Neshan stub listens on localhost: never route it through a proxy
+    os.environ["NO_PROXY"] = os.environ["no_proxy"] = "127.0.0.1,localhost"
+    # an empty path keeps a TTLCache in memory only
+    for key in ("GEOCODE_CACHE_PATH", "SEARCH_CACHE_PATH", "SUMMARY_CACHE_PATH"):
+        os.environ[key] = os.path.join(cache_dir, key.lower() + ".sqlite") if cache_dir else ""
+
+
+def words(seed: str, n: int) -> str:
+    """n deterministic words derived from seed"""
+    digest = hashlib.sha256(seed.encode("utf-8")).digest()
+    return " ".join(WORDS[digest[i % len(digest)] % len(WORDS)] for i in range(n))
+
+
+class FakeChatModel:
+    """Stands in for ChatOpenAI (and its bind_tools result).
+    A reply waits `first_token` seconds and then streams `tokens` words `token_delay` seconds
+    apart. `tool_calls(question)` returns the tool calls (name, args) the model makes for a
+    question before answering; the second call of a turn (after the tool results) answers."""
+
+    def __init__(self, first_token: float = 0.3, token_delay: float = 0.01, tokens: int = 60, tool_calls=None):
+        self.first_token = first_token
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.tool_calls = tool_calls or (lambda question: [])
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def bind_tools(self, tools):
+        return self
+
+    def _plan(self, messages):
+        """(tool call chunk or None, answer words) for the next reply"""
+        last = messages[-1]
+        if isinstance(last, HumanMessage):
+            calls = self.tool_calls(last.content)
+            if calls:
+                with self._lock:
+                    self._ids += 1
+                    base = self._ids
+                return AIMessageChunk(content="", tool_call_chunks=[
+                    {"name": name, "args": json.dumps(args, ensure_ascii=False), "id": f"call_{base}_{i}", "index": i}
+                    for i, (name, args) in enumerate(calls)
+                ]), []
+        question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        return None, [w + " " for w in words(question, self.tokens).split()]
+
+    def stream(self, messages):
+        tool_chunk, answer = self._plan(messages)
+        time.sleep(self.first_token)
+        if tool_chunk is not None:
+            yield tool_chunk
+        for i, token in enumerate(answer):
+            if i:
+                time.sleep(self.token_delay)
+            yield AIMessageChunk(content=token)
+
+    async def astream(self, messages):
+        tool_chunk, answer = self._plan(messages)
+        await asyncio.sleep(self.first_token)
+        if tool_chunk is not None:
+            yield tool_chunk
+        for i, token in enumerate(answer):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield AIMessageChunk(content=token)
+
+    def invoke(self, messages):
+        """non-streaming reply (nano_model summaries)"""
+        time.sleep(self.first_token + self.token_delay * self.tokens)
+        return AIMessage(content=words(messages[-1].content, self.tokens))
+
+
+class FakeJina:
+    """Stands in for JinaSearch: `results` fixture results per query after `delay` seconds.
+    Result content depends on the query, so different queries return different pages."""
+
+    name = "jina_search"
+
+    def __init__(self, delay: float = 0.8, results: int = 5):
+        self.delay = delay
+        self.results = results
+
+    def invoke(self, query: str) -> str:
+        time.sleep(self.delay)
+        return json.dumps([
+            {"title": f"{query} {i}", "link": f"https://example.com/{i}", "content": words(f"{query}/{i}", 300)}
+            for i in range(self.results)
+        ], ensure_ascii=False)
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic unit vectors derived from the text hash, after `delay` seconds per call
+    (one embeddings API request)."""
+
+    def __init__(self, size: int = 256, delay: float = 0.0):
+        self.size = size
+        self.delay = delay
+
+    def _vector(self, text: str) -> list:
+        import numpy as np
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.size)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.delay)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        time.sleep(self.delay)
+        return self._vector(text)
+
+
+class NeshanStub:
+    """Local HTTP server answering Neshan geocoding requests after `delay` seconds.
+    Addresses containing "ناموجود" are not found. Use as a context manager; `url` is the
+    geocoding endpoint to set as NESHAN_GEOCODING_URL."""
+
+    def __init__(self, delay: float = 0.15):
+        self.delay = delay
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.delay)
+                address = parse_qs(urlparse(self.path).query).get("address", [""])[0]
+                if "ناموجود" in address:
+                    body = {}
+                else:
+                    digest = hashlib.sha256(address.encode("utf-8")).digest()
+                    body = {"status": "OK", "location": {"x": 44 + digest[0] / 16, "y": 25 + digest[1] / 16}}
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v6/geocoding"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Stats:
+    """latency samples per stage, reported as percentiles (in the order of `stages`, then
+    in the order stages were first seen)"""
+
+    def __init__(self, stages=()):
+        self.samples = defaultdict(list)
+        for stage in stages:
+            self.samples[stage] = []
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    @contextmanager
+    def timed(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def wrap(self, stage: str, fn):
+        """fn, recording the duration of every call under stage"""
+        if asyncio.iscoroutinefunction(fn):
+            async def timed_async(*args, **kwargs):
+                with self.timed(stage):
+                    return await fn(*args, **kwargs)
+            return timed_async
+
+        def timed(*args, **kwargs):
+            with self.timed(stage):
+                return fn(*args, **kwargs)
+        return timed
+
+    @staticmethod
+    def percentile(samples: list, p: int) -> float:
+        """p-th percentile (1-99) of samples"""
+        if len(samples) == 1:
+            return samples[0]
+        return statistics.quantiles(samples, n=100, method="inclusive")[p - 1]
+
+    def report(self, title: str):
+        print(title)
+        print(f"  {'stage':<22}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            p50, p90, p99 = (self.percentile(samples, p) * 1000 for p in (50, 90, 99))
+            print(f"  {stage:<22}{len(samples):>6}{p50:>10.1f}{p90:>10.1f}{p99:>10.1f}{max(samples) * 1000:>10.1f}")
@@ -1,17 +1,31 @@
+import argparse
+import glob
+import hashlib
+import json
 import os
+import shutil
 import sys
+import threading
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
-from langchain_openai import OpenAIEmbeddings
+import faiss
+import numpy as np
 from langchain_text_splitters import MarkdownHeaderTextSplitter
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 
-from utils.input_adapter import load_input
+from utils.embedding_cache import CachedEmbeddings
+from utils.input_adapter import LOADERS, load_input, load_input_stream
 from utils.text_processing import TextProcessor
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# chunks sent to the embeddings API per request
+EMBED_BATCH_SIZE = 256
+
 
 class DocumentPipeline:
     def __init__(self, file_path: str = None, raw_text: str = None):
@@ -20,12 +34,14 @@ class DocumentPipeline:
         self.filename = os.path.basename(file_path) if file_path else "raw_text"
         self.doc_id = self.filename + "_" + str(uuid.uuid4())
 
+    HEADERS_TO_SPLIT_ON = [("#", "Header1"), ("##", "Header2"), ("###", "Header3")]
+
     def run(self):
         raw_text = load_input(self.file_path, self.raw_text)
         cleaned = TextProcessor.clean(raw_text)
         inferred = TextProcessor.add_headers(cleaned)
         splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=[("#", "Header1"), ("##", "Header2"), ("###", "Header3")],
+            headers_to_split_on=self.HEADERS_TO_SPLIT_ON,
             strip_headers=True
         )
         docs = splitter.split_text(inferred)
@@ -34,107 +50,472 @@ class DocumentPipeline:
 
         return chunks, self.doc_id, self.filename
 
+    def stream(self, batch_size: int = EMBED_BATCH_SIZE):
+        """Same chunks as run(), produced by generator stages (load -> clean -> headers -> split -> chunk)
+        and yielded in batches, so the whole document is never held in memory at once"""
+        blocks = load_input_stream(self.file_path, self.raw_text)
+        cleaned = TextProcessor.clean_stream(blocks)
+        lines = TextProcessor.add_headers_stream(TextProcessor.iter_lines(cleaned))
+        docs = TextProcessor.split_headers_stream(lines, self.HEADERS_TO_SPLIT_ON)
+        batch = []
+        for chunk in TextProcessor.chunk_stream(docs):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield TextProcessor.attach_metadata(batch, self.doc_id, self.filename)
+                batch = []
+        if batch:
+            yield TextProcessor.attach_metadata(batch, self.doc_id, self.filename)
+
+    def content_hash(self) -> str:
+        """sha256 of the input file bytes (or of the raw text)"""
+        digest = hashlib.sha256()
+        if self.raw_text:
+            digest.update(self.raw_text.encode("utf-8"))
+        else:
+            with open(self.file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        return digest.hexdigest()
+
+
+def parse_file(file_path: str):
+    """run the pipeline for one file (used by the bulk ingestion process pool)"""
+    start = time.perf_counter()
+    pipeline = DocumentPipeline(file_path)
+    content_hash = pipeline.content_hash()
+    chunks, doc_id, filename = pipeline.run()
+    return chunks, doc_id, filename, content_hash, time.perf_counter() - start
+
+
+def expand_paths(patterns: list[str]) -> list[str]:
+    """files of the given directories (recursively) and glob patterns, in a stable order"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                paths.extend(
+                    os.path.join(root, name) for name in sorted(names)
+                    if os.path.splitext(name)[1].lower() in LOADERS
+                )
+        else:
+            paths.extend(sorted(glob.glob(pattern, recursive=True)) or [pattern])
+    return list(dict.fromkeys(paths))
 
-class FAISSManager:
-    def __init__(self, index_path="faiss_index"):
-        self.index_path = "./db/" + index_path
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-    def add_document(self, file_path: str = None, raw_text: str = None):
-        pipeline = DocumentPipeline(file_path, raw_text)
-        chunks, doc_id, filename = pipeline.run()
-
-        if os.path.exists(self.index_path):
-            vs = FAISS.load_local(self.index_path, self.embeddings, allow_dangerous_deserialization=True)
 
-            for doc in vs.docstore._dict.values():
-                if doc.metadata.get("filename") == filename:
-                    print(f"⚠️ file {filename} indexed before")
-                    return doc.metadata.get("doc_id"), filename
+class FAISSManager:
+    """Keeps one FAISS vector store resident in memory and reloads it only when the
+    files on disk change. Writers work on a copy and swap it in after saving, so
+    concurrent readers always search a consistent snapshot.
+
+    Next to the index a registry (documents.json) maps every filename to its doc_id,
+    content hash and docstore ids, so duplicate checks, listing and removal are lookups."""
+
+    INDEX_FILES = ("index.faiss", "index.pkl")
+    REGISTRY_FILE = "documents.json"
+    # name of the version directory readers load; replaced atomically by every commit
+    CURRENT_FILE = "CURRENT"
+    # versions kept on disk, so a reader in another process can finish loading the previous one
+    KEEP_VERSIONS = 2
+
+    def __init__(self, index_path="faiss_index", db_dir="./db", embeddings=None, cache_embeddings=True):
+        self.index_path = os.path.join(db_dir, index_path)
+        if embeddings is None:
+            # imported here: langchain_openai/openai dominate the import time of this module
+            from langchain_openai import OpenAIEmbeddings
+            embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+        self.embeddings = embeddings
+        if cache_embeddings:
+            # chunks that were embedded before (re-index, re-upload) are not sent to the API again
+            self.embeddings = CachedEmbeddings(self.embeddings, os.path.join(db_dir, "embedding_cache"))
+        # (vector store, registry, content hash -> filename), replaced as one tuple so a reader
+        # never pairs the store of one commit with the registry of another
+        self._snapshot = (None, {}, {})
+        self._positions = (None, {})
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _current_dir(self):
+        """directory of the published index version; index_path itself for indexes saved before versions"""
+        try:
+            with open(os.path.join(self.index_path, self.CURRENT_FILE), "r", encoding="utf-8") as f:
+                return os.path.join(self.index_path, f.read().strip())
+        except FileNotFoundError:
+            return self.index_path
+
+    def _disk_stamp(self):
+        directory = self._current_dir()
+        names = self.INDEX_FILES + (self.REGISTRY_FILE,)
+        stats = []
+        for name in names:
+            try:
+                st = os.stat(os.path.join(directory, name))
+            except FileNotFoundError:
+                if name in self.INDEX_FILES:
+                    # the version may have been pruned since CURRENT was read: stat the published one
+                    return self._disk_stamp() if self._current_dir() != directory else None
+                st = None
+            stats.append((st.st_mtime_ns, st.st_size) if st else None)
+        return (directory, *stats)
+
+    @staticmethod
+    def _build_registry(vs) -> dict:
+        """registry of an index saved without one (content hashes are unknown)"""
+        registry = {}
+        for key, doc in vs.docstore._dict.items():
+            filename = doc.metadata.get("filename")
+            entry = registry.setdefault(filename, {"doc_id": doc.metadata.get("doc_id"), "content_hash": None, "ids": []})
+            entry["ids"].append(key)
+        return registry
+
+    def _load(self):
+        """current (vector store, registry); (None, {}) if there is no index.
+        The index is reloaded only if its files changed."""
+        stamp = self._disk_stamp()
+        if stamp is None:
+            return None, {}
+        if stamp == self._stamp:
+            return self._snapshot[:2]
+        with self._lock:
+            stamp = self._disk_stamp()
+            if stamp is None:
+                return None, {}
+            while stamp != self._stamp:
+                directory = stamp[0]
+                try:
+                    vs = FAISS.load_local(directory, self.embeddings, allow_dangerous_deserialization=True)
+                    registry_path = os.path.join(directory, self.REGISTRY_FILE)
+                    if os.path.exists(registry_path):
+                        with open(registry_path, "r", encoding="utf-8") as f:
+                            registry = json.load(f)
+                    else:
+                        registry = self._build_registry(vs)
+                except (OSError, RuntimeError):
+                    # the version was pruned by a writer in another process while loading: load the new one
+                    stamp = self._disk_stamp()
+                    if stamp is None:
+                        return None, {}
+                    if stamp[0] == directory:
+                        raise
+                    continue
+                self._publish(vs, registry)
+                self._stamp = stamp
+            return self._snapshot[:2]
+
+    @staticmethod
+    def _copy(vs):
+        return FAISS(
+            embedding_function=vs.embedding_function,
+            index=faiss.clone_index(vs.index),
+            docstore=InMemoryDocstore(dict(vs.docstore._dict)),
+            index_to_docstore_id=dict(vs.index_to_docstore_id),
+            normalize_L2=vs._normalize_L2,
+            distance_strategy=vs.distance_strategy
+        )
 
-            vs.add_documents(chunks)
+    def _commit(self, vs, registry):
+        """save vs and registry as a new version directory, point CURRENT at it and publish them to readers.
+        Replacing CURRENT is the only step other processes can observe, so they load either the old
+        or the new version, never a mix of their files."""
+        version = f"v{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        directory = os.path.join(self.index_path, version)
+        vs.save_local(directory)
+        with open(os.path.join(directory, self.REGISTRY_FILE), "w", encoding="utf-8") as f:
+            json.dump(registry, f, ensure_ascii=False)
+        pointer = os.path.join(self.index_path, f"{self.CURRENT_FILE}.{version}.tmp")
+        with open(pointer, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(self.index_path, self.CURRENT_FILE))
+        self._publish(vs, registry)
+        self._stamp = self._disk_stamp()
+        self._prune(version)
+
+    def _prune(self, current: str):
+        """remove all but the newest KEEP_VERSIONS version directories, and the files of an unversioned index"""
+        versions = sorted(name for name in os.listdir(self.index_path)
+                          if name.startswith("v") and os.path.isdir(os.path.join(self.index_path, name)))
+        for name in versions[:-self.KEEP_VERSIONS]:
+            if name != current:
+                shutil.rmtree(os.path.join(self.index_path, name), ignore_errors=True)
+        for name in self.INDEX_FILES + (self.REGISTRY_FILE,):
+            try:
+                os.remove(os.path.join(self.index_path, name))
+            except FileNotFoundError:
+                pass
+
+    def _with_embeddings(self, text_embeddings, metadatas, ids):
+        """a copy of the current vector store with the given (text, vector) pairs added"""
+        current = self._snapshot[0]
+        if current is None:
+            return FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=ids)
+        vs = self._copy(current)
+        vs.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        return vs
+
+    def _publish(self, vs, registry):
+        by_hash = {entry["content_hash"]: name for name, entry in registry.items() if entry.get("content_hash")}
+        self._snapshot = (vs, registry, by_hash)
+
+    def _find_duplicate(self, filename, content_hash):
+        """name under which this file (same name or same content) is already indexed"""
+        _, registry, by_hash = self._snapshot
+        if filename in registry:
+            return filename
+        return by_hash.get(content_hash)
+
+    def _report_duplicate(self, filename, duplicate):
+        if duplicate == filename:
+            print(f"⚠️ file {filename} indexed before")
         else:
-            vs = FAISS.from_documents(chunks, self.embeddings)
+            print(f"⚠️ file {filename} has the same content as {duplicate}, indexed before")
+        return self._snapshot[1][duplicate]["doc_id"], duplicate
 
-        vs.save_local(self.index_path)
+    def add_document(self, file_path: str = None, raw_text: str = None):
+        pipeline = DocumentPipeline(file_path, raw_text)
+        content_hash = pipeline.content_hash()
+
+        self._load()
+        with self._lock:
+            duplicate = self._find_duplicate(pipeline.filename, content_hash)
+            if duplicate:
+                return self._report_duplicate(pipeline.filename, duplicate)
+
+        doc_id, filename = pipeline.doc_id, pipeline.filename
+        # chunks are embedded batch by batch as the pipeline produces them, and every batch goes
+        # straight into a store of this document: only float32 vectors are kept until the save
+        doc_vs, ids = None, []
+        for chunks in pipeline.stream(batch_size=EMBED_BATCH_SIZE):
+            vectors = self.embeddings.embed_documents([c.page_content for c in chunks])
+            text_embeddings = list(zip((c.page_content for c in chunks), vectors))
+            batch_ids = [str(uuid.uuid4()) for _ in chunks]
+            metadatas = [c.metadata for c in chunks]
+            if doc_vs is None:
+                doc_vs = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=batch_ids)
+            else:
+                doc_vs.add_embeddings(text_embeddings, metadatas=metadatas, ids=batch_ids)
+            ids.extend(batch_ids)
+        if not ids:
+            print(f"⚠️ no text extracted from {filename}")
+            return None, filename
+
+        with self._lock:
+            # another writer may have added the same file while we were parsing
+            duplicate = self._find_duplicate(filename, content_hash)
+            if duplicate:
+                return self._report_duplicate(filename, duplicate)
+
+            # merged into a copy of the store taken now, so writes committed meanwhile are kept
+            current, registry, _ = self._snapshot
+            if current is None:
+                vs = doc_vs
+            else:
+                vs = self._copy(current)
+                vs.merge_from(doc_vs)
+            registry = dict(registry)
+            registry[filename] = {"doc_id": doc_id, "content_hash": content_hash, "ids": ids}
+            self._commit(vs, registry)
         print(f"✅ Document added successfully!")
         print(f"   Filename: {filename}")
         print(f"   Doc ID:   {doc_id}")
         return doc_id, filename
 
+    def ingest(self, file_paths: list[str], workers: int = None, batch_size: int = EMBED_BATCH_SIZE,
+               embed_concurrency: int = 4):
+        """Bulk ingestion: parse and clean files in a process pool, embed all chunks in batches
+        of `batch_size` (at most `embed_concurrency` batches at once) and save the index once.
+        Returns one report entry per file."""
+        report = []
+        self._load()
+        _, indexed, indexed_hashes = self._snapshot
+        todo, seen = [], set()
+        for path in file_paths:
+            filename = os.path.basename(path)
+            if filename in indexed or filename in seen:
+                report.append({"filename": filename, "status": "duplicate", "chunks": 0, "seconds": 0.0})
+                continue
+            seen.add(filename)
+            todo.append(path)
+
+        parsed, hashes = [], set()
+        if todo:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(parse_file, path): path for path in todo}
+                for future in as_completed(futures):
+                    filename = os.path.basename(futures[future])
+                    try:
+                        chunks, doc_id, filename, content_hash, seconds = future.result()
+                    except Exception as e:
+                        report.append({"filename": filename, "status": "failed", "chunks": 0, "seconds": 0.0,
+                                       "error": repr(e)})
+                        continue
+                    entry = {"filename": filename, "status": "added", "chunks": len(chunks), "seconds": seconds,
+                             "doc_id": doc_id}
+                    if content_hash in indexed_hashes or content_hash in hashes:
+                        entry["status"] = "duplicate"
+                    elif not chunks:
+                        entry.update(status="failed", error="no text extracted")
+                    else:
+                        hashes.add(content_hash)
+                        parsed.append((entry, chunks, content_hash))
+                    report.append(entry)
+
+        # embed the chunks of all files together, in large batches
+        items = [(i, j, chunk) for i, (_, chunks, _) in enumerate(parsed) for j, chunk in enumerate(chunks)]
+        batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        vectors, failed = {}, set()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, embed_concurrency)) as executor:
+            futures = [
+                executor.submit(self.embeddings.embed_documents, [chunk.page_content for _, _, chunk in batch])
+                for batch in batches
+            ]
+            for n, batch in enumerate(batches):
+                future, futures[n] = futures[n], None
+                try:
+                    # one float32 array per batch: lists of Python floats take ~8x the memory
+                    batch_vectors = np.asarray(future.result(), dtype=np.float32)
+                except Exception as e:
+                    for i, _, _ in batch:
+                        failed.add(i)
+                        parsed[i][0].update(status="failed", error=repr(e))
+                    continue
+                for (i, j, _), vector in zip(batch, batch_vectors):
+                    vectors[i, j] = vector
+        embed_seconds = time.perf_counter() - start
+
+        added = [(i, *parsed[i]) for i in range(len(parsed)) if i not in failed]
+        if added:
+            with self._lock:
+                _, indexed, indexed_hashes = self._snapshot
+                registry = dict(indexed)
+                text_embeddings, metadatas, ids = [], [], []
+                for i, entry, chunks, content_hash in added:
+                    # another writer may have added the same file while we were parsing
+                    if entry["filename"] in indexed or content_hash in indexed_hashes:
+                        entry["status"] = "duplicate"
+                        continue
+                    chunk_ids = [str(uuid.uuid4()) for _ in chunks]
+                    registry[entry["filename"]] = {"doc_id": entry["doc_id"], "content_hash": content_hash,
+                                                   "ids": chunk_ids}
+                    text_embeddings.extend((c.page_content, vectors[i, j]) for j, c in enumerate(chunks))
+                    metadatas.extend(c.metadata for c in chunks)
+                    ids.extend(chunk_ids)
+
+                if text_embeddings:
+                    self._commit(self._with_embeddings(text_embeddings, metadatas, ids), registry)
+
+        added_count = sum(1 for entry in report if entry["status"] == "added")
+        print(f"✅ Ingested {added_count} file(s), {len(items)} chunk(s) embedded in {embed_seconds:.2f}s")
+        return report
+
     def list_documents(self):
-        if not os.path.exists(self.index_path):
-            return []
-        vs = FAISS.load_local(self.index_path, self.embeddings, allow_dangerous_deserialization=True)
-        docs_info = [
-            {"doc_id": d.metadata.get("doc_id"), "filename": d.metadata.get("filename")}
-            for d in vs.docstore._dict.values()
+        _, registry = self._load()
+        return [
+            {"doc_id": entry["doc_id"], "filename": filename}
+            for filename, entry in registry.items() if entry["doc_id"]
         ]
-        return list({d["doc_id"]: d for d in docs_info if d["doc_id"]}.values())
 
     def remove_document(self, file_path: str):
-        if not os.path.exists(self.index_path):
+        if self._load()[0] is None:
             return None
 
         filename = os.path.basename(file_path)
 
-        vs = FAISS.load_local(
-            self.index_path,
-            self.embeddings,
-            allow_dangerous_deserialization=True
-        )
-
-        keys_to_delete = [
-            k for k, v in vs.docstore._dict.items()
-            if v.metadata.get("filename") == filename
-        ]
-
-        if not keys_to_delete:
-            return False
-
-        remaining_docs = []
-        for k, v in vs.docstore._dict.items():
-            if k not in keys_to_delete:
-                remaining_docs.append(v)
-
-        if remaining_docs:
-            new_vs = FAISS.from_documents(
-                remaining_docs,
-                self.embeddings
-            )
-            vs = new_vs
-        else:
-            vs = FAISS(
-                embedding_function=self.embeddings,
-                index=None,
-                docstore=vs.docstore,
-                index_to_docstore_id={}
-            )
+        with self._lock:
+            current, registry, _ = self._snapshot
+            entry = registry.get(filename)
+            if not entry:
+                return False
 
-        vs.save_local(self.index_path)
+            # drop only this file's vectors, the rest of the corpus is not re-embedded
+            vs = self._copy(current)
+            vs.delete(entry["ids"])
+            registry = dict(registry)
+            del registry[filename]
+            self._commit(vs, registry)
 
         if os.path.exists(file_path):
             os.remove(file_path)
 
         return True
 
-    def search(self, query: str, k=3, doc_id=None, filename=None):
-        if not os.path.exists(self.index_path):
+    def _positions_of(self, vs) -> dict:
+        """docstore id -> position in the FAISS index of this vector store"""
+        cached_vs, positions = self._positions
+        if cached_vs is not vs:
+            positions = {docstore_id: i for i, docstore_id in vs.index_to_docstore_id.items()}
+            self._positions = (vs, positions)
+        return positions
+
+    def search_with_scores(self, query: str, k=3, doc_id=None, filename=None):
+        """(document, distance) pairs for a query. When doc_id or filename is given only the
+        vectors of the matching documents are scored (FAISS IDSelector), instead of
+        over-fetching from the whole corpus and filtering afterwards."""
+        vs, registry = self._load()
+        if vs is None:
+            return []
+        if not doc_id and not filename:
+            return vs.similarity_search_with_score(query, k=k)
+
+        ids = []
+        for name, entry in registry.items():
+            if filename and name != filename:
+                continue
+            if doc_id and entry["doc_id"] != doc_id:
+                continue
+            ids.extend(entry["ids"])
+        positions_of = self._positions_of(vs)
+        positions = np.array([positions_of[i] for i in ids if i in positions_of], dtype=np.int64)
+        if not len(positions):
             return []
-        vs = FAISS.load_local(self.index_path, self.embeddings, allow_dangerous_deserialization=True)
 
-        filter_dict = {}
-        if doc_id: filter_dict["doc_id"] = doc_id
-        if filename: filter_dict["filename"] = filename
+        vector = np.array([vs._embed_query(query)], dtype=np.float32)
+        if vs._normalize_L2:
+            faiss.normalize_L2(vector)
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(positions))
+        scores, indices = vs.index.search(vector, min(k, len(positions)), params=params)
 
-        return vs.similarity_search(query, k=k, filter=filter_dict if filter_dict else None)
+        results = []
+        for score, i in zip(scores[0], indices[0]):
+            if i == -1:
+                continue
+            results.append((vs.docstore.search(vs.index_to_docstore_id[i]), float(score)))
+        return results
+
+    def search(self, query: str, k=3, doc_id=None, filename=None):
+        return [doc for doc, _ in self.search_with_scores(query, k=k, doc_id=doc_id, filename=filename)]
+
+
+def print_report(report: list[dict]):
+    for entry in report:
+        line = f"{entry['status']:<10} {entry['seconds']:8.2f}s {entry['chunks']:6d} chunks  {entry['filename']}"
+        if entry.get("error"):
+            line += f"  ({entry['error']})"
+        print(line)
+    failed = sum(1 for entry in report if entry["status"] == "failed")
+    print(f"{len(report)} file(s), {failed} failed")
 
 
 def main():
     if len(sys.argv) < 2:
         print("Usage: python files.py <file_path>")
+        print("       python files.py ingest <dir-or-glob> [<dir-or-glob> ...] [--workers N] [--batch-size N] [--concurrency N]")
         sys.exit(1)
 
+    if sys.argv[1] == "ingest":
+        parser = argparse.ArgumentParser(prog="python files.py ingest")
+        parser.add_argument("paths", nargs="+", help="files, directories or glob patterns")
+        parser.add_argument("--workers", type=int, default=None, help="parsing processes (default: CPU count)")
+        parser.add_argument("--batch-size", type=int, default=256, help="chunks per embedding request")
+        parser.add_argument("--concurrency", type=int, default=4, help="embedding requests at the same time")
+        args = parser.parse_args(sys.argv[2:])
+
+        manager = FAISSManager()
+        report = manager.ingest(expand_paths(args.paths), workers=args.workers, batch_size=args.batch_size,
+                                embed_concurrency=args.concurrency)
+        print_report(report)
+        return
+
     file_path = sys.argv[1]
 
     manager = FAISSManager()
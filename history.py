@@ -0,0 +1,160 @@
+import asyncio
+import contextvars
+import hashlib
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from utils.cache import TTLCache
+
+# tokens added by the chat format to every message (role, separators)
+MESSAGE_OVERHEAD = 4
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+class TokenCounter:
+    """Counts tokens locally with tiktoken; falls back to an estimate (about 4 UTF-8 bytes
+    per token) when the encoding is not available, e.g. offline."""
+
+    def __init__(self, encoding: str = "o200k_base"):
+        self.encoding_name = encoding
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _encoder(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    try:
+                        import tiktoken
+                        self._encoding = tiktoken.get_encoding(self.encoding_name)
+                    except Exception as e:
+                        print(f"⚠️ tiktoken encoding {self.encoding_name} unavailable, estimating tokens: {e!r}")
+                    self._loaded = True
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        encoding = self._encoder()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return (len(text.encode("utf-8")) + 3) // 4
+
+
+def message_text(message: BaseMessage) -> str:
+    text = message.content if isinstance(message.content, str) else str(message.content)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        text += "".join(f"{c['name']}{c['args']}" for c in message.tool_calls)
+    return text
+
+
+class HistoryManager:
+    """Trims a conversation to a token budget before it is sent to the model.
+    The newest messages are kept; an AIMessage with tool calls is kept or dropped together
+    with its ToolMessages, and the kept part starts at a HumanMessage. With a `summarizer`
+    (previous summary, dropped messages) -> summary, the dropped part is replaced by a running
+    summary; summaries are cached by the content of the dropped prefix, so every turn only
+    summarizes the messages dropped since the last one."""
+
+    def __init__(self, max_tokens: int = 6000, summarizer=None, summary_tokens: int = 400,
+                 counter: TokenCounter = None, summary_cache: TTLCache = None, count_cache_size: int = 4096):
+        self.max_tokens = max_tokens
+        self.summarizer = summarizer
+        self.summary_tokens = summary_tokens
+        self.counter = counter or TokenCounter()
+        self.summary_cache = summary_cache or TTLCache(maxsize=1024, ttl=24 * 3600)
+        self.count_cache_size = count_cache_size
+        # message id -> token count, so long histories are not re-encoded on every turn
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, message: BaseMessage) -> int:
+        key = (message.id, len(message_text(message))) if message.id else None
+        if key is not None:
+            with self._lock:
+                cached = self._counts.get(key)
+                if cached is not None:
+                    self._counts.move_to_end(key)
+                    return cached
+        n = self.counter.count(message_text(message)) + MESSAGE_OVERHEAD
+        if key is not None:
+            with self._lock:
+                self._counts[key] = n
+                while len(self._counts) > self.count_cache_size:
+                    self._counts.popitem(last=False)
+        return n
+
+    @staticmethod
+    def units(messages: list) -> list:
+        """split messages into units that are kept or dropped as a whole"""
+        units = []
+        for message in messages:
+            if isinstance(message, ToolMessage) and units and (
+                    isinstance(units[-1][0], AIMessage) and units[-1][0].tool_calls):
+                units[-1].append(message)
+            else:
+                units.append([message])
+        return units
+
+    def split(self, messages: list, budget: int = None) -> tuple[list, list]:
+        """(dropped, kept) messages: kept are the newest units that fit in `budget` tokens.
+        The last unit is always kept, even when it is larger than the budget."""
+        budget = self.max_tokens if budget is None else budget
+        units = self.units(messages)
+        used, start = 0, len(units)
+        for i in range(len(units) - 1, -1, -1):
+            size = sum(self.count(m) for m in units[i])
+            if start < len(units) and used + size > budget:
+                break
+            used += size
+            start = i
+        # don't start the kept part in the middle of a turn
+        while start < len(units) - 1 and not isinstance(units[start][0], HumanMessage):
+            start += 1
+        dropped = [m for unit in units[:start] for m in unit]
+        kept = [m for unit in units[start:] for m in unit]
+        return dropped, kept
+
+    @staticmethod
+    def _prefix_keys(messages: list) -> list:
+        """chained hash of every prefix of messages: keys[i] identifies messages[:i + 1]"""
+        keys, digest = [], b""
+        for message in messages:
+            digest = hashlib.sha256(digest + message.type.encode() + message_text(message).encode("utf-8")).digest()
+            keys.append(digest.hex())
+        return keys
+
+    def summarize(self, dropped: list) -> str:
+        """running summary of the dropped messages, reusing the longest cached prefix summary"""
+        keys = self._prefix_keys(dropped)
+        summary, done = "", 0
+        for i in range(len(keys) - 1, -1, -1):
+            cached = self.summary_cache.get(keys[i])
+            if cached is not None:
+                summary, done = cached, i + 1
+                break
+        if done < len(dropped):
+            summary = self.summarizer(summary, dropped[done:])
+            self.summary_cache.set(keys[-1], summary)
+        return summary
+
+    def trim(self, messages: list) -> list:
+        """messages to send to the model (without the system prompt) within the token budget"""
+        budget = self.max_tokens - (self.summary_tokens if self.summarizer else 0)
+        dropped, kept = self.split(messages, budget)
+        if not dropped or self.summarizer is None:
+            return kept
+        try:
+            summary = self.summarize(dropped)
+        except Exception as e:
+            print(f"⚠️ history summary failed: {e!r}")
+            return kept
+        return [SystemMessage(content=SUMMARY_PREFIX + summary)] + kept if summary else kept
+
+    async def atrim(self, messages: list, executor=None) -> list:
+        """async version of trim; a summarizer call runs in a thread of `executor` (default: the loop's)"""
+        if self.summarizer is None:
+            return self.trim(messages)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, contextvars.copy_context().run, self.trim, messages)
@@ -0,0 +1,61 @@
+import os
+import threading
+from pydantic import BaseModel, Field
+
+from files import FAISSManager
+
+NOT_FOUND = "Not found"
+
+# Local knowledge search: passages returned per query and the largest FAISS (squared L2)
+# distance a passage may have to count as a hit; with normalized OpenAI embeddings
+# 0.8 corresponds to a cosine similarity of 0.6
+KNOWLEDGE_K = int(os.environ.get("KNOWLEDGE_K", 4))
+KNOWLEDGE_MAX_DISTANCE = float(os.environ.get("KNOWLEDGE_MAX_DISTANCE", 0.8))
+
+_knowledge_base = None
+_lock = threading.Lock()
+
+
+def knowledge_base() -> FAISSManager:
+    """the shared FAISSManager over the indexed documents (created on first use)"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _lock:
+            if _knowledge_base is None:
+                _knowledge_base = FAISSManager()
+    return _knowledge_base
+
+
+class KnowledgeInput(BaseModel):
+    query: str = Field(..., description="پرسش یا موضوع برای جستجو در راهنماها و بروشورهای محلی")
+
+
+class KnowledgeOutput(BaseModel):
+    passages: str = Field(..., description="متن‌های مرتبط از اسناد محلی، یا Not found")
+
+
+def format_passage(doc) -> str:
+    headers = [doc.metadata[h] for h in ("Header1", "Header2", "Header3") if doc.metadata.get(h)]
+    source = " › ".join([doc.metadata.get("filename", "")] + headers)
+    return f"[{source}]\n{doc.page_content}"
+
+
+def find_passages(query: str, k: int = None, max_distance: float = None) -> list:
+    """(document, distance) pairs of the local index that are close enough to the query"""
+    k = KNOWLEDGE_K if k is None else k
+    max_distance = KNOWLEDGE_MAX_DISTANCE if max_distance is None else max_distance
+    hits = knowledge_base().search_with_scores(query, k=k)
+    return [(doc, distance) for doc, distance in hits if distance <= max_distance]
+
+
+def lookup_knowledge(query: str) -> str:
+    """local passages for a query as one text, or "Not found" when no passage is close enough"""
+    hits = find_passages(query)
+    if not hits:
+        return NOT_FOUND
+    return "\n\n".join(format_passage(doc) for doc, _ in hits)
+
+
+def search_knowledge(input: KnowledgeInput) -> KnowledgeOutput:
+    """جستجو فقط در راهنماها و بروشورهای گردشگری نمایه‌شده؛ jina_search خودش ابتدا همین اسناد را می‌گردد"""
+    return KnowledgeOutput(passages=lookup_knowledge(input.query))
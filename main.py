@@ -1,16 +1,31 @@
+import asyncio
+import contextlib
+import functools
+import hashlib
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from dotenv import load_dotenv
 import os
 from getpass import getpass
 
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage, message_chunk_to_message
+from langchain_core.runnables import RunnableLambda
 from langchain_community.tools import JinaSearch
 from langgraph.checkpoint.memory import MemorySaver
+from langgraph.config import get_config, get_stream_writer
 from langgraph.graph import StateGraph, MessagesState, START, END
 import gradio as gr
+from answer_cache import AnswerCache
+from history import HistoryManager
+from knowledge import NOT_FOUND, KnowledgeInput, lookup_knowledge, search_knowledge
 from map import geocode_address, GeocodeInput
+from sessions import SessionManager
+from telemetry import JsonlSink, telemetry
+from utils.cache import TTLCache
+from utils.text_processing import TextProcessor
 
 # --- Load environment variables ---
 load_dotenv()
@@ -20,7 +35,8 @@ if not os.environ.get("OPENAI_API_KEY"):
     os.environ["OPENAI_API_KEY"] = getpass("Enter your OpenAI API key: ")
 
 # --- Initialize model and tool ---
-model = ChatOpenAI(model="gpt-4o", temperature=0.7)
+# stream_usage: streamed replies end with their token usage (recorded in the metrics)
+model = ChatOpenAI(model="gpt-4o", temperature=0.7, stream_usage=True)
 nano_model = ChatOpenAI(model="gpt-5-nano", temperature=0.5)
 # model = ChatOpenAI(
 #     api_key=os.getenv("OPENROUTER_API_KEY"),
@@ -42,66 +58,392 @@ nano_model = ChatOpenAI(model="gpt-5-nano", temperature=0.5)
 # )
 jina_tool = JinaSearch()
 
+# Search result summarization: how many nano_model calls run at once and how long
+# (in seconds) a summary may take before it is dropped from the tool output
+SUMMARY_CONCURRENCY = int(os.environ.get("SUMMARY_CONCURRENCY", 5))
+SUMMARY_TIMEOUT = float(os.environ.get("SUMMARY_TIMEOUT", 20))
+
+# Web search caches: Jina results by normalized query for SEARCH_CACHE_TTL seconds, and
+# result summaries by content hash, so a page returned for several queries is summarized once
+SEARCH_CACHE_PATH = os.environ.get("SEARCH_CACHE_PATH", "./db/search_cache.sqlite")
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 6 * 3600))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 5000))
+SUMMARY_CACHE_PATH = os.environ.get("SUMMARY_CACHE_PATH", "./db/summary_cache.sqlite")
+SUMMARY_CACHE_TTL = float(os.environ.get("SUMMARY_CACHE_TTL", 30 * 24 * 3600))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.environ.get("SUMMARY_CACHE_MAX_ENTRIES", 20000))
+
+search_cache = TTLCache(SEARCH_CACHE_PATH, maxsize=512, ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES)
+summary_cache = TTLCache(SUMMARY_CACHE_PATH, maxsize=2048, ttl=SUMMARY_CACHE_TTL,
+                         max_entries=SUMMARY_CACHE_MAX_ENTRIES)
+
+# Tool execution: how many tool calls of one model turn run at once and how long
+# (in seconds) each tool may take before an empty result is returned for it
+TOOL_CONCURRENCY = int(os.environ.get("TOOL_CONCURRENCY", 6))
+TOOL_TIMEOUT = float(os.environ.get("TOOL_TIMEOUT", 30))
+# tool rounds per turn: the model may chain tools (e.g. search_knowledge, then jina_search)
+MAX_TOOL_ROUNDS = int(os.environ.get("MAX_TOOL_ROUNDS", 3))
+TOOL_TIMEOUTS = {
+    "geocode_address": 10,
+    "search_knowledge": 10,
+}
+
+# Conversation history sent to the model: at most HISTORY_MAX_TOKENS tokens; with
+# HISTORY_SUMMARY on, older turns are replaced by a running summary made by nano_model
+HISTORY_MAX_TOKENS = int(os.environ.get("HISTORY_MAX_TOKENS", 6000))
+HISTORY_SUMMARY = os.environ.get("HISTORY_SUMMARY", "true").lower() in ("1", "true", "yes")
+
+# Semantic answer cache (off by default): a first-turn question at least
+# SEMANTIC_CACHE_THRESHOLD cosine-similar to a cached one gets the cached answer
+SEMANTIC_CACHE = os.environ.get("SEMANTIC_CACHE", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", 0.92))
+SEMANTIC_CACHE_TTL = float(os.environ.get("SEMANTIC_CACHE_TTL", 24 * 3600))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", 1000))
+
+# Observability: the spans of every turn are appended to TRACE_PATH as JSON lines (off when
+# empty); aggregate metrics are served on 127.0.0.1:METRICS_PORT (/metrics, /metrics.json;
+# 0 = off) and written to METRICS_PATH every METRICS_INTERVAL seconds (off when empty)
+TRACE_PATH = os.environ.get("TRACE_PATH", "")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9464))
+METRICS_PATH = os.environ.get("METRICS_PATH", "")
+METRICS_INTERVAL = float(os.environ.get("METRICS_INTERVAL", 30))
+
+if TRACE_PATH:
+    telemetry.add_sink(JsonlSink(TRACE_PATH))
+
+# Gradio queue: chats handled at the same time and requests waiting in the queue
+CHAT_CONCURRENCY = int(os.environ.get("CHAT_CONCURRENCY", 64))
+CHAT_QUEUE_SIZE = int(os.environ.get("CHAT_QUEUE_SIZE", 512))
+# threads for the blocking work of async turns (tools, history summaries, answer cache embeddings):
+# the event loop's default executor has min(32, cpus + 4) threads, so turns would wait for each other
+BLOCKING_THREADS = int(os.environ.get("BLOCKING_THREADS", CHAT_CONCURRENCY))
+blocking_executor = ThreadPoolExecutor(max_workers=max(1, BLOCKING_THREADS), thread_name_prefix="chat-blocking")
+
+
+async def run_blocking(fn, *args):
+    """run fn(*args) on blocking_executor; spans it starts stay children of the current one"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, telemetry.in_context(functools.partial(fn, *args)))
+
+# progress shown in the chat while a tool runs
+TOOL_PROGRESS = {
+    "search_knowledge": "📚 Searching the travel guides",
+    "jina_search": "🔎 Searching the web",
+    "geocode_address": "📍 Locating",
+}
+
 # Bind tools to the model (so the LLM can call them when needed)
-model_with_tools = model.bind_tools([jina_tool, geocode_address])
+model_with_tools = model.bind_tools([search_knowledge, jina_tool, geocode_address])
 
 # --- Define workflow graph ---
 workflow = StateGraph(state_schema=MessagesState)
 
 
-def call_model(state: MessagesState):
-    system_prompt = (
-        "You are a tourism assistant. Help the user plan their journey, output language is use input language"
+def summarize_result(result: dict) -> str:
+    """Summarize one search result with the nano model"""
+    summary_prompt = f"Summarize this search result in under 5 bullet points:\n\n{result['content']}"
+    with telemetry.span("summary", link=result.get("link")):
+        summary = nano_model.invoke([HumanMessage(content=summary_prompt)])
+    telemetry.tokens("nano", summary.usage_metadata)
+    return summary.content
+
+
+def content_key(result: dict) -> str:
+    """summary cache key of a search result: hash of its content"""
+    return hashlib.sha256(result["content"].encode("utf-8")).hexdigest()
+
+
+def summarize_results(results: list, max_concurrency: int = SUMMARY_CONCURRENCY,
+                      timeout: float = SUMMARY_TIMEOUT) -> list:
+    """Summarize search results concurrently, keeping their order.
+    Cached summaries are reused; summaries that fail or are not ready within `timeout`
+    seconds are skipped."""
+    if not results:
+        return []
+    keys = [content_key(r) for r in results]
+    summaries = [summary_cache.get(key) for key in keys]
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    for summary in summaries:
+        telemetry.cache("summary", summary is not None)
+    if missing:
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(missing))))
+        futures = {i: executor.submit(telemetry.in_context(summarize_result), results[i]) for i in missing}
+        done, _ = wait(futures.values(), timeout=timeout)
+        # don't block the reply on stragglers
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        for i, future in futures.items():
+            if future not in done:
+                print(f"⚠️ summary timed out: {results[i].get('link')}")
+                telemetry.count("errors_total", span="summary", kind="timeout")
+            elif future.exception() is not None:
+                print(f"⚠️ summary failed: {results[i].get('link')}: {future.exception()}")
+            else:
+                summaries[i] = future.result()
+                summary_cache.set(keys[i], summaries[i])
+    return [summary for summary in summaries if summary is not None]
+
+
+def search_web(query: str) -> list:
+    """Jina search results for a query, served from the cache when possible"""
+    key = TextProcessor.normalize_key(query)
+    results = search_cache.get(key)
+    telemetry.cache("search", results is not None)
+    if results is not None:
+        print("✅ search results from cache:", query)
+        return results
+    with telemetry.span("jina.request"):
+        results = json.loads(jina_tool.invoke(query))
+    if results:
+        search_cache.set(key, results)
+    return results
+
+
+def run_jina_search(args: dict) -> str:
+    query = args["query"]
+    # local first: indexed guides that match well enough make the web search unnecessary
+    try:
+        with telemetry.span("knowledge.lookup"):
+            local = lookup_knowledge(query)
+    except Exception as e:
+        print(f"⚠️ local knowledge search failed: {e!r}")
+        local = NOT_FOUND
+    telemetry.cache("knowledge", local != NOT_FOUND)
+    if local != NOT_FOUND:
+        print("✅ answered from local knowledge:", query)
+        return local
+
+    result_dict = search_web(query)
+    print("Search Results number:", len(result_dict))
+    for r in result_dict:
+        print("title: ", r['title'])
+        print("link: ", r['link'])
+        print("**" * 20)
+    summaries = summarize_results(result_dict)
+    return "\n".join(summaries)
+
+
+def run_search_knowledge(args: dict) -> str:
+    query = args["input"]["query"]
+    return search_knowledge(KnowledgeInput(query=query)).passages
+
+
+def run_geocode_address(args: dict) -> str:
+    address = args["input"]["address"]
+    result = geocode_address(GeocodeInput(address=address))
+    return result.url
+
+
+TOOL_HANDLERS = {
+    "search_knowledge": run_search_knowledge,
+    "jina_search": run_jina_search,
+    "geocode_address": run_geocode_address,
+}
+
+
+def run_tool_call(tool_call: dict) -> str:
+    """Run one tool call and return its output text"""
+    handler = TOOL_HANDLERS.get(tool_call["name"])
+    if handler is None:
+        raise ValueError(f"{tool_call['name']} is not a supported tool")
+    with telemetry.span(f"tool.{tool_call['name']}"):
+        return handler(tool_call["args"])
+
+
+def execute_tool_calls(tool_calls: list, max_concurrency: int = TOOL_CONCURRENCY) -> list:
+    """Run the tool calls of one model turn in parallel.
+    Returns one ToolMessage per tool call, in the same order as `tool_calls`;
+    a tool that fails or exceeds its timeout gets an empty ToolMessage with status "error"."""
+    if not tool_calls:
+        return []
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(tool_calls))))
+    start = time.monotonic()
+    futures = [executor.submit(telemetry.in_context(run_tool_call), tool_call) for tool_call in tool_calls]
+
+    tool_outputs = []
+    for tool_call, future in zip(tool_calls, futures):
+        timeout = TOOL_TIMEOUTS.get(tool_call["name"], TOOL_TIMEOUT)
+        try:
+            content = future.result(timeout=max(0, start + timeout - time.monotonic()))
+        except Exception as e:
+            print(f"⚠️ tool {tool_call['name']} failed: {e!r}")
+            if not future.done():
+                telemetry.count("errors_total", span=f"tool.{tool_call['name']}", kind="timeout")
+            content = None
+        tool_outputs.append(ToolMessage(content=content or "", tool_call_id=tool_call["id"],
+                                        status="success" if content is not None else "error"))
+    # don't block the reply on tools that timed out
+    executor.shutdown(wait=False, cancel_futures=True)
+    return tool_outputs
+
+
+SYSTEM_PROMPT = (
+    "You are a tourism assistant. Help the user plan their journey, output language is use input language. "
+    "For facts about places use jina_search: it answers from the indexed travel guides when they cover the "
+    "question and searches the web otherwise. Use search_knowledge only for questions about the guides themselves"
+)
+
+
+def stream_writer():
+    """LangGraph custom stream writer of the current run (no-op outside a graph run)"""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda chunk: None
+
+
+def report_tool_calls(tool_calls: list, writer):
+    for tool_call in tool_calls:
+        args = tool_call["args"]
+        inputs = args.get("input", {})
+        detail = args.get("query") or inputs.get("query") or inputs.get("address", "")
+        writer({"tool": tool_call["name"], "detail": detail})
+
+
+def record_model_call(span, response):
+    """token usage, tool calls and time to first token of a model call"""
+    usage = response.usage_metadata or {}
+    span.attrs.update(prompt_tokens=usage.get("input_tokens"), completion_tokens=usage.get("output_tokens"),
+                      tool_calls=[c["name"] for c in response.tool_calls])
+    telemetry.tokens("chat", usage)
+    if "first_token" in span.attrs:
+        telemetry.observe("model_first_token_seconds", span.attrs["first_token"])
+
+
+def stream_model(messages: list, writer):
+    """Call the model with streaming, forwarding text tokens to `writer`; returns the full message"""
+    response = None
+    with telemetry.span("model_call") as span:
+        for chunk in model_with_tools.stream(messages):
+            if chunk.text:
+                span.attrs.setdefault("first_token", time.time() - span.start)
+                writer({"token": chunk.text})
+            response = chunk if response is None else response + chunk
+        response = message_chunk_to_message(response)
+        record_model_call(span, response)
+    return response
+
+
+async def astream_model(messages: list, writer):
+    """async version of stream_model"""
+    response = None
+    with telemetry.span("model_call") as span:
+        async for chunk in model_with_tools.astream(messages):
+            if chunk.text:
+                span.attrs.setdefault("first_token", time.time() - span.start)
+                writer({"token": chunk.text})
+            response = chunk if response is None else response + chunk
+        response = message_chunk_to_message(response)
+        record_model_call(span, response)
+    return response
+
+
+def summarize_history(previous_summary: str, messages: list) -> str:
+    """Fold older conversation messages into the running summary with the nano model"""
+    conversation = "\n".join(f"{m.type}: {m.content}" for m in messages if m.content)
+    summary_prompt = (
+        "Update the summary of a travel planning conversation with the new messages. Keep destinations, "
+        "dates, budget, preferences and decisions; answer in the conversation's language, under 150 words.\n\n"
+        f"Summary so far:\n{previous_summary or '(none)'}\n\nNew messages:\n{conversation}"
     )
-    messages = [SystemMessage(content=system_prompt)] + state["messages"]
+    with telemetry.span("history.summary"):
+        summary = nano_model.invoke([HumanMessage(content=summary_prompt)])
+    telemetry.tokens("nano", summary.usage_metadata)
+    return summary.content
 
-    # First call
+
+history = HistoryManager(HISTORY_MAX_TOKENS, summarizer=summarize_history if HISTORY_SUMMARY else None)
+
+
+TOOL_ROUNDS_EXCEEDED = "⚠️ I could not finish looking this up, please ask again in other words."
+
+
+def tools_failed(tool_outputs: list) -> bool:
+    """whether a tool of the round failed, timed out or returned nothing"""
+    return any(m.status == "error" or not m.content for m in tool_outputs)
+
+
+def final_reply(response, writer, incomplete: bool = False):
+    """the reply saved to the thread: tool calls left after MAX_TOOL_ROUNDS are dropped, because
+    an AIMessage with unanswered tool calls makes every later request of the session fail.
+    Replies given without all tool results are marked "incomplete" in their response_metadata."""
+    if response.tool_calls:
+        print(f"⚠️ tool rounds exceeded, dropping: {[c['name'] for c in response.tool_calls]}")
+        telemetry.count("errors_total", span="chatbot", kind="tool_rounds_exceeded")
+        if not response.content:
+            writer({"token": TOOL_ROUNDS_EXCEEDED})
+        response = AIMessage(content=response.content or TOOL_ROUNDS_EXCEEDED, id=response.id)
+        incomplete = True
+    if incomplete:
+        response.response_metadata = {**response.response_metadata, "incomplete": True}
+    return response
+
+
+def answered_normally(message) -> bool:
+    """whether a turn's reply may be stored in the answer cache"""
+    return bool(message.content) and not message.response_metadata.get("incomplete")
+
+
+def turn_context():
+    """make the node's spans children of the turn span the chat handler passed in the run metadata"""
     try:
-        response = model_with_tools.invoke(messages)
-    except:
-        # just use last two history
-        messages = [SystemMessage(content=system_prompt)] + state["messages"][-2:]
-        response = model_with_tools.invoke(messages)
-
-    # If the model requested a tool
-    if hasattr(response, "tool_calls") and response.tool_calls:
-        tool_outputs = []
-        for tool_call in response.tool_calls:
-            try:
-                if tool_call["name"] == "jina_search":
-                    query = tool_call["args"]["query"]
-                    result = jina_tool.invoke(query)
-                    result_dict = json.loads(result)
-                    summaries = []
-                    print("Search Results number:", len(result_dict))
-                    for r in result_dict:
-                        print("title: ", r['title'])
-                        print("link: ", r['link'])
-                        print("**" * 20)
-                        summary_prompt = f"Summarize this search result in under 5 bullet points:\n\n{r['content']}"
-                        summary = nano_model.invoke([HumanMessage(content=summary_prompt)])
-                        summaries.append(summary.content)
-                    tool_outputs.append(
-                        ToolMessage(content="\n".join(summaries), tool_call_id=tool_call["id"])
-                    )
-                elif tool_call["name"] == "geocode_address":
-                    address = tool_call["args"]["input"]["address"]
-                    result = geocode_address(GeocodeInput(address=address))
-                    tool_outputs.append(
-                        ToolMessage(content=result.url, tool_call_id=tool_call["id"])
-                    )
-            except:
-                tool_outputs.append(
-                    ToolMessage(content="", tool_call_id=tool_call["id"])
-                )
-                continue
-        # Call the model again with tool results
-        response = model_with_tools.invoke(messages + [response] + tool_outputs)
-
-    return {"messages": response}
-
-
-workflow.add_node("chatbot", call_model)
+        trace = get_config().get("metadata", {}).get("trace")
+    except RuntimeError:
+        trace = None
+    return telemetry.activate(*trace) if trace else contextlib.nullcontext()
+
+
+def call_model(state: MessagesState):
+    with turn_context(), telemetry.span("chatbot"):
+        return _call_model(state)
+
+
+def _call_model(state: MessagesState):
+    writer = stream_writer()
+    # the history is trimmed to its token budget up front instead of retrying after an overflow
+    messages = [SystemMessage(content=SYSTEM_PROMPT)] + history.trim(state["messages"])
+    response = stream_model(messages, writer)
+
+    # run the requested tools and call the model again with their results, until it answers
+    incomplete = False
+    for _ in range(MAX_TOOL_ROUNDS):
+        if not response.tool_calls:
+            break
+        report_tool_calls(response.tool_calls, writer)
+        tool_outputs = execute_tool_calls(response.tool_calls)
+        incomplete = incomplete or tools_failed(tool_outputs)
+        messages = messages + [response] + tool_outputs
+        response = stream_model(messages, writer)
+
+    return {"messages": final_reply(response, writer, incomplete)}
+
+
+async def acall_model(state: MessagesState):
+    """async version of call_model: the event loop is only left for blocking tool and summary calls"""
+    with turn_context(), telemetry.span("chatbot"):
+        return await _acall_model(state)
+
+
+async def _acall_model(state: MessagesState):
+    writer = stream_writer()
+    messages = [SystemMessage(content=SYSTEM_PROMPT)] + await history.atrim(state["messages"], blocking_executor)
+    response = await astream_model(messages, writer)
+
+    # run the requested tools and call the model again with their results, until it answers
+    incomplete = False
+    for _ in range(MAX_TOOL_ROUNDS):
+        if not response.tool_calls:
+            break
+        report_tool_calls(response.tool_calls, writer)
+        tool_outputs = await run_blocking(execute_tool_calls, response.tool_calls)
+        incomplete = incomplete or tools_failed(tool_outputs)
+        messages = messages + [response] + tool_outputs
+        response = await astream_model(messages, writer)
+
+    return {"messages": final_reply(response, writer, incomplete)}
+
+
+# app.invoke/stream run call_model, app.ainvoke/astream run acall_model
+workflow.add_node("chatbot", RunnableLambda(call_model, afunc=acall_model))
 workflow.add_edge(START, "chatbot")
 workflow.add_edge("chatbot", END)
 
@@ -109,8 +451,14 @@ workflow.add_edge("chatbot", END)
 memory = MemorySaver()
 app = workflow.compile(checkpointer=memory)
 
+# --- One conversation thread per chat session ---
+# sessions idle for SESSION_IDLE_TIMEOUT seconds are dropped (with their history),
+# and at most MAX_SESSIONS are kept
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SESSION_IDLE_TIMEOUT", 3600))
+MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", 1000))
+sessions = SessionManager(memory, idle_timeout=SESSION_IDLE_TIMEOUT, max_sessions=MAX_SESSIONS)
+
 # --- Run interactive CLI chatbot ---
-config = {"configurable": {"thread_id": "user-123"}}
 
 # while True:
 #     try:
@@ -119,7 +467,7 @@ config = {"configurable": {"thread_id": "user-123"}}
 #             print("👋 Goodbye!")
 #             break
 #
-#         response = app.invoke({"messages": [HumanMessage(content=user_input)]}, config)
+#         response = app.invoke({"messages": [HumanMessage(content=user_input)]}, sessions.config())
 #
 #         # Safely extract bot reply
 #         messages = response.get("messages", [])
@@ -133,22 +481,150 @@ config = {"configurable": {"thread_id": "user-123"}}
 #     except Exception as e:
 #         print(f"⚠️ Error: {e}")
 
+# --- Semantic answer cache in front of the graph ---
+# only first turns are cached and answered from the cache: later turns depend on the conversation
+answer_cache = AnswerCache(threshold=SEMANTIC_CACHE_THRESHOLD, ttl=SEMANTIC_CACHE_TTL,
+                           max_entries=SEMANTIC_CACHE_MAX_ENTRIES) if SEMANTIC_CACHE else None
+
+
+def lookup_answer(user_message: str):
+    """(cached answer or None, question embedding or None) for a first-turn message"""
+    try:
+        with telemetry.span("answer_cache.lookup"):
+            vector = answer_cache.embed(user_message)
+            answer = answer_cache.lookup(vector)
+        telemetry.cache("answer", answer is not None)
+        return answer, vector
+    except Exception as e:
+        print(f"⚠️ answer cache lookup failed: {e!r}")
+        return None, None
+
+
+def cached_turn(user_message: str, answer: str) -> dict:
+    """state update that records a turn answered from the cache in the session's history"""
+    print("✅ answered from the semantic cache:", user_message)
+    return {"messages": [HumanMessage(content=user_message), AIMessage(content=answer)]}
+
+
+def start_turn(request, config: dict):
+    """the root span of a chat turn; the graph nodes get its ids through the run metadata"""
+    turn = telemetry.start_span("turn", session=sessions.session_key(request))
+    config["metadata"] = {"trace": (turn.trace_id, turn.span_id)}
+    return turn
+
+
+def first_update(turn):
+    """record when the user saw the first text of a turn"""
+    if "first_update" not in turn.attrs:
+        turn.attrs["first_update"] = time.time() - turn.start
+        telemetry.observe("turn_first_update_seconds", turn.attrs["first_update"])
+
+
 # Define the chatbot function
-def chat_with_bot(user_message, history):
+def chat_with_bot(user_message, history, request: gr.Request = None):
+    turn, error = None, None
     try:
+        config = sessions.config(request)
+        turn = start_turn(request, config)
+        vector = None
+        if answer_cache is not None and not app.get_state(config).values.get("messages"):
+            with telemetry.activate(turn.trace_id, turn.span_id):
+                answer, vector = lookup_answer(user_message)
+            if answer is not None:
+                turn.attrs["cached"] = True
+                app.update_state(config, cached_turn(user_message, answer), as_node="chatbot")
+                return answer
         response = app.invoke({"messages": [HumanMessage(content=user_message)]}, config)
         bot_reply = response["messages"][-1].content
+        if vector is not None and answered_normally(response["messages"][-1]):
+            answer_cache.store(vector, user_message, bot_reply)
         return bot_reply
     except Exception as e:
+        error = e
         return f"⚠️ Error: {e}"
+    finally:
+        if turn is not None:
+            turn.end(error)
+
+
+async def achat_with_bot(user_message, history, request: gr.Request = None):
+    """Stream the reply: tool progress while tools run, then the answer as its tokens arrive"""
+    reply, progress = "", []
+    turn, error = None, None
+    try:
+        config = sessions.config(request)
+        turn = start_turn(request, config)
+        vector = None
+        if answer_cache is not None and not (await app.aget_state(config)).values.get("messages"):
+            with telemetry.activate(turn.trace_id, turn.span_id):
+                answer, vector = await run_blocking(lookup_answer, user_message)
+            if answer is not None:
+                turn.attrs["cached"] = True
+                await app.aupdate_state(config, cached_turn(user_message, answer), as_node="chatbot")
+                first_update(turn)
+                yield answer
+                return
+        async for event in app.astream({"messages": [HumanMessage(content=user_message)]}, config,
+                                       stream_mode="custom"):
+            if "token" in event:
+                reply += event["token"]
+                first_update(turn)
+                yield reply
+            elif "tool" in event:
+                # text streamed before a tool call is replaced by the answer that uses its result
+                reply = ""
+                label = TOOL_PROGRESS.get(event["tool"], f"🛠️ {event['tool']}")
+                progress.append(f"{label}: {event['detail']}…" if event["detail"] else f"{label}…")
+                first_update(turn)
+                yield "\n".join(progress)
+        if vector is not None and reply:
+            # the saved reply tells whether the turn finished normally
+            last = (await app.aget_state(config)).values["messages"][-1]
+            if answered_normally(last):
+                answer_cache.store(vector, user_message, last.content)
+    except Exception as e:
+        error = e
+        yield f"⚠️ Error: {e}"
+    finally:
+        # also reached when the client goes away in the middle of the stream
+        if turn is not None:
+            turn.end(error)
 
 
 # Create a ChatInterface
 demo = gr.ChatInterface(
-    fn=chat_with_bot,
+    fn=achat_with_bot,
     title="🤖 Tourism Chatbot with Jina Search",
-    description="Ask me about destinations, attractions, or travel tips!"
+    description="Ask me about destinations, attractions, or travel tips!",
+    concurrency_limit=CHAT_CONCURRENCY
 )
+demo.queue(max_size=CHAT_QUEUE_SIZE, default_concurrency_limit=CHAT_CONCURRENCY)
+
+
+def end_session(request: gr.Request):
+    """free a session's history as soon as its browser tab is closed"""
+    sessions.end(request)
+
+
+demo.unload(end_session)
+
+
+def start_metrics_server(port: int = None):
+    """serve the metrics endpoints; a port that is taken only costs the endpoints, not the chatbot"""
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+    try:
+        server = telemetry.serve(port)
+    except OSError as e:
+        print(f"⚠️ metrics endpoint disabled, could not listen on port {port}: {e}")
+        return None
+    print(f"✅ metrics on http://127.0.0.1:{port}/metrics")
+    return server
+
 
 if __name__ == "__main__":
+    start_metrics_server()
+    if METRICS_PATH:
+        telemetry.write_every(METRICS_PATH, METRICS_INTERVAL)
     demo.launch()
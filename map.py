@@ -1,6 +1,27 @@
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel, Field
-import requests
+
+from neshan_client import NeshanClient
+from telemetry import telemetry
+from utils.cache import TTLCache
+from utils.text_processing import TextProcessor
+
+NOT_FOUND = "Not found"
+
+# Geocoding cache: found addresses are kept for GEOCODE_CACHE_TTL seconds,
+# "Not found" answers only for GEOCODE_NOT_FOUND_TTL seconds
+GEOCODE_CACHE_PATH = os.environ.get("GEOCODE_CACHE_PATH", "./db/geocode_cache.sqlite")
+GEOCODE_CACHE_TTL = float(os.environ.get("GEOCODE_CACHE_TTL", 30 * 24 * 3600))
+GEOCODE_NOT_FOUND_TTL = float(os.environ.get("GEOCODE_NOT_FOUND_TTL", 24 * 3600))
+
+geocode_cache = TTLCache(GEOCODE_CACHE_PATH, maxsize=2048, ttl=GEOCODE_CACHE_TTL)
+
+# number of addresses geocoded at the same time by geocode_many / ageocode_many
+GEOCODE_CONCURRENCY = int(os.environ.get("GEOCODE_CONCURRENCY", 5))
+
+neshan = NeshanClient()
 
 
 class GeocodeInput(BaseModel):
@@ -11,23 +32,59 @@ class GeocodeOutput(BaseModel):
     url: str = Field(..., description="لینک مستقیم گوگل‌مپ برای نمایش مکان")
 
 
-def geocode_address(input: GeocodeInput) -> GeocodeOutput:
-    """دریافت لینک گوگل‌مپ از روی آدرس متنی"""
-    url = "https://api.neshan.org/v6/geocoding"
-    params = {
-        "address": input.address
-    }
-    headers = {
-        "User-Agent": "langgraph-geocoder",
-        "Api-Key": os.environ.get("NESHAN_API_KEY")
-    }
-    resp = requests.get(url, params=params, headers=headers)
-    resp.raise_for_status()
-    data = resp.json()
+def lookup_address(address: str) -> str:
+    """Google Maps link (or "Not found") for an address, served from the cache when possible"""
+    key = TextProcessor.normalize_key(address)
+    cached = geocode_cache.get(key)
+    telemetry.cache("geocode", cached is not None)
+    if cached is not None:
+        return cached
+
+    with telemetry.span("neshan.geocode"):
+        data = neshan.geocode(address)
     if not data:
-        return GeocodeOutput(url="Not found")
+        geocode_cache.set(key, NOT_FOUND, ttl=GEOCODE_NOT_FOUND_TTL)
+        return NOT_FOUND
 
     lat, lon = data["location"]["y"], data["location"]["x"]
     gmaps_url = f"https://www.google.com/maps/search/?api=1&query={lat},{lon}"
-    return GeocodeOutput(url=gmaps_url)
+    geocode_cache.set(key, gmaps_url)
+    return gmaps_url
+
+
+def geocode_address(input: GeocodeInput) -> GeocodeOutput:
+    """دریافت لینک گوگل‌مپ از روی آدرس متنی"""
+    return GeocodeOutput(url=lookup_address(input.address))
+
+
+def _lookup_or_not_found(address: str) -> str:
+    try:
+        return lookup_address(address)
+    except Exception as e:
+        print(f"⚠️ geocoding failed for {address}: {e!r}")
+        return NOT_FOUND
+
+
+def geocode_many(addresses: list[str], max_concurrency: int = GEOCODE_CONCURRENCY) -> list[GeocodeOutput]:
+    """Geocode a list of addresses with bounded concurrency, keeping their order.
+    Equivalent addresses are looked up once; failed lookups return "Not found" (uncached)."""
+    unique = list({TextProcessor.normalize_key(a): a for a in addresses}.items())
+    if not unique:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(unique)))) as executor:
+        urls = dict(zip((k for k, _ in unique), executor.map(_lookup_or_not_found, (a for _, a in unique))))
+    return [GeocodeOutput(url=urls[TextProcessor.normalize_key(a)]) for a in addresses]
+
+
+async def ageocode_many(addresses: list[str], max_concurrency: int = GEOCODE_CONCURRENCY) -> list[GeocodeOutput]:
+    """async version of geocode_many"""
+    unique = list({TextProcessor.normalize_key(a): a for a in addresses}.items())
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def lookup(address):
+        async with semaphore:
+            return await asyncio.to_thread(_lookup_or_not_found, address)
 
+    found = await asyncio.gather(*(lookup(a) for _, a in unique))
+    urls = dict(zip((k for k, _ in unique), found))
+    return [GeocodeOutput(url=urls[TextProcessor.normalize_key(a)]) for a in addresses]
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# overridable so that a local stub can stand in for the API (benchmarks)
+GEOCODING_URL = os.environ.get("NESHAN_GEOCODING_URL", "https://api.neshan.org/v6/geocoding")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class NeshanClient:
+    """Neshan geocoding client with a shared connection pool, explicit timeouts
+    and retries with jittered exponential backoff on 429/5xx and connection errors."""
+
+    def __init__(self, timeout: float = None, connect_timeout: float = 3.05, max_retries: int = 3,
+                 backoff_factor: float = 0.5, max_backoff: float = 8.0, pool_size: int = 10):
+        self.timeout = (connect_timeout, timeout or float(os.environ.get("NESHAN_TIMEOUT", 10)))
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt: int, resp=None) -> float:
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After")
+            if isinstance(retry_after, str) and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        delay = self.backoff_factor * (2 ** attempt)
+        return min(delay * random.uniform(0.5, 1.5), self.max_backoff)
+
+    def geocode(self, address: str) -> dict:
+        """raw Neshan geocoding response for an address (empty dict when nothing was found)"""
+        params = {
+            "address": address
+        }
+        headers = {
+            "User-Agent": "langgraph-geocoder",
+            "Api-Key": os.environ.get("NESHAN_API_KEY")
+        }
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                resp = self.session.get(GEOCODING_URL, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if resp.status_code in RETRY_STATUSES and not last_attempt:
+                time.sleep(self._backoff(attempt, resp))
+                continue
+            resp.raise_for_status()
+            return resp.json()
+
+    async def ageocode(self, address: str) -> dict:
+        return await asyncio.to_thread(self.geocode, address)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,83 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# session key used when a handler is called without a Gradio request (scripts, tests)
+LOCAL_SESSION = "local"
+
+
+class SessionManager:
+    """Maps chat sessions (Gradio session hashes) to their own LangGraph thread ids.
+    Sessions idle for more than `idle_timeout` seconds expire, and at most `max_sessions`
+    stay alive (the least recently active one is dropped first). The checkpoint history
+    of a dropped session is deleted from the checkpointer."""
+
+    def __init__(self, checkpointer=None, idle_timeout: float = 3600, max_sessions: int = 1000):
+        self.checkpointer = checkpointer
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        # session key -> (thread id, last activity), least recently active first
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def session_key(request) -> str:
+        return getattr(request, "session_hash", None) or LOCAL_SESSION
+
+    def _drop(self, thread_id: str):
+        if self.checkpointer is not None:
+            try:
+                self.checkpointer.delete_thread(thread_id)
+            except Exception as e:
+                print(f"⚠️ could not delete thread {thread_id}: {e!r}")
+
+    def _evict(self, now: float) -> list:
+        dropped = []
+        while self._sessions:
+            key, (thread_id, last_seen) = next(iter(self._sessions.items()))
+            if last_seen > now - self.idle_timeout and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[key]
+            dropped.append(thread_id)
+        return dropped
+
+    def thread_id(self, request=None) -> str:
+        """thread id of the request's session; a new thread is started for new or expired sessions"""
+        key = self.session_key(request)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.pop(key, None)
+            dropped = []
+            if entry is not None and entry[1] > now - self.idle_timeout:
+                thread_id = entry[0]
+            else:
+                if entry is not None:
+                    dropped.append(entry[0])
+                thread_id = f"session-{uuid.uuid4().hex}"
+            self._sessions[key] = (thread_id, now)
+            dropped += self._evict(now)
+        for old in dropped:
+            self._drop(old)
+        return thread_id
+
+    def config(self, request=None) -> dict:
+        """LangGraph run config for the request's session"""
+        return {"configurable": {"thread_id": self.thread_id(request)}}
+
+    def end(self, request=None):
+        """forget a session (e.g. when its browser tab is closed) and delete its history"""
+        with self._lock:
+            entry = self._sessions.pop(self.session_key(request), None)
+        if entry is not None:
+            self._drop(entry[0])
+
+    def purge_idle(self):
+        """drop every session that has been idle for longer than idle_timeout"""
+        with self._lock:
+            dropped = self._evict(time.monotonic())
+        for thread_id in dropped:
+            self._drop(thread_id)
+
+    def __len__(self):
+        return len(self._sessions)
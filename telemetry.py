@@ -0,0 +1,291 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# upper bounds (seconds) of the span duration histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# (trace id, span id) of the span the current code runs in
+_current = contextvars.ContextVar("telemetry_span", default=None)
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple, **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Span:
+    """one timed operation of a trace; finished with end()"""
+
+    def __init__(self, telemetry, name: str, trace_id: str, parent_id: str, attrs: dict):
+        self.telemetry = telemetry
+        self.name = name
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attrs = attrs
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    def end(self, error: BaseException = None):
+        self.telemetry._finish(self, time.perf_counter() - self._started, error)
+
+
+class JsonlSink:
+    """span sink that appends every span as one JSON line to a file"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __call__(self, span: dict):
+        line = json.dumps(span, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Telemetry:
+    """Per-request spans and aggregate metrics.
+    Every finished span is observed in a duration histogram (by span name), counted as an
+    error when it raised, and passed to the sinks: callables taking the span as a dict
+    (trace_id, span_id, parent_id, name, start, duration, status, error, attributes).
+    Counters hold cache hits/misses, token counts and errors; snapshot() and prometheus()
+    expose the aggregates."""
+
+    def __init__(self, sinks=(), buckets=DEFAULT_BUCKETS):
+        self.sinks = list(sinks)
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        # key -> [bucket counts..., +Inf count], sum
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    # --- spans ---
+
+    def start_span(self, name: str, trace_id: str = None, parent_id: str = None, **attrs) -> Span:
+        """a span that is ended explicitly; by default a child of the current span"""
+        current = _current.get()
+        if trace_id is None and current is not None:
+            trace_id, parent_id = current
+        return Span(self, name, trace_id or uuid.uuid4().hex, parent_id, attrs)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """time the block as a child span of the current one; yields the Span (its attrs can be extended)"""
+        span = self.start_span(name, **attrs)
+        token = _current.set((span.trace_id, span.span_id))
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        else:
+            span.end()
+        finally:
+            _current.reset(token)
+
+    @contextmanager
+    def activate(self, trace_id: str, span_id: str):
+        """make spans started in the block children of a span started elsewhere"""
+        token = _current.set((trace_id, span_id) if trace_id else None)
+        try:
+            yield
+        finally:
+            _current.reset(token)
+
+    @staticmethod
+    def current() -> tuple:
+        """(trace id, span id) of the current span, or None"""
+        return _current.get()
+
+    @staticmethod
+    def in_context(fn):
+        """fn bound to a copy of the current context, for thread pools (which do not copy it)"""
+        return functools.partial(contextvars.copy_context().run, fn)
+
+    def _finish(self, span: Span, duration: float, error: BaseException = None):
+        self.observe("span_duration_seconds", duration, span=span.name)
+        if error is not None:
+            self.count("errors_total", span=span.name)
+        record = {
+            "trace_id": span.trace_id, "span_id": span.span_id, "parent_id": span.parent_id, "name": span.name,
+            "start": span.start, "duration": duration, "status": "error" if error is not None else "ok",
+            "error": repr(error) if error is not None else None, "attributes": span.attrs,
+        }
+        for sink in self.sinks:
+            try:
+                sink(record)
+            except Exception as e:
+                print(f"⚠️ span sink failed: {e!r}")
+
+    # --- metrics ---
+
+    def count(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+
+    def cache(self, name: str, hit: bool):
+        """count a lookup of a cache"""
+        self.count("cache_requests_total", cache=name, result="hit" if hit else "miss")
+
+    def tokens(self, model: str, usage: dict):
+        """count the prompt/completion tokens of a model response (LangChain usage_metadata)"""
+        if isinstance(usage, dict):
+            self.count("tokens_total", usage.get("input_tokens", 0), model=model, kind="prompt")
+            self.count("tokens_total", usage.get("output_tokens", 0), model=model, kind="completion")
+
+    def snapshot(self) -> dict:
+        """aggregates as plain data: counters, histograms (with percentile estimates) and cache hit rates"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(counts), total) for key, (counts, total) in self._histograms.items()}
+
+        hits = {}
+        for (name, labels), value in counters.items():
+            if name == "cache_requests_total":
+                labels = dict(labels)
+                hits.setdefault(labels["cache"], {"hit": 0, "miss": 0})[labels["result"]] += value
+        return {
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(counters.items())],
+            "histograms": [
+                {"name": name, "labels": dict(labels), "count": sum(counts), "sum": total,
+                 "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], counts)),
+                 **{f"p{p}": self._quantile(counts, p / 100) for p in (50, 90, 99)}}
+                for (name, labels), (counts, total) in sorted(histograms.items())
+            ],
+            "cache_hit_rates": {cache: c["hit"] / (c["hit"] + c["miss"]) for cache, c in sorted(hits.items())},
+        }
+
+    def _quantile(self, counts: list, q: float) -> float:
+        """upper bound of the bucket holding quantile q (the last finite bound for +Inf)"""
+        target, seen = q * sum(counts), 0
+        for bound, count in zip(self.buckets + (self.buckets[-1],), counts):
+            seen += count
+            if seen >= target and count:
+                return bound
+        return self.buckets[-1]
+
+    def prometheus(self, prefix: str = "chatbot_") -> str:
+        """aggregates in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(counts), total)) for key, (counts, total) in self._histograms.items())
+        lines, typed = [], set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}{name} counter")
+                typed.add(name)
+            lines.append(f"{prefix}{name}{_labels(labels)} {value}")
+        for (name, labels), (counts, total) in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip([str(b) for b in self.buckets] + ["+Inf"], counts):
+                cumulative += count
+                lines.append(f"{prefix}{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{prefix}{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{prefix}{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # --- exporters ---
+
+    def write(self, path: str):
+        """write snapshot() to a JSON file (replaced atomically)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def write_every(self, path: str, interval: float) -> threading.Thread:
+        """rewrite the metrics file every `interval` seconds in a daemon thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write(path)
+                except Exception as e:
+                    print(f"⚠️ could not write metrics to {path}: {e!r}")
+
+        thread = threading.Thread(target=run, name="metrics-file", daemon=True)
+        thread.start()
+        return thread
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """serve /metrics (Prometheus text) and /metrics.json (snapshot) in a daemon thread"""
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = telemetry.prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(telemetry.snapshot(), ensure_ascii=False), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+
+# the process-wide instance used by main and map
+telemetry = Telemetry()
@@ -0,0 +1,99 @@
+"""
+Unit tests for answer_cache.py
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import patch
+
+# Only import if available, else skip tests
+try:
+    from answer_cache import AnswerCache
+    ANSWER_CACHE_AVAILABLE = True
+except ImportError:
+    ANSWER_CACHE_AVAILABLE = False
+
+pytestmark = pytest.mark.skipif(not ANSWER_CACHE_AVAILABLE, reason="answer_cache dependencies not available")
+
+
+class FakeEmbeddings:
+    """embeds each known text as a fixed 3-d vector"""
+
+    VECTORS = {
+        "isfahan sights": [1.0, 0.0, 0.0],
+        "what to see in isfahan": [0.98, 0.2, 0.0],
+        "shiraz food": [0.0, 1.0, 0.0],
+        "yazd hotels": [0.0, 0.0, 1.0],
+    }
+
+    def embed_query(self, text):
+        return self.VECTORS[text]
+
+
+def _store(cache, question, answer):
+    cache.store(cache.embed(question), question, answer)
+
+
+def _lookup(cache, question):
+    return cache.lookup(cache.embed(question))
+
+
+def test_similar_question_gets_cached_answer():
+    """Test a paraphrase above the threshold is answered from the cache"""
+    cache = AnswerCache(FakeEmbeddings(), threshold=0.95)
+    _store(cache, "isfahan sights", "Naqsh-e Jahan square")
+
+    assert _lookup(cache, "what to see in isfahan") == "Naqsh-e Jahan square"
+    assert _lookup(cache, "shiraz food") is None
+
+
+def test_threshold_is_respected():
+    """Test questions below the similarity threshold miss"""
+    cache = AnswerCache(FakeEmbeddings(), threshold=0.99)
+    _store(cache, "isfahan sights", "Naqsh-e Jahan square")
+    assert _lookup(cache, "what to see in isfahan") is None
+
+
+def test_empty_cache_misses():
+    """Test lookups on an empty cache"""
+    cache = AnswerCache(FakeEmbeddings())
+    assert _lookup(cache, "isfahan sights") is None
+    assert len(cache) == 0
+
+
+def test_entries_expire():
+    """Test expired answers are not returned and are removed"""
+    cache = AnswerCache(FakeEmbeddings(), ttl=100)
+    with patch('answer_cache.time.time', return_value=1000.0):
+        _store(cache, "isfahan sights", "old answer")
+    with patch('answer_cache.time.time', return_value=1050.0):
+        assert _lookup(cache, "isfahan sights") == "old answer"
+    with patch('answer_cache.time.time', return_value=1200.0):
+        assert _lookup(cache, "isfahan sights") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    """Test max_entries drops the least recently used answer"""
+    cache = AnswerCache(FakeEmbeddings(), max_entries=2)
+    _store(cache, "isfahan sights", "a")
+    _store(cache, "shiraz food", "b")
+    assert _lookup(cache, "isfahan sights") == "a"
+    _store(cache, "yazd hotels", "c")
+
+    assert len(cache) == 2
+    assert _lookup(cache, "shiraz food") is None
+    assert _lookup(cache, "isfahan sights") == "a"
+    assert _lookup(cache, "yazd hotels") == "c"
+
+
+def test_clear():
+    """Test clear empties the cache"""
+    cache = AnswerCache(FakeEmbeddings())
+    _store(cache, "isfahan sights", "a")
+    cache.clear()
+    assert len(cache) == 0
+    assert _lookup(cache, "isfahan sights") is None
@@ -0,0 +1,106 @@
+"""
+Unit tests for utils/cache.py
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import patch
+
+from utils.cache import TTLCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache" / "test.sqlite")
+
+
+def test_get_missing_key_returns_default(cache_path):
+    """Test get returns the default for unknown keys"""
+    cache = TTLCache(cache_path)
+    assert cache.get("missing") is None
+    assert cache.get("missing", "fallback") == "fallback"
+
+
+def test_set_and_get_roundtrip(cache_path):
+    """Test values are returned from memory and from disk"""
+    cache = TTLCache(cache_path)
+    cache.set("key", {"url": "https://example.com", "items": [1, 2]})
+    assert cache.get("key") == {"url": "https://example.com", "items": [1, 2]}
+    cache.close()
+
+    reopened = TTLCache(cache_path)
+    assert reopened.get("key") == {"url": "https://example.com", "items": [1, 2]}
+    reopened.close()
+
+
+def test_entries_expire(cache_path):
+    """Test entries are dropped after their ttl, both in memory and on disk"""
+    cache = TTLCache(cache_path, ttl=100)
+    with patch('utils.cache.time.time', return_value=1000.0):
+        cache.set("short", "a", ttl=10)
+        cache.set("long", "b")
+
+    with patch('utils.cache.time.time', return_value=1050.0):
+        assert cache.get("short") is None
+        assert cache.get("long") == "b"
+
+    cache._memory.clear()
+    with patch('utils.cache.time.time', return_value=1050.0):
+        assert cache.get("long") == "b"
+    with patch('utils.cache.time.time', return_value=1200.0):
+        assert cache.get("long") is None
+
+
+def test_memory_lru_is_bounded(cache_path):
+    """Test the in-process LRU keeps at most maxsize entries"""
+    cache = TTLCache(cache_path, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert list(cache._memory) == ["a", "c"]
+    # evicted entries are still served from disk
+    assert cache.get("b") == 2
+
+
+def test_memory_only_cache():
+    """Test a cache without a path works in memory only"""
+    cache = TTLCache(None)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    cache.clear()
+    assert cache.get("k") is None
+
+
+def test_purge_expired(cache_path):
+    """Test purge_expired removes only expired rows"""
+    cache = TTLCache(cache_path)
+    with patch('utils.cache.time.time', return_value=1000.0):
+        cache.set("old", 1, ttl=1)
+        cache.set("new", 2, ttl=1000)
+    with patch('utils.cache.time.time', return_value=1500.0):
+        cache.purge_expired()
+        rows = cache._db().execute("SELECT key FROM cache").fetchall()
+    assert rows == [("new",)]
+
+
+def test_disk_entries_are_bounded(cache_path):
+    """Test max_entries keeps the rows that expire last"""
+    cache = TTLCache(cache_path, maxsize=10, max_entries=2)
+    with patch('utils.cache.time.time', return_value=1000.0):
+        cache.set("a", 1, ttl=30)
+        cache.set("b", 2, ttl=10)
+        cache.set("c", 3, ttl=20)
+        rows = cache._db().execute("SELECT key FROM cache ORDER BY key").fetchall()
+    assert rows == [("a",), ("c",)]
+    cache.close()
+
+    reopened = TTLCache(cache_path, max_entries=2)
+    with patch('utils.cache.time.time', return_value=1001.0):
+        assert reopened.get("b") is None
+        assert reopened.get("a") == 1
+    reopened.close()
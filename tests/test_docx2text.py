@@ -0,0 +1,193 @@
+"""
+Unit tests for utils/docx2text.py
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import zipfile
+import pytest
+
+# Only import if available, else skip tests
+try:
+    from utils.docx2text import docx_to_text, iter_docx_blocks
+    from utils.loaders.docx_loader import DocxLoader
+    DOCX2TEXT_AVAILABLE = True
+except ImportError:
+    DOCX2TEXT_AVAILABLE = False
+
+NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/></Relationships>'
+)
+DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering" '
+    'Target="numbering.xml"/></Relationships>'
+)
+STYLES = (
+    f'<w:styles {NS}>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="a1"><w:name w:val="Custom Title"/>'
+    '<w:pPr><w:outlineLvl w:val="2"/></w:pPr></w:style>'
+    '</w:styles>'
+)
+NUMBERING = (
+    f'<w:numbering {NS}>'
+    '<w:abstractNum w:abstractNumId="0"><w:lvl w:ilvl="0"><w:numFmt w:val="bullet"/></w:lvl></w:abstractNum>'
+    '<w:abstractNum w:abstractNumId="1"><w:lvl w:ilvl="0"><w:numFmt w:val="decimal"/></w:lvl></w:abstractNum>'
+    '<w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num>'
+    '<w:num w:numId="2"><w:abstractNumId w:val="1"/></w:num>'
+    '</w:numbering>'
+)
+
+
+def paragraph(text, style=None, num_id=None):
+    ppr = ""
+    if style:
+        ppr += f'<w:pStyle w:val="{style}"/>'
+    if num_id:
+        ppr += f'<w:numPr><w:ilvl w:val="0"/><w:numId w:val="{num_id}"/></w:numPr>'
+    ppr = f"<w:pPr>{ppr}</w:pPr>" if ppr else ""
+    return f'<w:p>{ppr}<w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def table(rows):
+    cells = lambda row: "".join(f"<w:tc>{paragraph(c)}</w:tc>" for c in row)
+    return "<w:tbl>" + "".join(f"<w:tr>{cells(row)}</w:tr>" for row in rows) + "</w:tbl>"
+
+
+def make_docx(path, body):
+    """write a minimal DOCX package (readable by mammoth too) with the given body XML"""
+    with zipfile.ZipFile(path, "w") as docx:
+        docx.writestr("[Content_Types].xml", CONTENT_TYPES)
+        docx.writestr("_rels/.rels", RELS)
+        docx.writestr("word/_rels/document.xml.rels", DOCUMENT_RELS)
+        docx.writestr("word/styles.xml", STYLES)
+        docx.writestr("word/numbering.xml", NUMBERING)
+        docx.writestr("word/document.xml", f"<w:document {NS}><w:body>{body}</w:body></w:document>")
+    return str(path)
+
+
+@pytest.fixture
+def sample_docx(tmp_path):
+    body = (
+        paragraph("راهنمای سفر", style="Heading1")
+        + paragraph("شیراز شهر شعر است.")
+        + paragraph("جاهای دیدنی", style="Heading2")
+        + paragraph("حافظیه", num_id=1)
+        + paragraph("سعدیه", num_id=1)
+        + paragraph("اول", num_id=2)
+        + paragraph("دوم", num_id=2)
+        + paragraph("بخش سوم", style="a1")
+        + paragraph("   ")
+        + table([["نام", "شهر"], ["تخت جمشید", "مرودشت"]])
+    )
+    return make_docx(tmp_path / "guide.docx", body)
+
+
+@pytest.mark.skipif(not DOCX2TEXT_AVAILABLE, reason="docx2text module not available")
+def test_docx_to_text_emits_headings_lists_tables_and_paragraphs(sample_docx):
+    """Test the fast converter output for every block type"""
+    assert docx_to_text(sample_docx) == "\n\n".join([
+        "# راهنمای سفر",
+        "شیراز شهر شعر است.",
+        "## جاهای دیدنی",
+        "* حافظیه",
+        "* سعدیه",
+        "1. اول",
+        "2. دوم",
+        "### بخش سوم",
+        "| نام | شهر |\n| --- | --- |\n| تخت جمشید | مرودشت |",
+    ])
+
+
+@pytest.mark.skipif(not DOCX2TEXT_AVAILABLE, reason="docx2text module not available")
+def test_docx_to_text_handles_breaks_tabs_and_pipes_in_cells(tmp_path):
+    """Test line breaks, tabs and | characters inside table cells"""
+    body = (
+        '<w:p><w:r><w:t>خط اول</w:t><w:br/><w:t>خط دوم</w:t><w:tab/><w:t>ادامه</w:t></w:r></w:p>'
+        + table([["a|b", "c"]])
+    )
+    path = make_docx(tmp_path / "breaks.docx", body)
+    assert docx_to_text(path) == "خط اول\nخط دوم\tادامه\n\n| a\\|b | c |\n| --- | --- |"
+
+
+def text_box(anchor, *paragraphs):
+    """a paragraph anchoring a text box, stored as Word does: a wps shape in mc:Choice and a
+    VML copy of the same text in mc:Fallback"""
+    content = "<w:txbxContent>" + "".join(paragraph(text) for text in paragraphs) + "</w:txbxContent>"
+    return (
+        f'<w:p><w:r><w:t xml:space="preserve">{anchor}</w:t></w:r><w:r>'
+        '<mc:AlternateContent xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+        'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+        'xmlns:v="urn:schemas-microsoft-com:vml">'
+        f'<mc:Choice Requires="wps"><w:drawing><wps:wsp><wps:txbx>{content}</wps:txbx></wps:wsp></w:drawing></mc:Choice>'
+        f'<mc:Fallback><w:pict><v:shape><v:textbox>{content}</v:textbox></v:shape></w:pict></mc:Fallback>'
+        '</mc:AlternateContent></w:r></w:p>'
+    )
+
+
+@pytest.mark.skipif(not DOCX2TEXT_AVAILABLE, reason="docx2text module not available")
+def test_docx_to_text_reads_text_boxes_once_after_their_anchor(tmp_path):
+    """Test the mc:Fallback copy of a text box is skipped and its text follows the anchor paragraph"""
+    body = paragraph("قبل") + text_box("لنگر", "کادر متن", "خط دوم کادر") + paragraph("بعد")
+    path = make_docx(tmp_path / "textbox.docx", body)
+    assert docx_to_text(path) == "قبل\n\nلنگر\n\nکادر متن\n\nخط دوم کادر\n\nبعد"
+
+    empty_anchor = make_docx(tmp_path / "empty_anchor.docx", paragraph("قبل") + text_box("", "کادر متن"))
+    assert docx_to_text(empty_anchor) == "قبل\n\nکادر متن"
+
+
+@pytest.mark.skipif(not DOCX2TEXT_AVAILABLE, reason="docx2text module not available")
+def test_docx_to_text_without_styles_or_numbering(tmp_path):
+    """Test documents without styles.xml / numbering.xml"""
+    path = tmp_path / "plain.docx"
+    with zipfile.ZipFile(path, "w") as docx:
+        docx.writestr("word/document.xml", f"<w:document {NS}><w:body>{paragraph('سلام', num_id=1)}</w:body></w:document>")
+    assert docx_to_text(str(path)) == "* سلام"
+
+
+@pytest.mark.skipif(not DOCX2TEXT_AVAILABLE, reason="docx2text module not available")
+def test_docx_loader_fast_mode_streams_blocks(sample_docx):
+    """Test iter_load yields one block at a time and joins to load()"""
+    loader = DocxLoader(mode="fast")
+    blocks = list(loader.iter_load(path=sample_docx))
+    assert blocks[0] == "# راهنمای سفر"
+    assert len(blocks) == len(list(iter_docx_blocks(sample_docx)))
+    assert "".join(blocks) == loader.load(path=sample_docx)
+
+
+@pytest.mark.skipif(not DOCX2TEXT_AVAILABLE, reason="docx2text module not available")
+def test_docx_loader_fidelity_mode_uses_mammoth(sample_docx):
+    """Test the fidelity mode keeps the mammoth + markdownify conversion"""
+    pytest.importorskip("mammoth")
+    from utils.docx2md import docx_to_markdown
+    text = DocxLoader(mode="fidelity").load(path=sample_docx)
+    assert text == docx_to_markdown(sample_docx)
+    assert "# راهنمای سفر" in text
+
+
+@pytest.mark.skipif(not DOCX2TEXT_AVAILABLE, reason="docx2text module not available")
+def test_docx_loader_rejects_unknown_mode():
+    """Test an unknown mode raises ValueError"""
+    with pytest.raises(ValueError, match="unknown DOCX mode"):
+        DocxLoader(mode="slow")
@@ -0,0 +1,119 @@
+"""
+Unit tests for utils/embedding_cache.py
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import patch
+
+try:
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from utils.embedding_cache import CachedEmbeddings
+    EMBEDDING_CACHE_AVAILABLE = True
+except ImportError:
+    EMBEDDING_CACHE_AVAILABLE = False
+
+pytestmark = pytest.mark.skipif(not EMBEDDING_CACHE_AVAILABLE, reason="embedding cache dependencies not available")
+
+
+@pytest.fixture
+def fake():
+    return DeterministicFakeEmbedding(size=8)
+
+
+def test_returns_same_vectors_as_model(fake, tmp_path):
+    """Test cached vectors match the wrapped model's (float32) output"""
+    cache = CachedEmbeddings(fake, str(tmp_path), model_name="fake")
+    texts = ["اصفهان", "تهران", "شیراز"]
+    vectors = cache.embed_documents(texts)
+    expected = fake.embed_documents(texts)
+    assert len(vectors) == 3
+    for v, e in zip(vectors, expected):
+        assert v == pytest.approx(e, rel=1e-6)
+
+
+def test_only_missing_texts_are_embedded(fake, tmp_path):
+    """Test repeated and normalized-equal texts are embedded once"""
+    cache = CachedEmbeddings(fake, str(tmp_path), model_name="fake")
+    with patch.object(DeterministicFakeEmbedding, 'embed_documents', autospec=True,
+                      side_effect=lambda self, texts: [[float(len(t))] * 8 for t in texts]) as mock_embed:
+        first = cache.embed_documents(["اصفهان", "تهران", "اصفهان"])
+        second = cache.embed_documents(["تهران", "  اصفهان\n", "شیراز"])
+
+    assert [call.args[1] for call in mock_embed.call_args_list] == [["اصفهان", "تهران"], ["شیراز"]]
+    assert first[0] == first[2] == second[1]
+    assert first[1] == second[0]
+
+
+def test_cache_persists_between_instances(fake, tmp_path):
+    """Test vectors are reused by a new instance on the same directory"""
+    CachedEmbeddings(fake, str(tmp_path), model_name="fake").embed_documents(["اصفهان", "تهران"])
+
+    reopened = CachedEmbeddings(fake, str(tmp_path), model_name="fake")
+    with patch.object(DeterministicFakeEmbedding, 'embed_documents', autospec=True) as mock_embed:
+        vectors = reopened.embed_documents(["تهران", "اصفهان"])
+        mock_embed.assert_not_called()
+    assert vectors[0] == pytest.approx(fake.embed_documents(["تهران"])[0], rel=1e-6)
+
+
+def test_cache_is_keyed_by_model(fake, tmp_path):
+    """Test different model names do not share vectors"""
+    CachedEmbeddings(fake, str(tmp_path), model_name="model-a").embed_documents(["اصفهان"])
+    other = CachedEmbeddings(fake, str(tmp_path), model_name="model-b")
+    with patch.object(DeterministicFakeEmbedding, 'embed_documents', autospec=True,
+                      side_effect=lambda self, texts: [[0.0] * 8 for _ in texts]) as mock_embed:
+        other.embed_documents(["اصفهان"])
+        mock_embed.assert_called_once()
+
+
+def test_embed_query_is_passed_through(fake, tmp_path):
+    """Test queries are embedded by the wrapped model"""
+    cache = CachedEmbeddings(fake, str(tmp_path), model_name="fake")
+    assert cache.embed_query("اصفهان") == fake.embed_query("اصفهان")
+    assert cache.embed_documents([]) == []
+
+
+def test_repeated_queries_are_embedded_once(fake, tmp_path):
+    """Test query vectors are kept in memory for the most recent queries"""
+    cache = CachedEmbeddings(fake, str(tmp_path), model_name="fake", query_cache_size=2)
+    with patch.object(DeterministicFakeEmbedding, 'embed_query', autospec=True,
+                      side_effect=lambda self, text: [float(len(text))] * 8) as mock_embed:
+        first = cache.embed_query("اصفهان")
+        assert cache.embed_query(" اصفهان ") == first
+        cache.embed_query("تهران")
+        cache.embed_query("شیراز")
+        cache.embed_query("اصفهان")
+
+    assert [call.args[1] for call in mock_embed.call_args_list] == ["اصفهان", "تهران", "شیراز", "اصفهان"]
+
+
+def test_torn_tail_is_dropped_before_appending(fake, tmp_path):
+    """Test bytes of an append that never committed do not shift later rows"""
+    CachedEmbeddings(fake, str(tmp_path), model_name="fake").embed_documents(["اصفهان", "تهران"])
+    cache = CachedEmbeddings(fake, str(tmp_path), model_name="fake")
+    with open(cache.vectors_path, "ab") as f:
+        # a crash in the middle of writing a row
+        f.write(b"\x00" * 13)
+
+    vectors = cache.embed_documents(["شیراز", "یزد", "اصفهان"])
+    expected = fake.embed_documents(["شیراز", "یزد", "اصفهان"])
+    for v, e in zip(vectors, expected):
+        assert v == pytest.approx(e, rel=1e-6)
+    assert os.path.getsize(cache.vectors_path) == 4 * 8 * 4
+
+
+def test_instances_sharing_a_directory_append_after_each_other(fake, tmp_path):
+    """Test two caches on one directory (e.g. two processes) never overwrite each other's rows"""
+    first = CachedEmbeddings(fake, str(tmp_path), model_name="fake")
+    second = CachedEmbeddings(fake, str(tmp_path), model_name="fake")
+    first.embed_documents(["اصفهان"])
+    second.embed_documents(["تهران"])
+    first.embed_documents(["شیراز"])
+
+    texts = ["اصفهان", "تهران", "شیراز"]
+    for cache in (first, second):
+        for v, e in zip(cache.embed_documents(texts), fake.embed_documents(texts)):
+            assert v == pytest.approx(e, rel=1e-6)
@@ -0,0 +1,467 @@
+"""
+Unit tests for files.py
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import patch
+
+try:
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    import files
+    from files import FAISSManager
+    FILES_AVAILABLE = True
+except ImportError:
+    FILES_AVAILABLE = False
+
+pytestmark = pytest.mark.skipif(not FILES_AVAILABLE, reason="files module dependencies not available")
+
+SAMPLE_TEXT = "مقدمه\nاصفهان نصف جهان است و میدان نقش جهان در آن قرار دارد.\n- کاخ عالی قاپو\n- مسجد شیخ لطف الله"
+OTHER_TEXT = "تهران\nکاخ گلستان در مرکز شهر تهران قرار دارد.\n| نام | شهر |\n| گلستان | تهران |"
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return FAISSManager(db_dir=str(tmp_path / "db"), embeddings=DeterministicFakeEmbedding(size=16))
+
+
+@pytest.fixture
+def make_file(tmp_path):
+    def _make(name, text):
+        path = tmp_path / "uploads" / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        return str(path)
+    return _make
+
+
+def test_add_list_and_search(manager, make_file):
+    """Test documents can be added, listed and searched"""
+    doc_id, filename = manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    manager.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+
+    listed = manager.list_documents()
+    assert {d["filename"] for d in listed} == {"isfahan.txt", "tehran.txt"}
+    assert {"doc_id": doc_id, "filename": filename} in listed
+
+    results = manager.search("میدان نقش جهان", k=2, filename="isfahan.txt")
+    assert results
+    assert all(r.metadata["filename"] == "isfahan.txt" for r in results)
+
+
+def test_duplicate_filename_is_not_indexed_twice(manager, make_file):
+    """Test re-adding a file with the same name returns the existing doc_id"""
+    path = make_file("isfahan.txt", SAMPLE_TEXT)
+    first_id, _ = manager.add_document(file_path=path)
+    second_id, _ = manager.add_document(file_path=path)
+    assert first_id == second_id
+    assert len(manager.list_documents()) == 1
+
+
+def test_index_is_loaded_once(manager, make_file):
+    """Test the vector store stays in memory between calls"""
+    manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+
+    with patch.object(files.FAISS, 'load_local', wraps=files.FAISS.load_local) as mock_load:
+        manager.list_documents()
+        manager.search("اصفهان")
+        manager.search("کاخ")
+        mock_load.assert_not_called()
+
+        # a fresh manager on the same index loads it once
+        other = FAISSManager(db_dir=os.path.dirname(manager.index_path), embeddings=manager.embeddings, cache_embeddings=False)
+        other.search("اصفهان")
+        other.list_documents()
+        assert mock_load.call_count == 1
+
+
+def test_index_is_reloaded_when_files_change(manager, make_file):
+    """Test a manager picks up changes written by another manager"""
+    manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    other = FAISSManager(db_dir=os.path.dirname(manager.index_path), embeddings=manager.embeddings, cache_embeddings=False)
+    assert len(other.list_documents()) == 1
+
+    manager.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+    assert {d["filename"] for d in other.list_documents()} == {"isfahan.txt", "tehran.txt"}
+
+
+def test_readers_keep_consistent_snapshot(manager, make_file):
+    """Test a store handed to a reader is not modified by a later write"""
+    manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    snapshot = manager._load()[0]
+    total = snapshot.index.ntotal
+    docs = len(snapshot.docstore._dict)
+
+    manager.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+
+    assert snapshot.index.ntotal == total
+    assert len(snapshot.docstore._dict) == docs
+    assert manager._load()[0].index.ntotal > total
+
+
+def test_empty_manager(manager):
+    """Test calls on a manager without an index"""
+    assert manager.list_documents() == []
+    assert manager.search("اصفهان") == []
+    assert manager.remove_document("missing.txt") is None
+
+
+def test_remove_document_does_not_reembed(manager, make_file):
+    """Test removing a file deletes its vectors without embedding the remaining chunks"""
+    isfahan = make_file("isfahan.txt", SAMPLE_TEXT)
+    manager.add_document(file_path=isfahan)
+    manager.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+    before = manager._load()[0]
+    tehran_keys = [k for k, d in before.docstore._dict.items() if d.metadata["filename"] == "tehran.txt"]
+
+    with patch.object(DeterministicFakeEmbedding, 'embed_documents', autospec=True) as mock_embed:
+        assert manager.remove_document(isfahan) is True
+        mock_embed.assert_not_called()
+
+    vs = manager._load()[0]
+    assert vs.index.ntotal == len(tehran_keys)
+    assert sorted(vs.index_to_docstore_id.values()) == sorted(tehran_keys)
+    assert [d["filename"] for d in manager.list_documents()] == ["tehran.txt"]
+    assert not os.path.exists(isfahan)
+    assert all(r.metadata["filename"] == "tehran.txt" for r in manager.search("اصفهان", k=5))
+
+
+def test_remove_last_document_leaves_empty_index(manager, make_file):
+    """Test removing every document leaves a valid empty index that can be reused"""
+    path = make_file("isfahan.txt", SAMPLE_TEXT)
+    manager.add_document(file_path=path)
+    assert manager.remove_document(path) is True
+
+    reloaded = FAISSManager(db_dir=os.path.dirname(manager.index_path), embeddings=manager.embeddings, cache_embeddings=False)
+    assert reloaded.list_documents() == []
+    assert reloaded.search("اصفهان") == []
+
+    reloaded.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+    assert [d["filename"] for d in reloaded.list_documents()] == ["tehran.txt"]
+
+
+def test_remove_unknown_document(manager, make_file):
+    """Test removing a file that is not indexed"""
+    manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    assert manager.remove_document("missing.txt") is False
+
+
+def test_reindexing_uses_embedding_cache(manager, make_file):
+    """Test re-adding a removed file does not call the embeddings model again"""
+    path = make_file("isfahan.txt", SAMPLE_TEXT)
+    manager.add_document(file_path=path)
+    manager.remove_document(path)
+
+    path = make_file("isfahan.txt", SAMPLE_TEXT)
+    with patch.object(DeterministicFakeEmbedding, 'embed_documents', autospec=True) as mock_embed:
+        manager.add_document(file_path=path)
+        mock_embed.assert_not_called()
+    assert [d["filename"] for d in manager.list_documents()] == ["isfahan.txt"]
+
+
+def test_same_content_under_new_name_is_detected(manager, make_file):
+    """Test re-uploading the same content with a different filename returns the existing document"""
+    doc_id, _ = manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    with patch.object(files.DocumentPipeline, 'stream') as mock_stream:
+        result = manager.add_document(file_path=make_file("isfahan-copy.txt", SAMPLE_TEXT))
+        mock_stream.assert_not_called()
+    assert result == (doc_id, "isfahan.txt")
+    assert len(manager.list_documents()) == 1
+
+
+def test_registry_is_saved_next_to_index(manager, make_file):
+    """Test the filename registry is persisted and follows adds and removes"""
+    import json
+    isfahan = make_file("isfahan.txt", SAMPLE_TEXT)
+    doc_id, _ = manager.add_document(file_path=isfahan)
+    manager.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+    manager.remove_document(isfahan)
+
+    with open(os.path.join(manager._current_dir(), "documents.json"), encoding="utf-8") as f:
+        registry = json.load(f)
+    assert list(registry) == ["tehran.txt"]
+    vs = manager._load()[0]
+    assert sorted(registry["tehran.txt"]["ids"]) == sorted(vs.docstore._dict)
+    assert registry["tehran.txt"]["content_hash"]
+
+
+def test_registry_is_rebuilt_for_old_indexes(manager, make_file):
+    """Test an index saved without a registry still lists and removes documents"""
+    doc_id, _ = manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    os.remove(os.path.join(manager._current_dir(), "documents.json"))
+
+    other = FAISSManager(db_dir=os.path.dirname(manager.index_path), embeddings=manager.embeddings, cache_embeddings=False)
+    assert other.list_documents() == [{"doc_id": doc_id, "filename": "isfahan.txt"}]
+    assert other.remove_document("isfahan.txt") is True
+    assert other.list_documents() == []
+
+
+def test_readers_never_pair_a_store_with_another_commits_registry(manager, make_file):
+    """Test a reader running during commits always gets a store and registry of the same commit"""
+    import threading
+    manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    tehran = make_file("tehran.txt", OTHER_TEXT)
+    done, mismatches = threading.Event(), []
+
+    def read():
+        while not done.is_set():
+            try:
+                vs, registry = manager._load()
+                ids = {i for entry in registry.values() for i in entry["ids"]}
+                if vs is None or ids != set(vs.docstore._dict):
+                    mismatches.append(sorted(registry))
+            except Exception as e:
+                mismatches.append(repr(e))
+
+    reader = threading.Thread(target=read)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    reader.start()
+    try:
+        for _ in range(10):
+            manager.add_document(file_path=tehran)
+            manager.remove_document("tehran.txt")
+            tehran = make_file("tehran.txt", OTHER_TEXT)
+    finally:
+        done.set()
+        reader.join()
+        sys.setswitchinterval(interval)
+    assert mismatches == []
+
+
+def test_commits_publish_new_version_directories(manager, make_file):
+    """Test every write goes to its own directory and only the newest versions are kept"""
+    manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    first = manager._current_dir()
+    manager.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+    manager.remove_document("isfahan.txt")
+
+    current = manager._current_dir()
+    assert current != first and os.path.dirname(current) == manager.index_path
+    versions = [name for name in os.listdir(manager.index_path) if name.startswith("v")]
+    assert len(versions) == manager.KEEP_VERSIONS
+    assert os.path.basename(current) in versions
+    assert not os.path.exists(first)
+
+
+def test_reader_of_pruned_version_loads_the_new_one(manager, make_file):
+    """Test a reader whose version is removed while loading retries with the published one"""
+    manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    other = FAISSManager(db_dir=os.path.dirname(manager.index_path), embeddings=manager.embeddings, cache_embeddings=False)
+    load_local = files.FAISS.load_local
+
+    def load_while_writer_commits(path, *args, **kwargs):
+        if mock_load.call_count == 1:
+            # another process publishes two versions, pruning the one being loaded
+            manager.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+            manager.add_document(file_path=make_file("shiraz.txt", "# شیراز\n\nحافظیه و باغ ارم در شیراز هستند."))
+        return load_local(path, *args, **kwargs)
+
+    with patch.object(files.FAISS, 'load_local', side_effect=load_while_writer_commits) as mock_load:
+        names = {d["filename"] for d in other.list_documents()}
+    assert mock_load.call_count == 2
+    assert names == {"isfahan.txt", "tehran.txt", "shiraz.txt"}
+
+
+def test_unversioned_index_is_loaded_and_migrated(manager, make_file):
+    """Test an index saved directly in index_path is read, and replaced by a version on the next write"""
+    doc_id, _ = manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    current = manager._current_dir()
+    for name in os.listdir(current):
+        os.replace(os.path.join(current, name), os.path.join(manager.index_path, name))
+    os.rmdir(current)
+    os.remove(os.path.join(manager.index_path, manager.CURRENT_FILE))
+
+    other = FAISSManager(db_dir=os.path.dirname(manager.index_path), embeddings=manager.embeddings, cache_embeddings=False)
+    assert other.list_documents() == [{"doc_id": doc_id, "filename": "isfahan.txt"}]
+    other.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+    assert not os.path.exists(os.path.join(manager.index_path, "index.faiss"))
+    assert {d["filename"] for d in manager.list_documents()} == {"isfahan.txt", "tehran.txt"}
+
+
+def test_filtered_search_only_scores_selected_document(manager, make_file):
+    """Test filtered search returns the document's chunks even when other documents are closer"""
+    manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    manager.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+    vs = manager._load()[0]
+    tehran_chunks = [d for d in vs.docstore._dict.values() if d.metadata["filename"] == "tehran.txt"]
+
+    # query with the exact text of an isfahan chunk, then restrict to tehran
+    isfahan_text = next(d.page_content for d in vs.docstore._dict.values() if d.metadata["filename"] == "isfahan.txt")
+    results = manager.search_with_scores(isfahan_text, k=10, filename="tehran.txt")
+
+    assert len(results) == len(tehran_chunks)
+    assert all(doc.metadata["filename"] == "tehran.txt" for doc, _ in results)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores)
+
+
+def test_filtered_search_by_doc_id(manager, make_file):
+    """Test search restricted by doc_id and by an unknown document"""
+    doc_id, _ = manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    manager.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+
+    results = manager.search("کاخ", k=1, doc_id=doc_id)
+    assert len(results) == 1
+    assert results[0].metadata["doc_id"] == doc_id
+    assert manager.search("کاخ", doc_id="missing") == []
+    assert manager.search("کاخ", doc_id=doc_id, filename="tehran.txt") == []
+
+
+def test_filtered_search_after_remove(manager, make_file):
+    """Test positions are refreshed after vectors are deleted"""
+    isfahan = make_file("isfahan.txt", SAMPLE_TEXT)
+    manager.add_document(file_path=isfahan)
+    manager.add_document(file_path=make_file("tehran.txt", OTHER_TEXT))
+    manager.search("کاخ", filename="tehran.txt")
+    manager.remove_document(isfahan)
+
+    results = manager.search("کاخ", k=10, filename="tehran.txt")
+    assert results
+    assert all(doc.metadata["filename"] == "tehran.txt" for doc in results)
+
+
+def test_ingest_directory(manager, make_file, tmp_path):
+    """Test bulk ingestion adds every file with a single save and reports duplicates and failures"""
+    make_file("isfahan.txt", SAMPLE_TEXT)
+    make_file("tehran.md", OTHER_TEXT)
+    make_file("isfahan-copy.txt", SAMPLE_TEXT)
+    make_file("empty.txt", "")
+    paths = files.expand_paths([str(tmp_path / "uploads")]) + [str(tmp_path / "uploads" / "notes.xyz")]
+
+    with patch.object(manager, '_commit', wraps=manager._commit) as mock_commit:
+        report = manager.ingest(paths, workers=2, batch_size=2)
+        mock_commit.assert_called_once()
+
+    statuses = {entry["filename"]: entry["status"] for entry in report}
+    assert statuses["tehran.md"] == "added"
+    assert sorted([statuses["isfahan.txt"], statuses["isfahan-copy.txt"]]) == ["added", "duplicate"]
+    assert statuses["empty.txt"] == "failed"
+    assert statuses["notes.xyz"] == "failed"
+    assert all(entry["seconds"] >= 0 for entry in report)
+
+    assert len(manager.list_documents()) == 2
+    assert manager.search("کاخ گلستان", k=10, filename="tehran.md")
+
+
+def test_ingest_skips_indexed_files_and_reports_embedding_failures(manager, make_file):
+    """Test files already indexed are skipped and failed embedding batches mark their files failed"""
+    manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    tehran = make_file("tehran.txt", OTHER_TEXT)
+
+    with patch.object(manager.embeddings, 'embed_documents', side_effect=RuntimeError("quota")):
+        report = manager.ingest([make_file("isfahan.txt", SAMPLE_TEXT), tehran], workers=1)
+
+    statuses = {entry["filename"]: entry["status"] for entry in report}
+    assert statuses == {"isfahan.txt": "duplicate", "tehran.txt": "failed"}
+    assert [d["filename"] for d in manager.list_documents()] == ["isfahan.txt"]
+
+
+def test_ingest_keeps_embedded_batches_as_float32_arrays(manager, make_file):
+    """Test embedded batches are held as float32 arrays, not lists of Python floats, until the save"""
+    import numpy as np
+    paths = [make_file("isfahan.txt", SAMPLE_TEXT), make_file("tehran.txt", OTHER_TEXT)]
+    with patch.object(manager, '_with_embeddings', wraps=manager._with_embeddings) as mock_with:
+        manager.ingest(paths, workers=1, batch_size=2)
+
+    text_embeddings = mock_with.call_args.args[0]
+    assert all(isinstance(v, np.ndarray) and v.dtype == np.float32 for _, v in text_embeddings)
+    assert manager._load()[0].index.ntotal == len(text_embeddings)
+
+
+def test_expand_paths(tmp_path, make_file):
+    """Test directories are walked for supported files and globs are expanded"""
+    make_file("a.txt", "الف")
+    make_file("b.pdf", "ب")
+    make_file("c.xyz", "ج")
+    uploads = str(tmp_path / "uploads")
+
+    assert [os.path.basename(p) for p in files.expand_paths([uploads])] == ["a.txt", "b.pdf"]
+    assert [os.path.basename(p) for p in files.expand_paths([os.path.join(uploads, "*.txt"), uploads])] == ["a.txt", "b.pdf"]
+
+
+LONG_TEXT = "\n".join([
+    "# راهنمای سفر",
+    "مقدمه",
+    "اصفهان یکی از زیباترین شهرهای ایران است.",
+    "",
+    "",
+    "- میدان نقش جهان",
+    "- کاخ چهلستون",
+    "| جاذبه | شهر |",
+    "| سی و سه پل | اصفهان |",
+    "### نکات",
+    "بهترین زمان سفر بهار است.",
+    "## مقدمه",
+    "متن تکراری با همان سرتیتر.",
+    "## مقدمه",
+    "ادامه متن بخش مقدمه.",
+    "####",
+    "1. بلیط قطار",
+    "2) هتل سنتی",
+    "پایان",
+] * 30)
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 1000])
+def test_stream_matches_run(batch_size, make_file):
+    """Test the streaming pipeline yields the same chunks as run(), in bounded batches"""
+    path = make_file("guide.md", LONG_TEXT)
+    pipeline = files.DocumentPipeline(path)
+    expected, _, _ = pipeline.run()
+
+    batches = list(pipeline.stream(batch_size=batch_size))
+    streamed = [chunk for batch in batches for chunk in batch]
+
+    assert all(len(batch) <= batch_size for batch in batches)
+    assert [c.page_content for c in streamed] == [c.page_content for c in expected]
+    assert [c.metadata for c in streamed] == [c.metadata for c in expected]
+
+
+def test_stream_with_small_loader_blocks(make_file):
+    """Test block boundaries inside lines and words do not change the chunks"""
+    path = make_file("guide.txt", LONG_TEXT)
+    pipeline = files.DocumentPipeline(path)
+    expected, _, _ = pipeline.run()
+    with patch('utils.loaders.txt_loader.BLOCK_SIZE', 13):
+        streamed = [c for batch in pipeline.stream() for c in batch]
+    assert [(c.page_content, c.metadata) for c in streamed] == [(c.page_content, c.metadata) for c in expected]
+
+
+def test_add_document_embeds_in_batches(manager, make_file):
+    """Test add_document sends chunks to the embedder batch by batch"""
+    path = make_file("guide.txt", LONG_TEXT)
+    with patch.object(files, 'EMBED_BATCH_SIZE', 50), \
+         patch.object(manager.embeddings, 'embed_documents', wraps=manager.embeddings.embed_documents) as mock_embed:
+        manager.add_document(file_path=path)
+    sizes = [len(call.args[0]) for call in mock_embed.call_args_list]
+    assert len(sizes) > 1
+    assert max(sizes) <= 50
+    assert sum(sizes) == manager._load()[0].index.ntotal
+
+
+def test_add_document_adds_each_batch_as_it_is_embedded(manager, make_file):
+    """Test batches go into the store as they are embedded and are merged into the existing index"""
+    manager.add_document(file_path=make_file("isfahan.txt", SAMPLE_TEXT))
+    with patch.object(files, 'EMBED_BATCH_SIZE', 50), \
+         patch.object(manager.embeddings, 'embed_documents', wraps=manager.embeddings.embed_documents) as mock_embed, \
+         patch.object(files.FAISS, 'add_embeddings', autospec=True,
+                      side_effect=files.FAISS.add_embeddings) as mock_add:
+        manager.add_document(file_path=make_file("guide.txt", LONG_TEXT))
+
+    # the first batch creates the document's store, every later one is added to it
+    assert mock_add.call_count == mock_embed.call_count - 1
+    vs, registry = manager._load()
+    guide_ids = {key for key, doc in vs.docstore._dict.items() if doc.metadata["filename"] == "guide.txt"}
+    assert set(registry["guide.txt"]["ids"]) == guide_ids
+    assert len(vs.docstore._dict) == vs.index.ntotal == len(guide_ids) + len(registry["isfahan.txt"]["ids"])
+    assert manager.search("اصفهان", k=2, filename="isfahan.txt")
+
+
+def test_add_document_without_text(manager, make_file):
+    """Test a file without usable text is not indexed"""
+    assert manager.add_document(file_path=make_file("latin.txt", "only latin text")) == (None, "latin.txt")
+    assert manager.list_documents() == []
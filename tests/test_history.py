@@ -0,0 +1,150 @@
+"""
+Unit tests for history.py
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import Mock, patch
+
+# Only import if available, else skip tests
+try:
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+    from history import HistoryManager, TokenCounter, MESSAGE_OVERHEAD, SUMMARY_PREFIX
+    HISTORY_AVAILABLE = True
+except ImportError:
+    HISTORY_AVAILABLE = False
+
+
+class WordCounter:
+    """one token per word"""
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text):
+        self.calls += 1
+        return len(text.split())
+
+
+def conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"سوال {i} درباره سفر", id=f"h{i}"))
+        messages.append(AIMessage(content=f"پاسخ {i} درباره سفر", id=f"a{i}"))
+    return messages
+
+
+# every message of conversation() costs 4 words + overhead
+MESSAGE_TOKENS = 4 + MESSAGE_OVERHEAD
+
+
+@pytest.mark.skipif(not HISTORY_AVAILABLE, reason="history module not available")
+def test_history_within_budget_is_kept():
+    """Test nothing is dropped when the history fits"""
+    messages = conversation(3)
+    manager = HistoryManager(max_tokens=100, counter=WordCounter())
+    assert manager.trim(messages) == messages
+
+
+@pytest.mark.skipif(not HISTORY_AVAILABLE, reason="history module not available")
+def test_oldest_turns_are_dropped_and_kept_part_starts_with_user():
+    """Test trimming keeps the newest messages within budget, starting at a HumanMessage"""
+    messages = conversation(4) + [HumanMessage(content="سوال آخر من", id="last")]
+    manager = HistoryManager(max_tokens=4 * MESSAGE_TOKENS, counter=WordCounter())
+    kept = manager.trim(messages)
+    # 4 messages would fit, but the window would start with an AIMessage
+    assert [m.id for m in kept] == ["h3", "a3", "last"]
+
+
+@pytest.mark.skipif(not HISTORY_AVAILABLE, reason="history module not available")
+def test_tool_calls_stay_with_their_tool_messages():
+    """Test an AIMessage with tool calls and its ToolMessages are kept or dropped together"""
+    call = AIMessage(content="", tool_calls=[
+        {"name": "geocode_address", "args": {}, "id": "c1"}, {"name": "jina_search", "args": {}, "id": "c2"}
+    ], id="call")
+    messages = [
+        HumanMessage(content="یک دو سه", id="h0"),
+        call,
+        ToolMessage(content="نتیجه یک", tool_call_id="c1", id="t1"),
+        ToolMessage(content="نتیجه دو", tool_call_id="c2", id="t2"),
+        AIMessage(content="یک دو سه", id="a0"),
+        HumanMessage(content="یک دو سه", id="h1"),
+    ]
+    manager = HistoryManager(counter=WordCounter())
+    assert [[m.id for m in unit] for unit in manager.units(messages)] == [
+        ["h0"], ["call", "t1", "t2"], ["a0"], ["h1"]
+    ]
+    # the budget fits one tool message but not the whole tool call unit
+    dropped, kept = manager.split(messages, budget=3 * MESSAGE_TOKENS)
+    assert [m.id for m in kept] == ["h1"]
+    assert [m.id for m in dropped] == ["h0", "call", "t1", "t2", "a0"]
+
+
+@pytest.mark.skipif(not HISTORY_AVAILABLE, reason="history module not available")
+def test_last_message_is_kept_even_when_too_large():
+    """Test the current user message is always sent"""
+    messages = conversation(2) + [HumanMessage(content="خیلی " * 50, id="big")]
+    manager = HistoryManager(max_tokens=10, counter=WordCounter())
+    assert [m.id for m in manager.trim(messages)] == ["big"]
+
+
+@pytest.mark.skipif(not HISTORY_AVAILABLE, reason="history module not available")
+def test_running_summary_is_incremental_and_cached():
+    """Test dropped turns are summarized once and later turns only summarize the new part"""
+    summarizer = Mock(side_effect=lambda previous, new: previous + "+" + ",".join(m.id for m in new))
+    manager = HistoryManager(max_tokens=2 * MESSAGE_TOKENS + 5, summary_tokens=5, summarizer=summarizer,
+                             counter=WordCounter())
+    messages = conversation(3)
+
+    first = manager.trim(messages)
+    assert isinstance(first[0], SystemMessage)
+    assert first[0].content == SUMMARY_PREFIX + "+h0,a0,h1,a1"
+    assert [m.id for m in first[1:]] == ["h2", "a2"]
+
+    # same history again: served from the cache
+    manager.trim(messages)
+    assert summarizer.call_count == 1
+
+    # one more turn: only the newly dropped messages are summarized, on top of the previous summary
+    second = manager.trim(conversation(4))
+    summarizer.assert_called_with("+h0,a0,h1,a1", [messages[4], messages[5]])
+    assert second[0].content == SUMMARY_PREFIX + "+h0,a0,h1,a1+h2,a2"
+
+
+@pytest.mark.skipif(not HISTORY_AVAILABLE, reason="history module not available")
+def test_failed_summary_falls_back_to_trimmed_history():
+    """Test a summarizer error only loses the summary"""
+    manager = HistoryManager(max_tokens=2 * MESSAGE_TOKENS + 5, summary_tokens=5,
+                             summarizer=Mock(side_effect=RuntimeError("down")), counter=WordCounter())
+    assert [m.id for m in manager.trim(conversation(3))] == ["h2", "a2"]
+
+
+@pytest.mark.skipif(not HISTORY_AVAILABLE, reason="history module not available")
+def test_token_counts_are_cached_per_message():
+    """Test messages are only counted once across turns"""
+    counter = WordCounter()
+    manager = HistoryManager(max_tokens=1000, counter=counter)
+    messages = conversation(5)
+    manager.trim(messages)
+    manager.trim(messages + [HumanMessage(content="جدید", id="new")])
+    assert counter.calls == len(messages) + 1
+
+
+@pytest.mark.skipif(not HISTORY_AVAILABLE, reason="history module not available")
+def test_token_counter_estimates_without_tiktoken_encoding():
+    """Test the local estimate is used when the tiktoken encoding cannot be loaded"""
+    with patch('tiktoken.get_encoding', side_effect=OSError("offline")):
+        counter = TokenCounter()
+        assert counter.count("abcdefgh") == 2
+        assert counter.count("سلام") == 2
+
+
+@pytest.mark.skipif(not HISTORY_AVAILABLE, reason="history module not available")
+def test_token_counter_uses_tiktoken_encoding():
+    """Test tiktoken is used when the encoding is available"""
+    encoding = Mock()
+    encoding.encode.return_value = [1, 2, 3]
+    with patch('tiktoken.get_encoding', return_value=encoding):
+        assert TokenCounter().count("hello world") == 3
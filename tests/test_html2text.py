@@ -0,0 +1,96 @@
+"""
+Unit tests for utils/html2text.py
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import patch
+
+# Only import if available, else skip tests
+try:
+    from utils import html2text
+    from utils.html2text import html_to_text, iter_html_lines
+    from utils.loaders.html_loader import HtmlLoader
+    HTML2TEXT_AVAILABLE = True
+except ImportError:
+    HTML2TEXT_AVAILABLE = False
+
+PAGE = """<html><head><title>سفر</title><style>p { color: red }</style>
+<script>var s = "<h1>not text</h1>";</script></head>
+<body><nav><ul><li>خانه<li>شهرها<ul><li>شیراز</li></ul></li></ul></nav>
+<h1>اصفهان</h1><p>نقش <b>جهان</b> &amp; سی‌وسه‌پل</p><noscript>javascript لازم است</noscript>
+<h2>جاهای دیدنی</h2>
+<table><thead><tr><th>نام<th>شهر</thead>
+<tr><td>حافظیه</td><td><p>شیراز</p></td></tr><tr><td>a|b<td>c</table>
+<h3>زمان سفر</h3>بهار<br>پاییز<h4>نکته</h4><div>بلیت</div></body></html>"""
+
+EXPECTED = "\n".join([
+    "سفر",
+    "* خانه",
+    "* شهرها",
+    "  * شیراز",
+    "# اصفهان",
+    "نقش جهان & سی‌وسه‌پل",
+    "## جاهای دیدنی",
+    "| نام | شهر |",
+    "| --- | --- |",
+    "| حافظیه | شیراز |",
+    "| a\\|b | c |",
+    "### زمان سفر",
+    "بهار",
+    "پاییز",
+    "نکته",
+    "بلیت",
+])
+
+
+@pytest.mark.skipif(not HTML2TEXT_AVAILABLE, reason="html2text module not available")
+def test_html_to_text_keeps_block_structure_and_skips_scripts():
+    """Test headings, bullets, table rows and skipped script/style/noscript"""
+    assert html_to_text(text=PAGE) == EXPECTED
+
+
+@pytest.mark.skipif(not HTML2TEXT_AVAILABLE, reason="html2text module not available")
+def test_nested_tables_are_flattened_into_the_outer_cell():
+    """Test a table inside a cell does not produce rows of its own"""
+    html = "<table><tr><td>x<table><tr><td>y</td><td>z</td></tr></table></td><td>w</td></tr></table>"
+    assert html_to_text(text=html) == "| x y z | w |\n| --- | --- |"
+
+
+@pytest.mark.skipif(not HTML2TEXT_AVAILABLE, reason="html2text module not available")
+def test_file_is_parsed_in_chunks(tmp_path):
+    """Test reading the file in small chunks gives the same lines as parsing it at once"""
+    path = tmp_path / "page.html"
+    path.write_text(PAGE, encoding="utf-8")
+    with patch.object(html2text, 'READ_SIZE', 7):
+        assert list(iter_html_lines(path=str(path))) == EXPECTED.split("\n")
+
+
+@pytest.mark.skipif(not HTML2TEXT_AVAILABLE, reason="html2text module not available")
+def test_html_loader_fast_mode_streams_lines(tmp_path):
+    """Test iter_load yields one line at a time and joins to load()"""
+    path = tmp_path / "page.html"
+    path.write_text(PAGE, encoding="utf-8")
+    loader = HtmlLoader(mode="fast")
+    blocks = loader.iter_load(path=str(path))
+    assert next(blocks) == "سفر"
+    assert "".join(["سفر", *blocks]) == loader.load(path=str(path)) == EXPECTED
+
+
+@pytest.mark.skipif(not HTML2TEXT_AVAILABLE, reason="html2text module not available")
+def test_html_loader_fidelity_mode_uses_beautifulsoup():
+    """Test the fidelity mode keeps the BeautifulSoup text extraction"""
+    pytest.importorskip("bs4")
+    text = HtmlLoader(mode="fidelity").load(text=PAGE)
+    assert "not text" not in text and "color" not in text
+    assert "اصفهان" in text and "#" not in text
+
+
+@pytest.mark.skipif(not HTML2TEXT_AVAILABLE, reason="html2text module not available")
+def test_html_loader_rejects_unknown_mode():
+    """Test an unknown mode raises ValueError"""
+    with pytest.raises(ValueError, match="unknown HTML mode"):
+        HtmlLoader(mode="slow")
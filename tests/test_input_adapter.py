@@ -97,4 +97,77 @@ def test_load_input_different_extensions():
             
             # Verify the appropriate loader was used
             mock_loader.load.assert_called_once_with(path=f"document{ext}")
-            assert result == f"Content from {ext} file"
\ No newline at end of file
+            assert result == f"Content from {ext} file"
+
+try:
+    from utils.input_adapter import LoaderRegistry, LOADERS, register_loader
+    from utils.loaders.base import BaseLoader
+    REGISTRY_AVAILABLE = True
+except ImportError:
+    REGISTRY_AVAILABLE = False
+
+
+@pytest.mark.skipif(not REGISTRY_AVAILABLE, reason="input_adapter module not available")
+def test_loader_registry_builds_loaders_lazily_once():
+    """Test that a loader class is only instantiated on first lookup, and then reused"""
+    built = []
+
+    class CountingLoader(BaseLoader):
+        def __init__(self):
+            built.append(self)
+
+        def load(self, path=None, text=None):
+            return text
+
+    registry = LoaderRegistry({".cnt": CountingLoader})
+    assert ".cnt" in registry
+    assert built == []
+
+    first = registry[".cnt"]
+    assert registry[".cnt"] is first
+    assert len(built) == 1
+
+
+@pytest.mark.skipif(not REGISTRY_AVAILABLE, reason="input_adapter module not available")
+def test_loader_registry_imports_spec_strings_on_demand():
+    """Test that "module:Class" specs (relative or absolute) are imported on lookup"""
+    registry = LoaderRegistry({".txt": ".loaders.txt_loader:TxtLoader", "raw": "utils.loaders.raw_loader:RawLoader"})
+    from utils.loaders.txt_loader import TxtLoader
+    from utils.loaders.raw_loader import RawLoader
+
+    assert isinstance(registry[".txt"], TxtLoader)
+    assert isinstance(registry["raw"], RawLoader)
+    assert sorted(registry) == [".txt", "raw"]
+    with pytest.raises(KeyError):
+        registry[".xyz"]
+
+
+@pytest.mark.skipif(not REGISTRY_AVAILABLE, reason="input_adapter module not available")
+def test_register_loader_plugin_hook():
+    """Test that register_loader makes a new extension available to load_input"""
+    class UpperLoader(BaseLoader):
+        def load(self, path=None, text=None):
+            return path.upper()
+
+    plugin = UpperLoader()
+    try:
+        register_loader(".UPPER", plugin)
+        assert ".upper" in LOADERS
+        assert LOADERS[".upper"] is plugin
+        assert load_input(file_path="notes.upper") == "NOTES.UPPER"
+    finally:
+        LOADERS._specs.pop(".upper", None)
+        LOADERS._loaders.pop(".upper", None)
+
+
+@pytest.mark.skipif(not REGISTRY_AVAILABLE, reason="input_adapter module not available")
+def test_importing_input_adapter_does_not_import_loader_dependencies():
+    """Test that importing the adapter does not pull in the heavy loader libraries"""
+    import subprocess
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    code = (
+        "import sys, utils.input_adapter\n"
+        "print([m for m in ('mammoth', 'markdownify', 'bs4', 'pypdf') if m in sys.modules])"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
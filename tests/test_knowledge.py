@@ -0,0 +1,84 @@
+"""
+Unit tests for knowledge.py
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import patch
+
+# Only import if available, else skip tests
+try:
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    import knowledge
+    from files import FAISSManager
+    from knowledge import NOT_FOUND, KnowledgeInput, find_passages, lookup_knowledge, search_knowledge
+    KNOWLEDGE_AVAILABLE = True
+except ImportError:
+    KNOWLEDGE_AVAILABLE = False
+
+pytestmark = pytest.mark.skipif(not KNOWLEDGE_AVAILABLE, reason="knowledge module dependencies not available")
+
+GUIDE_TEXT = "# اصفهان\nمیدان نقش جهان در مرکز اصفهان قرار دارد.\n- کاخ عالی قاپو\n- مسجد شیخ لطف الله"
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    """a knowledge base with one guide, using deterministic fake embeddings"""
+    manager = FAISSManager(db_dir=str(tmp_path / "db"), embeddings=DeterministicFakeEmbedding(size=16),
+                           cache_embeddings=False)
+    path = tmp_path / "isfahan.md"
+    path.write_text(GUIDE_TEXT, encoding="utf-8")
+    manager.add_document(file_path=str(path))
+    with patch.object(knowledge, '_knowledge_base', manager):
+        yield manager
+
+
+def test_close_passages_are_returned_with_their_source(indexed):
+    """Test a query matching an indexed chunk returns it with filename and headers"""
+    chunk = indexed.search("- کاخ عالی قاپو\n- مسجد شیخ لطف الله", k=10)
+    bullets = next(doc for doc in chunk if doc.metadata.get("chunk_type") == "bullet")
+
+    hits = find_passages(bullets.page_content)
+    assert hits[0][0].page_content == bullets.page_content
+    assert hits[0][1] == pytest.approx(0.0, abs=1e-5)
+
+    text = lookup_knowledge(bullets.page_content)
+    assert text.startswith("[isfahan.md › اصفهان]\n")
+    assert bullets.page_content in text
+
+
+def test_distant_passages_are_not_found(indexed):
+    """Test nothing is returned when no chunk is within the distance threshold"""
+    assert find_passages("قیمت بلیت قطار تهران مشهد") == []
+    assert search_knowledge(KnowledgeInput(query="قیمت بلیت قطار تهران مشهد")).passages == NOT_FOUND
+
+
+def test_threshold_is_configurable(indexed):
+    """Test a larger max_distance accepts weaker matches"""
+    assert find_passages("قیمت بلیت قطار تهران مشهد", max_distance=float("inf"), k=2)
+
+
+def test_empty_index_is_not_found(tmp_path):
+    """Test an empty knowledge base answers Not found"""
+    manager = FAISSManager(db_dir=str(tmp_path / "db"), embeddings=DeterministicFakeEmbedding(size=16),
+                           cache_embeddings=False)
+    with patch.object(knowledge, '_knowledge_base', manager):
+        assert lookup_knowledge("اصفهان") == NOT_FOUND
+
+
+def test_repeated_lookup_embeds_the_query_once(tmp_path):
+    """Test a repeated lookup makes no second embeddings request (query vectors are cached)"""
+    manager = FAISSManager(db_dir=str(tmp_path / "db"), embeddings=DeterministicFakeEmbedding(size=16))
+    path = tmp_path / "isfahan.md"
+    path.write_text(GUIDE_TEXT, encoding="utf-8")
+    manager.add_document(file_path=str(path))
+    with patch.object(knowledge, '_knowledge_base', manager), \
+         patch.object(DeterministicFakeEmbedding, 'embed_query', autospec=True,
+                      side_effect=DeterministicFakeEmbedding.embed_query) as mock_embed:
+        first = lookup_knowledge("میدان نقش جهان")
+        second = lookup_knowledge("میدان نقش جهان")
+    assert first == second
+    assert mock_embed.call_count == 1
@@ -0,0 +1,77 @@
+"""
+Unit tests for utils/loaders
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import patch
+
+try:
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+    from utils.loaders import pdf_loader
+    from utils.loaders.pdf_loader import PdfLoader
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+
+def make_pdf(path, n_pages):
+    """write a PDF whose page i contains the text "Page i" """
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for i in range(n_pages):
+        page = writer.add_blank_page(612, 792)
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 72 712 Td (Page {i}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+    writer.write(str(path))
+    return str(path)
+
+
+@pytest.mark.skipif(not PDF_AVAILABLE, reason="pypdf not available")
+class TestPdfLoader:
+    def test_load_uses_given_path(self, tmp_path):
+        """Test load reads the file it is given and separates pages with newlines"""
+        path = make_pdf(tmp_path / "guide.pdf", 3)
+        assert PdfLoader().load(path=path) == "Page 0\nPage 1\nPage 2"
+
+    def test_iter_load_is_lazy_and_joins_to_load(self, tmp_path):
+        """Test iter_load yields one block per page and joins to load()"""
+        path = make_pdf(tmp_path / "guide.pdf", 4)
+        loader = PdfLoader()
+        blocks = loader.iter_load(path=path)
+        assert next(blocks) == "Page 0"
+        assert "".join(["Page 0", *blocks]) == loader.load(path=path)
+
+    def test_parallel_extraction_keeps_page_order(self, tmp_path):
+        """Test large files are extracted in a process pool with pages in order"""
+        path = make_pdf(tmp_path / "big.pdf", 10)
+        with patch.object(pdf_loader, 'PARALLEL_MIN_PAGES', 4), \
+             patch.object(pdf_loader, 'PAGES_PER_TASK', 3), \
+             patch.object(pdf_loader, 'ProcessPoolExecutor', wraps=pdf_loader.ProcessPoolExecutor) as mock_pool:
+            text = PdfLoader(max_workers=2).load(path=path)
+            mock_pool.assert_called_once_with(max_workers=2)
+        assert text == "\n".join(f"Page {i}" for i in range(10))
+
+    def test_small_files_are_extracted_in_process(self, tmp_path):
+        """Test small files do not start a process pool"""
+        path = make_pdf(tmp_path / "small.pdf", 2)
+        with patch.object(pdf_loader, 'ProcessPoolExecutor') as mock_pool:
+            PdfLoader(max_workers=4).load(path=path)
+            mock_pool.assert_not_called()
+
+    def test_extract_pages(self, tmp_path):
+        """Test the worker function extracts a page range"""
+        path = make_pdf(tmp_path / "guide.pdf", 5)
+        assert pdf_loader.extract_pages(path, 1, 3) == ["Page 1", "Page 2"]
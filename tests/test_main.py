@@ -23,4 +23,486 @@ def test_main_module_imports():
             else:
                 raise
 
-# Additional tests would go here, but they're skipped if dependencies aren't available
\ No newline at end of file
+# Additional tests would go here, but they're skipped if dependencies aren't available
+
+def _import_main():
+    with patch('builtins.input', return_value='exit'):
+        try:
+            import main
+        except ImportError as e:
+            pytest.skip(f"Skipping test due to missing dependencies: {e}")
+    return main
+
+
+@pytest.fixture(autouse=True)
+def fresh_search_caches():
+    """Give every test its own empty in-memory search and summary caches"""
+    from utils.cache import TTLCache
+    main = _import_main()
+    with patch.object(main, 'search_cache', TTLCache(None)), patch.object(main, 'summary_cache', TTLCache(None)):
+        yield
+
+
+def test_summarize_results_keeps_order():
+    """Test summarize_results returns summaries in result order"""
+    main = _import_main()
+    results = [{"title": f"t{i}", "link": f"l{i}", "content": f"c{i}"} for i in range(4)]
+
+    def fake_invoke(messages):
+        return Mock(content="summary of " + messages[0].content[-2:])
+
+    with patch.object(main, 'nano_model') as mock_nano:
+        mock_nano.invoke.side_effect = fake_invoke
+        summaries = main.summarize_results(results, max_concurrency=4, timeout=5)
+
+    assert summaries == ["summary of c0", "summary of c1", "summary of c2", "summary of c3"]
+    assert mock_nano.invoke.call_count == 4
+
+
+def test_summarize_results_skips_slow_and_failed():
+    """Test summarize_results drops summaries that time out or raise"""
+    import time
+    main = _import_main()
+    results = [{"title": "t", "link": f"l{i}", "content": f"c{i}"} for i in range(3)]
+
+    def fake_invoke(messages):
+        content = messages[0].content
+        if content.endswith("c1"):
+            time.sleep(1)
+        if content.endswith("c2"):
+            raise RuntimeError("boom")
+        return Mock(content="ok")
+
+    with patch.object(main, 'nano_model') as mock_nano:
+        mock_nano.invoke.side_effect = fake_invoke
+        start = time.monotonic()
+        summaries = main.summarize_results(results, max_concurrency=3, timeout=0.2)
+        elapsed = time.monotonic() - start
+
+    assert summaries == ["ok"]
+    assert elapsed < 1
+
+
+def test_summarize_results_empty():
+    """Test summarize_results with no results"""
+    main = _import_main()
+    assert main.summarize_results([]) == []
+
+
+def test_execute_tool_calls_runs_in_parallel_and_keeps_order():
+    """Test execute_tool_calls runs tools concurrently and keeps tool_call_id order"""
+    import time
+    main = _import_main()
+
+    def slow_geocode(args):
+        time.sleep(0.3)
+        return "url:" + args["input"]["address"]
+
+    tool_calls = [
+        {"name": "geocode_address", "args": {"input": {"address": f"a{i}"}}, "id": f"call_{i}"}
+        for i in range(4)
+    ]
+    with patch.dict(main.TOOL_HANDLERS, {"geocode_address": slow_geocode}):
+        start = time.monotonic()
+        outputs = main.execute_tool_calls(tool_calls, max_concurrency=4)
+        elapsed = time.monotonic() - start
+
+    assert [m.tool_call_id for m in outputs] == ["call_0", "call_1", "call_2", "call_3"]
+    assert [m.content for m in outputs] == ["url:a0", "url:a1", "url:a2", "url:a3"]
+    assert elapsed < 1.0
+
+
+def test_execute_tool_calls_timeout_and_errors():
+    """Test execute_tool_calls returns empty output for failed, slow or unknown tools"""
+    import time
+    main = _import_main()
+
+    def slow(args):
+        time.sleep(1)
+        return "too late"
+
+    def broken(args):
+        raise RuntimeError("boom")
+
+    tool_calls = [
+        {"name": "slow_tool", "args": {}, "id": "call_slow"},
+        {"name": "broken_tool", "args": {}, "id": "call_broken"},
+        {"name": "unknown_tool", "args": {}, "id": "call_unknown"},
+    ]
+    with patch.dict(main.TOOL_HANDLERS, {"slow_tool": slow, "broken_tool": broken}), \
+         patch.dict(main.TOOL_TIMEOUTS, {"slow_tool": 0.1}):
+        start = time.monotonic()
+        outputs = main.execute_tool_calls(tool_calls)
+        elapsed = time.monotonic() - start
+
+    assert [m.tool_call_id for m in outputs] == ["call_slow", "call_broken", "call_unknown"]
+    assert all(m.content == "" for m in outputs)
+    assert elapsed < 1.0
+
+
+class FakeStreamingModel:
+    """Stands in for model_with_tools: each call streams the next scripted reply"""
+
+    def __init__(self, replies):
+        import json
+        import re
+        from langchain_core.messages import AIMessageChunk
+        self.chunks = []
+        for reply in replies:
+            if isinstance(reply, list):
+                # a tool call turn
+                self.chunks.append([AIMessageChunk(content="", tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                    for i, c in enumerate(reply)
+                ])])
+            else:
+                self.chunks.append([AIMessageChunk(content=token) for token in re.findall(r"\S+\s*", reply)])
+        self.calls = []
+
+    def stream(self, messages):
+        self.calls.append(messages)
+        return iter(self.chunks[len(self.calls) - 1])
+
+    async def astream(self, messages):
+        self.calls.append(messages)
+        for chunk in self.chunks[len(self.calls) - 1]:
+            yield chunk
+
+
+def _collect(agen):
+    import asyncio
+
+    async def run():
+        return [item async for item in agen]
+    return asyncio.run(run())
+
+
+def test_achat_with_bot_streams_tokens():
+    """Test the async handler yields the growing reply as tokens arrive"""
+    main = _import_main()
+    fake = FakeStreamingModel(["سلام! به ایران خوش آمدید"])
+    with patch.object(main, 'model_with_tools', fake):
+        updates = _collect(main.achat_with_bot("سلام", [], Mock(session_hash="test-stream")))
+
+    assert updates[0] == "سلام! "
+    assert updates[-1] == "سلام! به ایران خوش آمدید"
+    assert len(updates) == 5
+
+
+def test_achat_with_bot_reports_tool_progress():
+    """Test tool calls show progress before the final answer is streamed"""
+    main = _import_main()
+    tool_calls = [{"name": "geocode_address", "args": {"input": {"address": "میدان نقش جهان"}}, "id": "call_1"}]
+    fake = FakeStreamingModel([tool_calls, "این هم نقشه"])
+    with patch.object(main, 'model_with_tools', fake), \
+         patch.dict(main.TOOL_HANDLERS, {"geocode_address": lambda args: "https://maps/x"}):
+        updates = _collect(main.achat_with_bot("نقش جهان کجاست؟", [], Mock(session_hash="test-tools")))
+
+    assert updates[0] == "📍 Locating: میدان نقش جهان…"
+    assert updates[-1] == "این هم نقشه"
+    # the second model call got the tool result
+    assert fake.calls[1][-1].content == "https://maps/x"
+    assert fake.calls[1][-1].tool_call_id == "call_1"
+
+
+def test_sync_invoke_uses_streaming_model_without_consumer():
+    """Test app.invoke still returns the full reply through the sync node"""
+    main = _import_main()
+    fake = FakeStreamingModel(["یک پاسخ کامل"])
+    with patch.object(main, 'model_with_tools', fake):
+        assert main.chat_with_bot("سلام", [], Mock(session_hash="test-sync")) == "یک پاسخ کامل"
+
+
+def test_sessions_do_not_share_history():
+    """Test each Gradio session only sends its own history to the model"""
+    main = _import_main()
+    fake = FakeStreamingModel(["پاسخ یک", "پاسخ دو", "پاسخ سه"])
+    with patch.object(main, 'model_with_tools', fake):
+        main.chat_with_bot("پیام الف", [], Mock(session_hash="session-a"))
+        main.chat_with_bot("پیام ب", [], Mock(session_hash="session-b"))
+        main.chat_with_bot("پیام دوم الف", [], Mock(session_hash="session-a"))
+
+    contents = [[m.content for m in call[1:]] for call in fake.calls]
+    assert contents[1] == ["پیام ب"]
+    assert contents[2] == ["پیام الف", "پاسخ یک", "پیام دوم الف"]
+
+
+def test_call_model_sends_trimmed_history_without_retry():
+    """Test the model gets the token-budgeted history in a single call"""
+    from history import HistoryManager
+    from langchain_core.messages import AIMessage, HumanMessage
+    main = _import_main()
+    counter = Mock()
+    counter.count.side_effect = lambda text: len(text.split())
+    state = {"messages": [
+        HumanMessage(content="سوال اول درباره شیراز"), AIMessage(content="پاسخ اول درباره شیراز"),
+        HumanMessage(content="سوال دوم"),
+    ]}
+    fake = FakeStreamingModel(["پاسخ دوم"])
+    with patch.object(main, 'model_with_tools', fake), \
+         patch.object(main, 'history', HistoryManager(max_tokens=12, counter=counter)):
+        result = main.call_model(state)
+
+    assert len(fake.calls) == 1
+    assert [m.content for m in fake.calls[0]] == [main.SYSTEM_PROMPT, "سوال دوم"]
+    assert result["messages"].content == "پاسخ دوم"
+
+
+def test_summarize_history_uses_nano_model():
+    """Test the running summary prompt contains the previous summary and the new messages"""
+    from langchain_core.messages import HumanMessage
+    main = _import_main()
+    with patch.object(main, 'nano_model') as mock_nano:
+        mock_nano.invoke.return_value = Mock(content="خلاصه جدید")
+        summary = main.summarize_history("خلاصه قبلی", [HumanMessage(content="سفر به یزد")])
+
+    prompt = mock_nano.invoke.call_args[0][0][0].content
+    assert summary == "خلاصه جدید"
+    assert "خلاصه قبلی" in prompt and "human: سفر به یزد" in prompt
+
+
+def test_jina_search_is_skipped_when_local_knowledge_matches():
+    """Test the web search and summaries are skipped for strong local hits"""
+    main = _import_main()
+    with patch.object(main, 'lookup_knowledge', return_value="[guide.md]\nنقش جهان"), \
+         patch.object(main, 'jina_tool') as mock_jina, \
+         patch.object(main, 'summarize_results') as mock_summarize:
+        assert main.run_jina_search({"query": "نقش جهان"}) == "[guide.md]\nنقش جهان"
+    mock_jina.invoke.assert_not_called()
+    mock_summarize.assert_not_called()
+
+
+def test_jina_search_falls_back_to_the_web():
+    """Test the web is searched when the local index has nothing (or fails)"""
+    main = _import_main()
+    for local in ({"return_value": main.NOT_FOUND}, {"side_effect": RuntimeError("no index")}):
+        main.search_cache.clear()
+        with patch.object(main, 'lookup_knowledge', **local), \
+             patch.object(main, 'jina_tool') as mock_jina, \
+             patch.object(main, 'summarize_results', return_value=["خلاصه"]):
+            mock_jina.invoke.return_value = '[{"title": "t", "link": "l", "content": "c"}]'
+            assert main.run_jina_search({"query": "نقش جهان"}) == "خلاصه"
+        mock_jina.invoke.assert_called_once_with("نقش جهان")
+
+
+def test_search_knowledge_tool_call():
+    """Test the search_knowledge tool handler and its progress line"""
+    main = _import_main()
+    tool_call = {"name": "search_knowledge", "args": {"input": {"query": "باغ ارم"}}, "id": "call_k"}
+    with patch('knowledge.lookup_knowledge', return_value="[shiraz.md]\nباغ ارم"):
+        assert main.run_tool_call(tool_call) == "[shiraz.md]\nباغ ارم"
+    events = []
+    main.report_tool_calls([tool_call], events.append)
+    assert events == [{"tool": "search_knowledge", "detail": "باغ ارم"}]
+
+
+def test_repeated_search_uses_the_caches():
+    """Test a repeated (or equivalently written) query makes no network calls"""
+    main = _import_main()
+    results = '[{"title": "t1", "link": "l1", "content": "c1"}, {"title": "t2", "link": "l2", "content": "c2"}]'
+    with patch.object(main, 'lookup_knowledge', return_value=main.NOT_FOUND), \
+         patch.object(main, 'jina_tool') as mock_jina, \
+         patch.object(main, 'nano_model') as mock_nano:
+        mock_jina.invoke.return_value = results
+        mock_nano.invoke.side_effect = lambda messages: Mock(content="خلاصه " + messages[0].content[-2:])
+        first = main.run_jina_search({"query": "جاهای دیدنی  اصفهان"})
+        second = main.run_jina_search({"query": "جاهاي ديدني اصفهان"})
+
+    assert first == second == "خلاصه c1\nخلاصه c2"
+    assert mock_jina.invoke.call_count == 1
+    assert mock_nano.invoke.call_count == 2
+
+
+def test_same_page_is_summarized_once():
+    """Test summaries are cached by result content across queries"""
+    main = _import_main()
+    with patch.object(main, 'nano_model') as mock_nano:
+        mock_nano.invoke.return_value = Mock(content="ok")
+        main.summarize_results([{"title": "a", "link": "l1", "content": "same page"}])
+        summaries = main.summarize_results([
+            {"title": "b", "link": "l2", "content": "same page"},
+            {"title": "c", "link": "l3", "content": "other page"},
+        ])
+
+    assert summaries == ["ok", "ok"]
+    assert mock_nano.invoke.call_count == 2
+
+
+def test_semantic_cache_answers_first_turns_only():
+    """Test a repeated first question skips the model, and later turns bypass the cache"""
+    from answer_cache import AnswerCache
+    main = _import_main()
+
+    class SameEmbedding:
+        def embed_query(self, text):
+            return [1.0, 0.0]
+
+    fake = FakeStreamingModel(["میدان نقش جهان", "پاسخ دوم"])
+    with patch.object(main, 'model_with_tools', fake), \
+         patch.object(main, 'answer_cache', AnswerCache(SameEmbedding())):
+        first = main.chat_with_bot("اصفهان کجا برویم؟", [], Mock(session_hash="cache-a"))
+        updates = _collect(main.achat_with_bot("در اصفهان کجا برویم", [], Mock(session_hash="cache-b")))
+        follow_up = main.chat_with_bot("و بعد؟", [], Mock(session_hash="cache-b"))
+
+    assert first == "میدان نقش جهان"
+    assert updates == ["میدان نقش جهان"]
+    assert follow_up == "پاسخ دوم"
+    assert len(fake.calls) == 2
+    # the cached turn is part of the session's history
+    assert [m.content for m in fake.calls[1][1:]] == ["در اصفهان کجا برویم", "میدان نقش جهان", "و بعد؟"]
+
+
+def test_semantic_cache_skips_turns_that_did_not_finish_normally():
+    """Test replies given after a failed tool or after the tool rounds ran out are not cached"""
+    from answer_cache import AnswerCache
+    main = _import_main()
+
+    class SameEmbedding:
+        def embed_query(self, text):
+            return [1.0, 0.0]
+
+    def broken(args):
+        raise RuntimeError("timeout")
+
+    search = [{"name": "jina_search", "args": {"query": "q"}, "id": "call_1"}]
+    cache = AnswerCache(SameEmbedding())
+    fake = FakeStreamingModel([search, "چیزی پیدا نشد", search, "چیزی پیدا نشد", search, search])
+    with patch.object(main, 'model_with_tools', fake), patch.object(main, 'answer_cache', cache), \
+         patch.dict(main.TOOL_HANDLERS, {"jina_search": broken}):
+        assert main.chat_with_bot("اصفهان کجا برویم؟", [], Mock(session_hash="partial-a")) == "چیزی پیدا نشد"
+        assert _collect(main.achat_with_bot("اصفهان کجا برویم؟", [], Mock(session_hash="partial-b")))[-1] == "چیزی پیدا نشد"
+        with patch.dict(main.TOOL_HANDLERS, {"jina_search": lambda args: "r"}), patch.object(main, 'MAX_TOOL_ROUNDS', 1):
+            updates = _collect(main.achat_with_bot("اصفهان کجا برویم؟", [], Mock(session_hash="partial-c")))
+        assert updates[-1] == main.TOOL_ROUNDS_EXCEEDED
+
+    assert len(cache) == 0
+
+
+def test_turn_is_traced():
+    """Test a turn emits one trace: turn > chatbot > model calls and tools, with cache counters"""
+    main = _import_main()
+    spans = []
+    tool_calls = [{"name": "geocode_address", "args": {"input": {"address": "میدان آزادی"}}, "id": "call_t"}]
+    fake = FakeStreamingModel([tool_calls, "این هم نقشه"])
+    with patch.object(main, 'model_with_tools', fake), \
+         patch.dict(main.TOOL_HANDLERS, {"geocode_address": lambda args: "https://maps/y"}), \
+         patch.object(main.telemetry, 'sinks', [spans.append]):
+        main.telemetry.reset()
+        _collect(main.achat_with_bot("آزادی کجاست؟", [], Mock(session_hash="trace-a")))
+
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span["name"], []).append(span)
+    turn, = by_name["turn"]
+    chatbot, = by_name["chatbot"]
+    tool, = by_name["tool.geocode_address"]
+    assert {span["trace_id"] for span in spans} == {turn["trace_id"]}
+    assert chatbot["parent_id"] == turn["span_id"]
+    assert tool["parent_id"] == chatbot["span_id"]
+    assert [s["parent_id"] for s in by_name["model_call"]] == [chatbot["span_id"]] * 2
+    assert by_name["model_call"][0]["attributes"]["tool_calls"] == ["geocode_address"]
+    assert turn["attributes"]["session"] == "trace-a" and "first_update" in turn["attributes"]
+    histograms = {h["labels"].get("span") for h in main.telemetry.snapshot()["histograms"]}
+    assert {"turn", "chatbot", "model_call", "tool.geocode_address"} <= histograms
+
+
+def test_search_cache_hits_are_counted():
+    """Test the search and summary caches report their hit rates"""
+    main = _import_main()
+    main.telemetry.reset()
+    with patch.object(main, 'lookup_knowledge', return_value=main.NOT_FOUND), \
+         patch.object(main, 'jina_tool') as mock_jina, \
+         patch.object(main, 'nano_model') as mock_nano:
+        mock_jina.invoke.return_value = '[{"title": "t", "link": "l", "content": "c"}]'
+        mock_nano.invoke.return_value = Mock(content="خلاصه", usage_metadata={"input_tokens": 30, "output_tokens": 8})
+        main.run_jina_search({"query": "یزد"})
+        main.run_jina_search({"query": "یزد"})
+
+    rates = main.telemetry.snapshot()["cache_hit_rates"]
+    assert rates["search"] == 0.5
+    assert rates["summary"] == 0.5
+    assert rates["knowledge"] == 0.0
+    assert 'chatbot_tokens_total{kind="prompt",model="nano"} 30' in main.telemetry.prometheus()
+
+
+def test_sequential_tool_calls_are_all_executed():
+    """Test a search_knowledge -> jina_search chain runs both tools before the answer"""
+    main = _import_main()
+    knowledge_call = [{"name": "search_knowledge", "args": {"input": {"query": "Isfahan"}}, "id": "call_k"}]
+    web_call = [{"name": "jina_search", "args": {"query": "Isfahan"}, "id": "call_w"}]
+    fake = FakeStreamingModel([knowledge_call, web_call, "final answer"])
+    handlers = {"search_knowledge": lambda args: main.NOT_FOUND, "jina_search": lambda args: "web results"}
+    with patch.object(main, 'model_with_tools', fake), patch.dict(main.TOOL_HANDLERS, handlers):
+        updates = _collect(main.achat_with_bot("Isfahan?", [], Mock(session_hash="test-chain")))
+        state = main.app.get_state(main.sessions.config(Mock(session_hash="test-chain")))
+
+    assert updates[-1] == "final answer"
+    assert [(m.type, m.content) for m in fake.calls[2] if m.type == "tool"] == [
+        ("tool", main.NOT_FOUND), ("tool", "web results")]
+    saved = state.values["messages"][-1]
+    assert saved.content == "final answer" and not saved.tool_calls
+
+
+def test_tool_rounds_are_capped():
+    """Test a model that keeps calling tools gets no unanswered tool calls saved"""
+    main = _import_main()
+    calls = [[{"name": "jina_search", "args": {"query": "q"}, "id": f"call_{i}"}] for i in range(5)]
+    fake = FakeStreamingModel(calls)
+    with patch.object(main, 'model_with_tools', fake), \
+         patch.dict(main.TOOL_HANDLERS, {"jina_search": lambda args: "r"}), \
+         patch.object(main, 'MAX_TOOL_ROUNDS', 2):
+        updates = _collect(main.achat_with_bot("loop", [], Mock(session_hash="test-cap")))
+        state = main.app.get_state(main.sessions.config(Mock(session_hash="test-cap")))
+
+    assert len(fake.calls) == 3
+    assert updates[-1] == main.TOOL_ROUNDS_EXCEEDED
+    saved = state.values["messages"][-1]
+    assert saved.content == main.TOOL_ROUNDS_EXCEEDED and not saved.tool_calls
+
+
+def test_taken_metrics_port_does_not_stop_startup(capsys):
+    """Test a metrics port that is already in use is logged and skipped"""
+    main = _import_main()
+    with patch.object(main.telemetry, 'serve', side_effect=OSError(98, "Address already in use")):
+        assert main.start_metrics_server(9464) is None
+    assert "⚠️ metrics endpoint disabled" in capsys.readouterr().out
+    assert main.start_metrics_server(0) is None
+
+
+def test_concurrent_turns_run_their_tools_at_the_same_time():
+    """Test async turns do not queue for worker threads: 40 turns are all inside their tools at once
+    (more than the event loop's default executor, at most 32 threads, could run)"""
+    import asyncio
+    import threading
+    from langchain_core.messages import AIMessageChunk, HumanMessage
+    main = _import_main()
+    turns = 40
+    barrier = threading.Barrier(turns, timeout=3)
+    passed = []
+
+    class ToolThenAnswer:
+        async def astream(self, messages):
+            if isinstance(messages[-1], HumanMessage):
+                yield AIMessageChunk(content="", tool_call_chunks=[
+                    {"name": "geocode_address", "args": '{"input": {"address": "x"}}', "id": "call_1", "index": 0}])
+            else:
+                yield AIMessageChunk(content="done")
+
+    def geocode_waiting_for_all_turns(args):
+        barrier.wait()
+        passed.append(args)
+        return "https://maps/x"
+
+    async def turn(i):
+        return [item async for item in main.achat_with_bot("کجاست؟", [], Mock(session_hash=f"test-concurrent-{i}"))]
+
+    async def run():
+        return await asyncio.gather(*(turn(i) for i in range(turns)))
+
+    with patch.object(main, 'model_with_tools', ToolThenAnswer()), \
+         patch.dict(main.TOOL_HANDLERS, {"geocode_address": geocode_waiting_for_all_turns}), \
+         patch.dict(main.TOOL_TIMEOUTS, {"geocode_address": 10}):
+        replies = asyncio.run(run())
+
+    assert len(passed) == turns
+    assert [updates[-1] for updates in replies] == ["done"] * turns
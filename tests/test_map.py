@@ -10,7 +10,18 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock
 from pydantic import ValidationError
 
+import map as map_module
 from map import geocode_address, GeocodeInput, GeocodeOutput
+from utils.cache import TTLCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_geocode_cache(tmp_path):
+    """Give every test its own empty geocode cache"""
+    cache = TTLCache(str(tmp_path / "geocode_cache.sqlite"), ttl=map_module.GEOCODE_CACHE_TTL)
+    with patch.object(map_module, 'geocode_cache', cache):
+        yield cache
+    cache.close()
 
 
 def test_geocode_input_validation():
@@ -38,7 +49,7 @@ def test_geocode_address_successful_response():
     mock_response.raise_for_status.return_value = None  # No exception
     
     with patch.dict(os.environ, {"NESHAN_API_KEY": "test_key"}), \
-         patch('map.requests.get') as mock_get:
+         patch('map.neshan.session.get') as mock_get:
         mock_get.return_value = mock_response
         
         result = geocode_address(test_input)
@@ -66,7 +77,7 @@ def test_geocode_address_api_error():
     mock_response.raise_for_status.side_effect = Exception("API Error")
     
     with patch.dict(os.environ, {"NESHAN_API_KEY": "test_key"}), \
-         patch('map.requests.get') as mock_get:
+         patch('map.neshan.session.get') as mock_get:
         mock_get.return_value = mock_response
         
         with pytest.raises(Exception):
@@ -82,7 +93,7 @@ def test_geocode_address_empty_response():
     mock_response.raise_for_status.return_value = None
     
     with patch.dict(os.environ, {"NESHAN_API_KEY": "test_key"}), \
-         patch('map.requests.get') as mock_get:
+         patch('map.neshan.session.get') as mock_get:
         mock_get.return_value = mock_response
         
         result = geocode_address(test_input)
@@ -101,7 +112,7 @@ def test_geocode_address_missing_location_data():
     mock_response.raise_for_status.return_value = None
     
     with patch.dict(os.environ, {"NESHAN_API_KEY": "test_key"}), \
-         patch('map.requests.get') as mock_get:
+         patch('map.neshan.session.get') as mock_get:
         mock_get.return_value = mock_response
         
         with pytest.raises(KeyError):
@@ -126,7 +137,7 @@ def test_geocode_address_missing_neshan_api_key():
     original_key = os.environ.pop("NESHAN_API_KEY", None)
     
     try:
-        with patch('map.requests.get') as mock_get:
+        with patch('map.neshan.session.get') as mock_get:
             mock_get.return_value = mock_response
             
             # Since we're patching requests, this will still succeed but with None as Api-Key
@@ -139,4 +150,117 @@ def test_geocode_address_missing_neshan_api_key():
     finally:
         # Restore the original key if it existed
         if original_key:
-            os.environ["NESHAN_API_KEY"] = original_key
\ No newline at end of file
+            os.environ["NESHAN_API_KEY"] = original_key
+
+
+def _location_response(lat=35.6892, lon=51.3890):
+    mock_response = Mock()
+    mock_response.json.return_value = {"location": {"y": lat, "x": lon}}
+    mock_response.raise_for_status.return_value = None
+    return mock_response
+
+
+def test_geocode_address_uses_cache_for_same_address():
+    """Test repeated and equivalent addresses are answered from the cache"""
+    with patch('map.neshan.session.get') as mock_get:
+        mock_get.return_value = _location_response()
+
+        first = geocode_address(GeocodeInput(address="كاخ گلستان"))
+        second = geocode_address(GeocodeInput(address="کاخ  گلستان"))
+
+        assert first.url == second.url
+        mock_get.assert_called_once()
+
+
+def test_geocode_cache_persists_on_disk(fresh_geocode_cache, tmp_path):
+    """Test cached results survive a new cache instance on the same file"""
+    with patch('map.neshan.session.get') as mock_get:
+        mock_get.return_value = _location_response()
+        first = geocode_address(GeocodeInput(address="Naqsh-e Jahan"))
+
+    reopened = TTLCache(str(tmp_path / "geocode_cache.sqlite"))
+    with patch.object(map_module, 'geocode_cache', reopened), \
+         patch('map.neshan.session.get') as mock_get:
+        second = geocode_address(GeocodeInput(address="naqsh-e jahan"))
+        mock_get.assert_not_called()
+    reopened.close()
+    assert first.url == second.url
+
+
+def test_geocode_address_caches_not_found_with_short_ttl(fresh_geocode_cache):
+    """Test "Not found" answers are cached with the negative ttl"""
+    empty_response = Mock()
+    empty_response.json.return_value = {}
+    empty_response.raise_for_status.return_value = None
+
+    with patch('map.neshan.session.get') as mock_get, \
+         patch.object(fresh_geocode_cache, 'set', wraps=fresh_geocode_cache.set) as mock_set:
+        mock_get.return_value = empty_response
+        assert geocode_address(GeocodeInput(address="Nowhere")).url == "Not found"
+        assert geocode_address(GeocodeInput(address="Nowhere")).url == "Not found"
+
+        mock_get.assert_called_once()
+        mock_set.assert_called_once_with("nowhere", "Not found", ttl=map_module.GEOCODE_NOT_FOUND_TTL)
+
+
+def test_geocode_address_errors_are_not_cached():
+    """Test failed lookups are retried on the next call"""
+    failing = Mock()
+    failing.raise_for_status.side_effect = Exception("API Error")
+
+    with patch('map.neshan.session.get') as mock_get:
+        mock_get.side_effect = [failing, _location_response()]
+        with pytest.raises(Exception):
+            geocode_address(GeocodeInput(address="Tehran"))
+        result = geocode_address(GeocodeInput(address="Tehran"))
+
+        assert "35.6892" in result.url
+        assert mock_get.call_count == 2
+
+
+def test_geocode_many_keeps_order_and_dedupes():
+    """Test geocode_many geocodes equivalent addresses once and keeps input order"""
+    from map import geocode_many
+
+    def fake_geocode(address):
+        return {} if address == "Nowhere" else {"location": {"y": len(address), "x": 1}}
+
+    with patch.object(map_module.neshan, 'geocode', side_effect=fake_geocode) as mock_geocode:
+        results = geocode_many(["كاخ گلستان", "Nowhere", "کاخ گلستان", "Tehran"])
+
+    assert [r.url for r in results] == [
+        "https://www.google.com/maps/search/?api=1&query=10,1",
+        "Not found",
+        "https://www.google.com/maps/search/?api=1&query=10,1",
+        "https://www.google.com/maps/search/?api=1&query=6,1",
+    ]
+    assert mock_geocode.call_count == 3
+
+
+def test_geocode_many_reports_failures_as_not_found(fresh_geocode_cache):
+    """Test a failing address does not break the batch and is not cached"""
+    from map import geocode_many
+
+    def fake_geocode(address):
+        if address == "broken":
+            raise RuntimeError("boom")
+        return {"location": {"y": 1, "x": 2}}
+
+    with patch.object(map_module.neshan, 'geocode', side_effect=fake_geocode):
+        results = geocode_many(["broken", "Tehran"])
+
+    assert [r.url for r in results] == ["Not found", "https://www.google.com/maps/search/?api=1&query=1,2"]
+    assert fresh_geocode_cache.get("broken") is None
+
+
+def test_ageocode_many():
+    """Test the async batch geocoder"""
+    import asyncio
+    from map import ageocode_many
+
+    with patch.object(map_module.neshan, 'geocode', return_value={"location": {"y": 1, "x": 2}}) as mock_geocode:
+        results = asyncio.run(ageocode_many(["Tehran", "tehran", "Isfahan"], max_concurrency=2))
+
+    assert len(results) == 3
+    assert all(r.url.endswith("query=1,2") for r in results)
+    assert mock_geocode.call_count == 2
@@ -0,0 +1,102 @@
+"""
+Unit tests for neshan_client.py
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import pytest
+import requests
+from unittest.mock import Mock, patch
+
+from neshan_client import NeshanClient, GEOCODING_URL
+
+
+def _response(status_code=200, data=None, headers=None):
+    resp = Mock()
+    resp.status_code = status_code
+    resp.headers = headers or {}
+    resp.json.return_value = data if data is not None else {}
+    if status_code >= 400:
+        resp.raise_for_status.side_effect = requests.HTTPError(f"{status_code} error")
+    else:
+        resp.raise_for_status.return_value = None
+    return resp
+
+
+def test_geocode_sends_request_with_timeout():
+    """Test geocode calls the Neshan endpoint through the session with a timeout"""
+    client = NeshanClient(timeout=5)
+    with patch.object(client.session, 'get', return_value=_response(data={"location": {"x": 1, "y": 2}})) as mock_get:
+        data = client.geocode("Tehran")
+
+    assert data == {"location": {"x": 1, "y": 2}}
+    args, kwargs = mock_get.call_args
+    assert args[0] == GEOCODING_URL
+    assert kwargs["params"] == {"address": "Tehran"}
+    assert kwargs["headers"]["Api-Key"] == "test_neshan_key"
+    assert kwargs["timeout"] == (3.05, 5)
+
+
+def test_geocode_retries_on_retryable_status():
+    """Test 429/5xx responses are retried with backoff"""
+    client = NeshanClient(max_retries=3)
+    responses = [_response(429), _response(503), _response(data={"location": {"x": 1, "y": 2}})]
+    with patch.object(client.session, 'get', side_effect=responses) as mock_get, \
+         patch('neshan_client.time.sleep') as mock_sleep:
+        data = client.geocode("Tehran")
+
+    assert data["location"]["x"] == 1
+    assert mock_get.call_count == 3
+    assert mock_sleep.call_count == 2
+
+
+def test_geocode_gives_up_after_max_retries():
+    """Test the last retryable error is raised after max_retries"""
+    client = NeshanClient(max_retries=2)
+    with patch.object(client.session, 'get', return_value=_response(502)) as mock_get, \
+         patch('neshan_client.time.sleep'):
+        with pytest.raises(requests.HTTPError):
+            client.geocode("Tehran")
+    assert mock_get.call_count == 3
+
+
+def test_geocode_does_not_retry_client_errors():
+    """Test 4xx errors other than 429 fail immediately"""
+    client = NeshanClient()
+    with patch.object(client.session, 'get', return_value=_response(401)) as mock_get, \
+         patch('neshan_client.time.sleep') as mock_sleep:
+        with pytest.raises(requests.HTTPError):
+            client.geocode("Tehran")
+    mock_get.assert_called_once()
+    mock_sleep.assert_not_called()
+
+
+def test_geocode_retries_connection_errors():
+    """Test connection errors and timeouts are retried"""
+    client = NeshanClient(max_retries=2)
+    side_effect = [requests.ConnectionError("reset"), requests.Timeout("slow"), _response(data={})]
+    with patch.object(client.session, 'get', side_effect=side_effect) as mock_get, \
+         patch('neshan_client.time.sleep'):
+        assert client.geocode("Nowhere") == {}
+    assert mock_get.call_count == 3
+
+
+def test_backoff_is_jittered_capped_and_honors_retry_after():
+    """Test backoff delays"""
+    client = NeshanClient(backoff_factor=1, max_backoff=5)
+    for attempt in range(3):
+        delay = client._backoff(attempt)
+        assert 0.5 * 2 ** attempt <= delay <= 1.5 * 2 ** attempt
+    assert client._backoff(10) == 5
+    assert client._backoff(0, _response(429, headers={"Retry-After": "2"})) == 2
+
+
+def test_ageocode():
+    """Test the async variant returns the same data"""
+    client = NeshanClient()
+    with patch.object(client.session, 'get', return_value=_response(data={"location": {"x": 1, "y": 2}})):
+        data = asyncio.run(client.ageocode("Tehran"))
+    assert data == {"location": {"x": 1, "y": 2}}
@@ -0,0 +1,92 @@
+"""
+Unit tests for sessions.py
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import Mock, patch
+
+# Only import if available, else skip tests
+try:
+    import sessions
+    from sessions import SessionManager, LOCAL_SESSION
+    SESSIONS_AVAILABLE = True
+except ImportError:
+    SESSIONS_AVAILABLE = False
+
+
+def request(session_hash):
+    return Mock(session_hash=session_hash)
+
+
+@pytest.mark.skipif(not SESSIONS_AVAILABLE, reason="sessions module not available")
+def test_each_session_gets_its_own_stable_thread():
+    """Test thread ids are stable per session and different between sessions"""
+    manager = SessionManager()
+    a1 = manager.thread_id(request("a"))
+    b = manager.thread_id(request("b"))
+    assert manager.thread_id(request("a")) == a1
+    assert a1 != b
+    assert manager.config(request("b")) == {"configurable": {"thread_id": b}}
+    assert len(manager) == 2
+
+
+@pytest.mark.skipif(not SESSIONS_AVAILABLE, reason="sessions module not available")
+def test_missing_request_uses_local_session():
+    """Test calls without a Gradio request share the local session"""
+    manager = SessionManager()
+    assert manager.thread_id() == manager.thread_id(None) == manager.thread_id(Mock(session_hash=None))
+    assert SessionManager.session_key(None) == LOCAL_SESSION
+
+
+@pytest.mark.skipif(not SESSIONS_AVAILABLE, reason="sessions module not available")
+def test_idle_sessions_expire_and_their_history_is_deleted():
+    """Test a session idle for longer than idle_timeout starts a new thread"""
+    checkpointer = Mock()
+    manager = SessionManager(checkpointer, idle_timeout=60)
+    with patch.object(sessions.time, 'monotonic', return_value=1000):
+        old = manager.thread_id(request("a"))
+        manager.thread_id(request("b"))
+    with patch.object(sessions.time, 'monotonic', return_value=1030):
+        manager.thread_id(request("b"))
+    with patch.object(sessions.time, 'monotonic', return_value=1070):
+        new = manager.thread_id(request("a"))
+
+    assert new != old
+    checkpointer.delete_thread.assert_called_once_with(old)
+    with patch.object(sessions.time, 'monotonic', return_value=1100):
+        manager.purge_idle()
+    assert len(manager) == 1
+
+
+@pytest.mark.skipif(not SESSIONS_AVAILABLE, reason="sessions module not available")
+def test_least_recently_active_session_is_dropped_at_capacity():
+    """Test at most max_sessions are kept, dropping the least recently active"""
+    checkpointer = Mock()
+    manager = SessionManager(checkpointer, max_sessions=2)
+    a = manager.thread_id(request("a"))
+    b = manager.thread_id(request("b"))
+    manager.thread_id(request("a"))
+    manager.thread_id(request("c"))
+
+    assert len(manager) == 2
+    checkpointer.delete_thread.assert_called_once_with(b)
+    assert manager.thread_id(request("a")) == a
+
+
+@pytest.mark.skipif(not SESSIONS_AVAILABLE, reason="sessions module not available")
+def test_end_drops_the_session():
+    """Test end() forgets a session and deletes its thread"""
+    checkpointer = Mock()
+    checkpointer.delete_thread.side_effect = RuntimeError("gone")
+    manager = SessionManager(checkpointer)
+    thread = manager.thread_id(request("a"))
+    manager.end(request("a"))
+    manager.end(request("unknown"))
+
+    assert len(manager) == 0
+    checkpointer.delete_thread.assert_called_once_with(thread)
+    assert manager.thread_id(request("a")) != thread
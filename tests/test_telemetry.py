@@ -0,0 +1,175 @@
+"""
+Unit tests for telemetry.py
+"""
+import sys
+import os
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from telemetry import JsonlSink, Telemetry
+
+
+@pytest.fixture
+def recorded():
+    """a Telemetry instance and the spans it emitted"""
+    spans = []
+    return Telemetry(sinks=[spans.append]), spans
+
+
+def test_nested_spans_share_the_trace(recorded):
+    """Test child spans get the trace id and parent id of the enclosing span"""
+    telemetry, spans = recorded
+    with telemetry.span("turn", session="s1") as turn:
+        with telemetry.span("model_call") as call:
+            call.attrs["prompt_tokens"] = 12
+
+    model_call, root = spans
+    assert root["name"] == "turn" and root["parent_id"] is None
+    assert root["attributes"] == {"session": "s1"}
+    assert model_call["trace_id"] == root["trace_id"] == turn.trace_id
+    assert model_call["parent_id"] == root["span_id"]
+    assert model_call["attributes"] == {"prompt_tokens": 12}
+    assert telemetry.current() is None
+
+
+def test_failed_span_is_recorded_and_reraised(recorded):
+    """Test an exception marks the span as failed, counts an error and propagates"""
+    telemetry, spans = recorded
+    with pytest.raises(RuntimeError):
+        with telemetry.span("tool.jina_search"):
+            raise RuntimeError("boom")
+
+    assert spans[0]["status"] == "error"
+    assert "boom" in spans[0]["error"]
+    counters = telemetry.snapshot()["counters"]
+    assert {"name": "errors_total", "labels": {"span": "tool.jina_search"}, "value": 1} in counters
+
+
+def test_explicit_span_and_activate(recorded):
+    """Test spans started elsewhere can be made the parent of later spans"""
+    telemetry, spans = recorded
+    turn = telemetry.start_span("turn")
+    with telemetry.activate(turn.trace_id, turn.span_id):
+        with telemetry.span("chatbot"):
+            pass
+    turn.end()
+
+    chatbot, root = spans
+    assert chatbot["parent_id"] == turn.span_id
+    assert root["duration"] >= chatbot["duration"]
+
+
+def test_in_context_carries_the_span_into_threads(recorded):
+    """Test spans started in a thread pool keep their parent"""
+    telemetry, spans = recorded
+
+    def work(i):
+        with telemetry.span("summary", index=i):
+            pass
+
+    with telemetry.span("tools") as parent:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(telemetry.in_context(work), i) for i in range(3)]
+            [future.result() for future in futures]
+
+    assert [s["parent_id"] for s in spans if s["name"] == "summary"] == [parent.span_id] * 3
+
+
+def test_failing_sink_does_not_break_spans():
+    """Test a sink that raises is skipped"""
+    spans = []
+
+    def broken(span):
+        raise ValueError("sink down")
+
+    telemetry = Telemetry(sinks=[broken, spans.append])
+    with telemetry.span("turn"):
+        pass
+    assert len(spans) == 1
+
+
+def test_histograms_and_percentiles():
+    """Test span durations are bucketed and percentiles estimated from the buckets"""
+    telemetry = Telemetry(buckets=(0.1, 1, 10))
+    for value in (0.05, 0.05, 0.5, 5, 50):
+        telemetry.observe("span_duration_seconds", value, span="model_call")
+
+    histogram, = telemetry.snapshot()["histograms"]
+    assert histogram["count"] == 5
+    assert histogram["sum"] == pytest.approx(55.6)
+    assert histogram["buckets"] == {"0.1": 2, "1": 1, "10": 1, "+Inf": 1}
+    assert histogram["p50"] == 1
+    assert histogram["p99"] == 10
+
+
+def test_cache_hit_rates_and_tokens():
+    """Test cache lookups give hit rates and usage metadata is counted"""
+    telemetry = Telemetry()
+    for hit in (True, True, False, True):
+        telemetry.cache("search", hit)
+    telemetry.cache("geocode", False)
+    telemetry.tokens("chat", {"input_tokens": 100, "output_tokens": 20, "total_tokens": 120})
+    telemetry.tokens("chat", {"input_tokens": 50, "output_tokens": 5, "total_tokens": 55})
+    telemetry.tokens("chat", None)
+
+    snapshot = telemetry.snapshot()
+    assert snapshot["cache_hit_rates"] == {"geocode": 0.0, "search": 0.75}
+    counters = {(c["name"], tuple(sorted(c["labels"].items()))): c["value"] for c in snapshot["counters"]}
+    assert counters["tokens_total", (("kind", "prompt"), ("model", "chat"))] == 150
+    assert counters["tokens_total", (("kind", "completion"), ("model", "chat"))] == 25
+
+
+def test_prometheus_format():
+    """Test the text exposition has cumulative buckets, sums and counters"""
+    telemetry = Telemetry(buckets=(0.1, 1))
+    telemetry.observe("span_duration_seconds", 0.05, span="turn")
+    telemetry.observe("span_duration_seconds", 0.5, span="turn")
+    telemetry.cache("search", True)
+
+    text = telemetry.prometheus()
+    assert "# TYPE chatbot_cache_requests_total counter" in text
+    assert 'chatbot_cache_requests_total{cache="search",result="hit"} 1' in text
+    assert "# TYPE chatbot_span_duration_seconds histogram" in text
+    assert 'chatbot_span_duration_seconds_bucket{span="turn",le="0.1"} 1' in text
+    assert 'chatbot_span_duration_seconds_bucket{span="turn",le="1"} 2' in text
+    assert 'chatbot_span_duration_seconds_bucket{span="turn",le="+Inf"} 2' in text
+    assert 'chatbot_span_duration_seconds_count{span="turn"} 2' in text
+
+
+def test_jsonl_sink_and_metrics_file(tmp_path):
+    """Test spans are appended as JSON lines and metrics are written as JSON"""
+    sink = JsonlSink(str(tmp_path / "traces" / "spans.jsonl"))
+    telemetry = Telemetry(sinks=[sink])
+    with telemetry.span("turn", session="سلام"):
+        pass
+    sink.close()
+    telemetry.write(str(tmp_path / "metrics.json"))
+
+    lines = (tmp_path / "traces" / "spans.jsonl").read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0])["attributes"] == {"session": "سلام"}
+    metrics = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["histograms"][0]["labels"] == {"span": "turn"}
+
+
+def test_metrics_endpoint():
+    """Test /metrics and /metrics.json are served locally"""
+    telemetry = Telemetry()
+    telemetry.cache("geocode", True)
+    server = telemetry.serve(0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+        text = opener.open(base + "/metrics", timeout=5).read().decode()
+        snapshot = json.loads(opener.open(base + "/metrics.json", timeout=5).read())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert 'chatbot_cache_requests_total{cache="geocode",result="hit"} 1' in text
+    assert snapshot["cache_hit_rates"] == {"geocode": 1.0}
@@ -190,4 +190,185 @@ class TestTextProcessor:
         assert len(result) == 2
         for chunk in result:
             assert chunk.metadata["doc_id"] == doc_id
-            assert chunk.metadata["filename"] == filename
\ No newline at end of file
+            assert chunk.metadata["filename"] == filename
+
+@pytest.mark.skipif(not TEXT_PROCESSING_AVAILABLE, reason="text_processing module not available")
+def test_fold_keeps_non_persian_characters():
+    """Test fold maps Arabic characters and drops diacritics without filtering other text"""
+    assert TextProcessor.fold("كاخ گلستان, Tehran") == "کاخ گلستان, Tehran"
+    assert TextProcessor.fold("مَتنٰ") == "متن"
+
+
+@pytest.mark.skipif(not TEXT_PROCESSING_AVAILABLE, reason="text_processing module not available")
+def test_normalize_key():
+    """Test cache keys (addresses, search queries) fold Arabic characters, case and spaces"""
+    assert TextProcessor.normalize_key("  كاخ   گلستان ") == "کاخ گلستان"
+    assert TextProcessor.normalize_key("Golestan  PALACE") == "golestan palace"
+    assert TextProcessor.normalize_key("ميدان نقش جهان") == TextProcessor.normalize_key("میدان نقش جهان")
+
+
+def _reference_clean(text):
+    """The multi-pass implementation clean() must stay identical to"""
+    import re
+    for a, p in {'ي': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'ؤ': 'و', 'إ': 'ا', 'أ': 'ا', 'ء': ''}.items():
+        text = text.replace(a, p)
+    text = re.sub(r'[\u064B-\u065F\u0670\u06D6-\u06ED]', '', text)
+    text = re.sub(r'[^\u0600-\u06FF0-9\s\n|(){}،#*\-–—•.:]', '', text)
+    return text.strip()
+
+
+def _random_texts(count=200, seed=7):
+    import random
+    rng = random.Random(seed)
+    alphabet = ("يكةۀؤإأءیکهوا" + "\u064b\u064e\u0650\u0651\u065f\u0670\u06d6\u06ed\u06ee"
+                + "اصفهان تهران" + "abcXYZ!@$%^&" + "0123456789۰۱۲" + " \n\t " + "|(){}،#*-–—•.:")
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80))) for _ in range(count)]
+
+
+@pytest.mark.skipif(not TEXT_PROCESSING_AVAILABLE, reason="text_processing module not available")
+def test_clean_matches_reference_implementation():
+    """Test the single-pass clean gives exactly the old multi-pass output"""
+    for text in _random_texts():
+        assert TextProcessor.clean(text) == _reference_clean(text)
+
+
+@pytest.mark.skipif(not TEXT_PROCESSING_AVAILABLE, reason="text_processing module not available")
+def test_clean_stream_matches_clean():
+    """Test streaming clean over blocks joins to the same text as clean on the whole document"""
+    import random
+    rng = random.Random(3)
+    texts = _random_texts(seed=11)
+    for _ in range(100):
+        blocks = rng.sample(texts, rng.randint(0, 6)) + ["  \n", "", "\t"][:rng.randint(0, 3)]
+        rng.shuffle(blocks)
+        assert "".join(TextProcessor.clean_stream(blocks)) == TextProcessor.clean("".join(blocks))
+    assert list(TextProcessor.clean_stream(iter(["  ", "\n"]))) == []
+
+
+
+@pytest.mark.skipif(not TEXT_PROCESSING_AVAILABLE, reason="text_processing module not available")
+def test_iter_lines_matches_split():
+    """Test iter_lines splits lines across block boundaries like str.split"""
+    for blocks in [[], [""], ["a\nb"], ["a", "b\n", "\nc\n"], ["\n\n", "x"], ["ab", "", "c\nd\n"]]:
+        assert list(TextProcessor.iter_lines(blocks)) == "".join(blocks).split("\n")
+
+
+@pytest.mark.skipif(not TEXT_PROCESSING_AVAILABLE, reason="text_processing module not available")
+def test_split_headers_stream_matches_markdown_splitter():
+    """Test the streaming header splitter returns the same Documents as MarkdownHeaderTextSplitter"""
+    import random
+    from langchain_text_splitters import MarkdownHeaderTextSplitter
+    headers = [("#", "Header1"), ("##", "Header2"), ("###", "Header3")]
+    splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers, strip_headers=True)
+    pool = ["# الف", "## ب", "### ج", "## ب", "#", "####  د", "#x", "متن یک", "  متن دو  ", "", "",
+            "- مورد", "| a | b |", "```", "## داخل کد", "```", "~~~", "~~~"]
+    rng = random.Random(5)
+    for _ in range(300):
+        text = "\n".join(rng.choice(pool) for _ in range(rng.randint(0, 25)))
+        expected = splitter.split_text(text)
+        streamed = list(TextProcessor.split_headers_stream(text.split("\n"), headers))
+        assert [(d.page_content, d.metadata) for d in streamed] == [(d.page_content, d.metadata) for d in expected]
+
+
+@pytest.mark.skipif(not TEXT_PROCESSING_AVAILABLE, reason="text_processing module not available")
+def test_chunk_stream_is_lazy():
+    """Test chunk_stream yields chunks before consuming all splits"""
+    def splits():
+        yield Document(page_content="- اول\nمتن", metadata={})
+        raise AssertionError("second split should not be read")
+
+    stream = TextProcessor.chunk_stream(splits())
+    assert next(stream).page_content == "- اول"
+
+
+def _reference_add_headers(text):
+    """The per-line regex implementation add_headers must stay identical to"""
+    import re
+    bullet = re.compile(r'^\s*([*\-–—•]\s+|\d+[\.\)]\s+)')
+    table = re.compile(r'^\s*\|.*\|')
+    lines = []
+    for line in text.split("\n"):
+        stripped = line.strip()
+        words = stripped.split()
+        if not stripped or re.match(r'^\s*#{1,6}', stripped) or stripped.count('|') >= 2:
+            lines.append(stripped)
+        elif (1 <= len(words) <= 5 and not re.search(r'[.؟!؛:]$', stripped)
+              and not re.search(bullet, stripped) and not re.search(table, stripped)):
+            lines.append("## " + stripped)
+        else:
+            lines.append(stripped)
+    return "\n".join(lines)
+
+
+def _reference_chunk_types(text):
+    """(chunk_type, content) pairs of the per-line regex chunk implementation for one split"""
+    import re
+    bullet = re.compile(r'^\s*([*\-–—•]\s+|\d+[\.\)]\s+)')
+    table = re.compile(r'^\s*\|.*\|')
+    chunks, buffer, curr_type = [], [], None
+    for line in text.split("\n"):
+        is_blank = not line.strip()
+        if not is_blank and bullet.match(line.strip()):
+            new_type = 'bullet'
+        elif not is_blank and (line.strip().count('|') >= 2 or table.match(line.strip())):
+            new_type = 'table'
+        else:
+            new_type = 'paragraph'
+        if new_type != curr_type:
+            if buffer:
+                chunks.append((curr_type, "\n".join(buffer)))
+            buffer, curr_type = [], new_type
+        buffer.append(line.rstrip() if new_type == 'paragraph' else line.strip())
+    if buffer:
+        chunks.append((curr_type, "\n".join(buffer)))
+    return chunks
+
+
+def _random_markdown(count=300, seed=13):
+    import random
+    rng = random.Random(seed)
+    pool = ["", "  ", "\t", "# سر", "## سر فصل", "#بدون فاصله", "اصفهان", "نقش جهان زیبا", "یک دو سه چهار پنج",
+            "یک دو سه چهار پنج شش", "پایان جمله.", "پرسش؟", "نکته:", "- مورد", "-چسبیده", "* ستاره", "• نقطه",
+            "۱. اول", "12) دوازده", "3.سه", "| الف | ب |", "|تک", "a | b | c", "  | x |  ", "– خط", "‌نیم‌فاصله"]
+    return ["\n".join(rng.choice(pool) for _ in range(rng.randint(0, 20))) for _ in range(count)]
+
+
+@pytest.mark.skipif(not TEXT_PROCESSING_AVAILABLE, reason="text_processing module not available")
+def test_classify_line_kinds():
+    """Test every line kind of the shared classifier"""
+    cases = {
+        "   ": 'blank', " - مورد ": 'bullet', "۲) دوم": 'bullet', "| a | b |": 'table',
+        "## سر فصل": 'header', "کاخ گلستان": 'heading', "این یک جمله است.": 'paragraph',
+        "یک دو سه چهار پنج شش": 'paragraph', "-چسبیده": 'heading',
+    }
+    for line, kind in cases.items():
+        assert TextProcessor.classify_line(line) == (kind, line.strip())
+
+
+@pytest.mark.skipif(not TEXT_PROCESSING_AVAILABLE, reason="text_processing module not available")
+def test_add_headers_matches_reference_implementation():
+    """Test the classifier-based add_headers gives exactly the old output"""
+    for text in _random_markdown():
+        assert TextProcessor.add_headers(text) == _reference_add_headers(text)
+
+
+@pytest.mark.skipif(not TEXT_PROCESSING_AVAILABLE, reason="text_processing module not available")
+def test_chunk_matches_reference_implementation():
+    """Test the classifier-based chunk gives exactly the old chunks and metadata"""
+    for text in _random_markdown(seed=17):
+        chunks = TextProcessor.chunk([Document(page_content=text, metadata={"Header1": "h"})])
+        expected = _reference_chunk_types(text)
+        assert [c.page_content for c in chunks] == [content for _, content in expected]
+        for chunk, (kind, _) in zip(chunks, expected):
+            assert chunk.metadata == ({"Header1": "h"} if kind == 'paragraph' else {"Header1": "h", "chunk_type": kind})
+
+
+@pytest.mark.skipif(not TEXT_PROCESSING_AVAILABLE, reason="text_processing module not available")
+def test_chunk_fast_path_for_splits_without_bullets_or_tables():
+    """Test splits without bullet or table lines (one paragraph chunk) and bullets after unusual whitespace"""
+    texts = ["", "\n", "اصفهان  \n\n  نقش جهان\t", "سال ۱۴۰۲ بود", "پایان\n۳ روز", "a|b",
+             "متن\n - مورد", "متن\n\x1c۴. چهار", "\n\n-\n", "متن\n  ۱۲) دوازده"]
+    for text in texts:
+        chunks = TextProcessor.chunk([Document(page_content=text, metadata={})])
+        expected = _reference_chunk_types(text)
+        assert [(c.metadata.get("chunk_type", "paragraph"), c.page_content) for c in chunks] == expected
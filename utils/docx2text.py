@@ -0,0 +1,164 @@
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Fast DOCX -> markdown-ish text: one streaming pass over word/document.xml that keeps only
+# what the ingestion pipeline uses (headings, list items, table rows, paragraphs).
+# docx2md.docx_to_markdown (mammoth + markdownify) remains the high-fidelity path.
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+HEADING_STYLE = re.compile(r"^heading\s*(\d)$", re.IGNORECASE)
+
+
+def _read_styles(docx: zipfile.ZipFile) -> dict:
+    """styleId -> heading level (1-6) for paragraph styles that are headings"""
+    try:
+        root = ET.fromstring(docx.read("word/styles.xml"))
+    except KeyError:
+        return {}
+    levels = {}
+    for style in root.iter(W + "style"):
+        style_id = style.get(W + "styleId")
+        name = style.find(W + "name")
+        name = name.get(W + "val", "") if name is not None else ""
+        match = HEADING_STYLE.match(name.strip()) or HEADING_STYLE.match(style_id or "")
+        outline = style.find(f"{W}pPr/{W}outlineLvl")
+        if match:
+            levels[style_id] = int(match.group(1))
+        elif name.lower() == "title":
+            levels[style_id] = 1
+        elif outline is not None and outline.get(W + "val", "").isdigit() and int(outline.get(W + "val")) < 9:
+            levels[style_id] = int(outline.get(W + "val")) + 1
+    return {k: min(v, 6) for k, v in levels.items()}
+
+
+def _read_numbering(docx: zipfile.ZipFile) -> dict:
+    """(numId, ilvl) -> True when the list level is ordered (numbered), False for bullets"""
+    try:
+        root = ET.fromstring(docx.read("word/numbering.xml"))
+    except KeyError:
+        return {}
+    abstract = {}
+    for node in root.iter(W + "abstractNum"):
+        for lvl in node.iter(W + "lvl"):
+            fmt = lvl.find(W + "numFmt")
+            ordered = fmt is not None and fmt.get(W + "val") not in ("bullet", "none")
+            abstract[(node.get(W + "abstractNumId"), lvl.get(W + "ilvl"))] = ordered
+    ordered = {}
+    for num in root.iter(W + "num"):
+        abstract_id = num.find(W + "abstractNumId").get(W + "val")
+        for (a_id, ilvl), value in abstract.items():
+            if a_id == abstract_id:
+                ordered[(num.get(W + "numId"), ilvl)] = value
+    return ordered
+
+
+def _text(element, line_break: str) -> str:
+    parts = []
+    for node in element.iter():
+        tag = node.tag
+        if tag == W + "t":
+            parts.append(node.text or "")
+        elif tag == W + "tab":
+            parts.append("\t")
+        elif tag in (W + "br", W + "cr"):
+            parts.append(line_break)
+    return "".join(parts).strip()
+
+
+class _Converter:
+    def __init__(self, styles: dict, numbering: dict):
+        self.styles = styles
+        self.numbering = numbering
+        self.counters = {}
+
+    def paragraph(self, p) -> str:
+        text = _text(p, "\n")
+        if not text:
+            return ""
+        ppr = p.find(W + "pPr")
+        style = ppr.find(W + "pStyle") if ppr is not None else None
+        level = self.styles.get(style.get(W + "val")) if style is not None else None
+        if level is None and ppr is not None:
+            outline = ppr.find(W + "outlineLvl")
+            if outline is not None and outline.get(W + "val", "").isdigit() and int(outline.get(W + "val")) < 6:
+                level = int(outline.get(W + "val")) + 1
+        if level:
+            return "#" * level + " " + " ".join(text.split())
+
+        num = ppr.find(W + "numPr") if ppr is not None else None
+        if num is not None and num.find(W + "numId") is not None:
+            num_id = num.find(W + "numId").get(W + "val")
+            ilvl = num.find(W + "ilvl").get(W + "val") if num.find(W + "ilvl") is not None else "0"
+            if num_id != "0":
+                indent = "  " * int(ilvl)
+                if self.numbering.get((num_id, ilvl)):
+                    key = (num_id, ilvl)
+                    self.counters[key] = self.counters.get(key, 0) + 1
+                    return f"{indent}{self.counters[key]}. {text}"
+                return f"{indent}* {text}"
+        return text
+
+    def table(self, tbl) -> str:
+        rows = []
+        for tr in tbl.findall(W + "tr"):
+            cells = [" ".join(_text(tc, " ").split()).replace("|", "\\|") for tc in tr.findall(W + "tc")]
+            rows.append("| " + " | ".join(cells) + " |")
+            if len(rows) == 1:
+                rows.append("|" + " --- |" * len(cells))
+        return "\n".join(rows)
+
+
+def iter_docx_blocks(docx_path):
+    """Yield the document's blocks (headings, list items, paragraphs, whole tables) in order.
+    word/document.xml is parsed incrementally and every block is freed once it was emitted.
+    Text boxes are read once, from mc:Choice (the mc:Fallback copy is skipped, like mammoth
+    does); their blocks follow the paragraph that anchors them."""
+    with zipfile.ZipFile(docx_path) as docx:
+        converter = _Converter(_read_styles(docx), _read_numbering(docx))
+        with docx.open("word/document.xml") as xml:
+            table_depth = paragraph_depth = fallback_depth = 0
+            # blocks of text boxes inside the paragraph being read
+            nested = []
+            for event, element in ET.iterparse(xml, events=("start", "end")):
+                tag = element.tag
+                if tag == MC + "Fallback":
+                    fallback_depth += 1 if event == "start" else -1
+                    if event == "end":
+                        element.clear()
+                    continue
+                if fallback_depth:
+                    continue
+                if tag == W + "tbl":
+                    if event == "start":
+                        table_depth += 1
+                        continue
+                    table_depth -= 1
+                    if table_depth == 0:
+                        block = converter.table(element)
+                        element.clear()
+                        if block and paragraph_depth:
+                            nested.append(block)
+                        elif block:
+                            yield block
+                elif tag == W + "p" and table_depth == 0:
+                    if event == "start":
+                        paragraph_depth += 1
+                        continue
+                    paragraph_depth -= 1
+                    block = converter.paragraph(element)
+                    element.clear()
+                    if paragraph_depth:
+                        if block:
+                            nested.append(block)
+                        continue
+                    if block:
+                        yield block
+                    yield from nested
+                    nested.clear()
+
+
+def docx_to_text(docx_path) -> str:
+    """DOCX as markdown-style text (# headings, * / 1. list items, | table rows |), blocks separated by blank lines"""
+    return "\n\n".join(iter_docx_blocks(docx_path))
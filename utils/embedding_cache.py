@@ -0,0 +1,149 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """Content-addressed, persistent cache in front of an Embeddings model.
+    Document vectors are keyed by (model name, sha256 of the whitespace-normalized text);
+    they are appended as float32 rows to one file per model, read back through a memory map,
+    and a SQLite table maps every key to its row.
+    The number of committed rows is kept in SQLite: an append first truncates the file to it
+    (dropping a tail torn by a crash) and runs in a SQLite write transaction, so processes
+    sharing a cache directory append one at a time.
+    Query vectors are kept in memory only, for the last `query_cache_size` queries."""
+
+    def __init__(self, embeddings: Embeddings, cache_dir: str, model_name: str = None, query_cache_size: int = 1024):
+        self.embeddings = embeddings
+        self.cache_dir = cache_dir
+        self.model_name = model_name or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.vectors_path = os.path.join(cache_dir, self.model_name.replace("/", "_") + ".f32")
+        self._lock = threading.Lock()
+        self._conn = None
+        self._dim = None
+        self._mmap = None
+        self.query_cache_size = query_cache_size
+        self._queries = OrderedDict()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"), timeout=60,
+                                         check_same_thread=False, isolation_level=None)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (model TEXT, hash TEXT, row INTEGER, PRIMARY KEY (model, hash))"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS dims (model TEXT PRIMARY KEY, dim INTEGER, rows INTEGER)")
+            if "rows" not in [c[1] for c in self._conn.execute("PRAGMA table_info(dims)")]:
+                # caches written before the row count was stored
+                self._conn.execute("ALTER TABLE dims ADD COLUMN rows INTEGER")
+            row = self._conn.execute("SELECT dim FROM dims WHERE model = ?", (self.model_name,)).fetchone()
+            self._dim = row[0] if row else None
+        return self._conn
+
+    def _rows(self, hashes: list) -> dict:
+        found = {}
+        db = self._db()
+        unique = list(set(hashes))
+        # stay below SQLite's bound parameter limit
+        for i in range(0, len(unique), 500):
+            batch = unique[i:i + 500]
+            query = f"SELECT hash, row FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(batch))})"
+            found.update(db.execute(query, [self.model_name, *batch]).fetchall())
+        return found
+
+    def _committed(self, db) -> int:
+        """number of rows of the vectors file that SQLite points into"""
+        row = db.execute("SELECT rows FROM dims WHERE model = ?", (self.model_name,)).fetchone()
+        if row is None:
+            return 0
+        if row[0] is None:
+            row = db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings WHERE model = ?",
+                             (self.model_name,)).fetchone()
+        return row[0]
+
+    def _read(self, rows: list) -> np.ndarray:
+        needed = max(rows) + 1
+        if self._mmap is None or len(self._mmap) < needed:
+            # never map past the committed rows: the file may end in a torn tail
+            n_rows = self._committed(self._db())
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self._dim))
+        return np.asarray(self._mmap[rows])
+
+    def _append(self, hashes: list, vectors: list):
+        array = np.asarray(vectors, dtype=np.float32)
+        db = self._db()
+        # the write lock of SQLite keeps other processes from appending until commit
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT dim FROM dims WHERE model = ?", (self.model_name,)).fetchone()
+            self._dim = row[0] if row else array.shape[1]
+            start = self._committed(db)
+            fd = os.open(self.vectors_path, os.O_RDWR | os.O_CREAT, 0o644)
+            with open(fd, "r+b") as f:
+                # rows past the committed count were written by an append that never committed
+                f.truncate(start * self._dim * 4)
+                f.seek(0, os.SEEK_END)
+                f.write(array.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, row) VALUES (?, ?, ?)",
+                [(self.model_name, h, start + i) for i, h in enumerate(hashes)]
+            )
+            db.execute("INSERT OR REPLACE INTO dims (model, dim, rows) VALUES (?, ?, ?)",
+                       (self.model_name, self._dim, start + len(array)))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [self.text_hash(t) for t in texts]
+        with self._lock:
+            cached = self._rows(hashes)
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+        if missing:
+            # the model is called outside the lock so concurrent batches are embedded in parallel
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            with self._lock:
+                self._append(list(missing), new_vectors)
+        with self._lock:
+            if missing:
+                cached = self._rows(hashes)
+            vectors = self._read([cached[h] for h in hashes]) if hashes else []
+        return [v.tolist() for v in vectors]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self.text_hash(text)
+        with self._lock:
+            vector = self._queries.get(key)
+            if vector is not None:
+                self._queries.move_to_end(key)
+                return list(vector)
+        vector = self.embeddings.embed_query(text)
+        if self.query_cache_size > 0:
+            with self._lock:
+                self._queries[key] = tuple(vector)
+                while len(self._queries) > self.query_cache_size:
+                    self._queries.popitem(last=False)
+        return vector
+
+    def close(self):
+        with self._lock:
+            self._mmap = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
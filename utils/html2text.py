@@ -0,0 +1,152 @@
+from html.parser import HTMLParser
+
+# Fast HTML -> markdown-style text: an event-based parser that skips script/style/noscript
+# as it reads and keeps the block structure the page already has (h1-h3 as # headers,
+# li as bullets, tr as | table rows), one output line per block.
+# HtmlLoader's "fidelity" mode (BeautifulSoup get_text) remains available.
+
+READ_SIZE = 1 << 16
+
+SKIP_TAGS = {"script", "style", "noscript"}
+HEADING_TAGS = {"h1": "# ", "h2": "## ", "h3": "### "}
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "body", "br", "dd", "div", "dl", "dt", "figcaption",
+    "figure", "footer", "form", "h4", "h5", "h6", "header", "hr", "html", "li", "main", "nav", "ol",
+    "p", "pre", "section", "table", "tbody", "td", "tfoot", "th", "thead", "title", "tr", "ul",
+    *HEADING_TAGS
+}
+LIST_TAGS = {"ul", "ol"}
+CELL_TAGS = {"td", "th"}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = []
+        self._text = []
+        self._prefix = ""
+        self._skip = 0
+        self._lists = 0
+        self._tables = 0
+        self._row = None
+        self._cell = None
+        self._table_rows = 0
+
+    def _flush(self):
+        text = " ".join("".join(self._text).split())
+        self._text = []
+        if text:
+            self.lines.append(self._prefix + text)
+            self._prefix = ""
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+            return
+        if self._skip or tag not in BLOCK_TAGS:
+            return
+        if self._cell is not None:
+            if self._tables == 1 and (tag in CELL_TAGS or tag == "tr"):
+                # </td> and </tr> are optional in HTML
+                self._end_cell()
+            else:
+                # block structure inside a table cell only separates words
+                if tag == "table":
+                    self._tables += 1
+                self._cell.append(" ")
+                return
+        self._flush()
+        if tag in HEADING_TAGS:
+            self._prefix = HEADING_TAGS[tag]
+        elif tag in LIST_TAGS:
+            self._lists += 1
+        elif tag == "li":
+            self._prefix = "  " * max(self._lists - 1, 0) + "* "
+        elif tag == "table":
+            self._tables += 1
+            self._table_rows = 0
+        elif tag == "tr" and self._tables:
+            self._end_row()
+            self._row = []
+        elif tag in CELL_TAGS and self._tables:
+            if self._row is None:
+                self._row = []
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(self._skip - 1, 0)
+            return
+        if self._skip or tag not in BLOCK_TAGS:
+            return
+        if self._cell is not None:
+            if self._tables > 1 or tag not in CELL_TAGS | {"tr", "table"}:
+                if tag == "table":
+                    self._tables -= 1
+                self._cell.append(" ")
+                return
+            self._end_cell()
+            if tag in CELL_TAGS:
+                return
+        if tag == "tr":
+            self._end_row()
+        elif tag == "table":
+            self._end_row()
+            self._tables = max(self._tables - 1, 0)
+        elif tag in LIST_TAGS:
+            self._lists = max(self._lists - 1, 0)
+        self._flush()
+        self._prefix = ""
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._cell is not None:
+            self._cell.append(data)
+        else:
+            self._text.append(data)
+
+    def _end_cell(self):
+        self._row.append(" ".join("".join(self._cell).split()).replace("|", "\\|"))
+        self._cell = None
+
+    def _end_row(self):
+        if self._row is not None:
+            self._flush()
+            if any(self._row):
+                self.lines.append("| " + " | ".join(self._row) + " |")
+                if not self._table_rows:
+                    self.lines.append("|" + " --- |" * len(self._row))
+                self._table_rows += 1
+            self._row = None
+
+    def close(self):
+        super().close()
+        if self._cell is not None:
+            self._end_cell()
+        self._end_row()
+        self._flush()
+
+
+def iter_html_lines(path: str = None, text: str = None):
+    """Yield the text lines of an HTML file (or string) while it is being parsed.
+    The file is read in READ_SIZE chunks, so the page is never held in memory as a tree."""
+    parser = _TextExtractor()
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for chunk in iter(lambda: f.read(READ_SIZE), ""):
+                parser.feed(chunk)
+                yield from parser.lines
+                parser.lines.clear()
+    else:
+        for i in range(0, len(text or ""), READ_SIZE):
+            parser.feed(text[i:i + READ_SIZE])
+            yield from parser.lines
+            parser.lines.clear()
+    parser.close()
+    yield from parser.lines
+
+
+def html_to_text(path: str = None, text: str = None) -> str:
+    """HTML as markdown-style text, one line per block"""
+    return "\n".join(iter_html_lines(path, text))
@@ -1,20 +1,72 @@
+import importlib
 import os
-from .loaders.docx_loader import DocxLoader
-from .loaders.pdf_loader import PdfLoader
-from .loaders.txt_loader import TxtLoader
-from .loaders.raw_loader import RawLoader
-from .loaders.md_loader import MarkdownLoader
-from .loaders.html_loader import HtmlLoader
-
-LOADERS = {
-    ".docx": DocxLoader(),
-    ".pdf": PdfLoader(),
-    ".txt": TxtLoader(),
-    ".md": MarkdownLoader(),
-    ".html": HtmlLoader(),
-    ".htm": HtmlLoader(),
-    "raw": RawLoader()
-}
+import threading
+
+from .loaders.base import BaseLoader
+
+
+class LoaderRegistry:
+    """Maps file extensions to loaders. Loaders are registered as "module:Class" specs
+    (or classes / instances) and imported and built on first use, so ingesting .txt
+    files never imports mammoth, pypdf or bs4."""
+
+    def __init__(self, specs: dict = None):
+        self._specs = {}
+        self._loaders = {}
+        self._lock = threading.Lock()
+        for ext, spec in (specs or {}).items():
+            self.register(ext, spec)
+
+    def register(self, ext: str, loader):
+        """register a loader for an extension: a BaseLoader instance, a BaseLoader class
+        or a "package.module:ClassName" string (imported lazily)"""
+        ext = ext.lower()
+        with self._lock:
+            self._loaders.pop(ext, None)
+            if isinstance(loader, BaseLoader):
+                self._loaders[ext] = loader
+            self._specs[ext] = loader
+
+    def _build(self, spec) -> BaseLoader:
+        if isinstance(spec, str):
+            module_name, class_name = spec.split(":")
+            spec = getattr(importlib.import_module(module_name, __package__), class_name)
+        return spec()
+
+    def __getitem__(self, ext: str) -> BaseLoader:
+        loader = self._loaders.get(ext)
+        if loader is None:
+            with self._lock:
+                loader = self._loaders.get(ext)
+                if loader is None:
+                    loader = self._loaders[ext] = self._build(self._specs[ext])
+        return loader
+
+    def __contains__(self, ext) -> bool:
+        return ext in self._specs
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __len__(self):
+        return len(self._specs)
+
+
+LOADERS = LoaderRegistry({
+    ".docx": ".loaders.docx_loader:DocxLoader",
+    ".pdf": ".loaders.pdf_loader:PdfLoader",
+    ".txt": ".loaders.txt_loader:TxtLoader",
+    ".md": ".loaders.md_loader:MarkdownLoader",
+    ".html": ".loaders.html_loader:HtmlLoader",
+    ".htm": ".loaders.html_loader:HtmlLoader",
+    "raw": ".loaders.raw_loader:RawLoader"
+})
+
+
+def register_loader(ext: str, loader):
+    """plugin hook: add (or replace) the loader used for an extension, e.g.
+    register_loader(".epub", "my_plugins.epub:EpubLoader")"""
+    LOADERS.register(ext, loader)
 
 
 def load_input(file_path: str = None, raw_text: str = None) -> str:
@@ -29,3 +81,18 @@ def load_input(file_path: str = None, raw_text: str = None) -> str:
         return LOADERS[ext].load(path=file_path)
     else:
         raise ValueError(f"{ext} is not supported format")
+
+
+def load_input_stream(file_path: str = None, raw_text: str = None):
+    """like load_input, but yields the text in blocks (e.g. pages) as the loader produces them"""
+    if raw_text:
+        return LOADERS["raw"].iter_load(text=raw_text)
+
+    if not file_path:
+        raise ValueError("file path or raw text required")
+
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in LOADERS:
+        return LOADERS[ext].iter_load(path=file_path)
+    else:
+        raise ValueError(f"{ext} is not supported format")
@@ -4,3 +4,7 @@ class BaseLoader(ABC):
     @abstractmethod
     def load(self, path: str = None, text: str = None) -> str:
         pass
+
+    def iter_load(self, path: str = None, text: str = None):
+        """yield the document as text blocks (pages, parts of a file); "".join(blocks) == load()"""
+        yield self.load(path=path, text=text)
@@ -1,6 +1,28 @@
+import os
+
 from .base import BaseLoader
-from ..docx2md import docx_to_markdown
+from ..docx2text import docx_to_text, iter_docx_blocks
+
+# "fast": single pass over the DOCX XML; "fidelity": mammoth -> HTML -> markdownify
+DOCX_MODE = os.environ.get("DOCX_MODE", "fast")
+
 
 class DocxLoader(BaseLoader):
+    def __init__(self, mode: str = None):
+        self.mode = mode or DOCX_MODE
+        if self.mode not in ("fast", "fidelity"):
+            raise ValueError(f"unknown DOCX mode: {self.mode}")
+
     def load(self, path: str = None, text: str = None) -> str:
-        return docx_to_markdown(path)
+        if self.mode == "fidelity":
+            # imported here so the fast mode never loads mammoth/markdownify
+            from ..docx2md import docx_to_markdown
+            return docx_to_markdown(path)
+        return docx_to_text(path)
+
+    def iter_load(self, path: str = None, text: str = None):
+        if self.mode == "fidelity":
+            yield self.load(path=path)
+            return
+        for i, block in enumerate(iter_docx_blocks(path)):
+            yield "\n\n" + block if i else block
@@ -1,8 +1,25 @@
-from bs4 import BeautifulSoup
+import os
+
 from .base import BaseLoader
+from ..html2text import html_to_text, iter_html_lines
+
+# "fast": streaming event parser that keeps block structure; "fidelity": BeautifulSoup get_text
+HTML_MODE = os.environ.get("HTML_MODE", "fast")
+
 
 class HtmlLoader(BaseLoader):
+    def __init__(self, mode: str = None):
+        self.mode = mode or HTML_MODE
+        if self.mode not in ("fast", "fidelity"):
+            raise ValueError(f"unknown HTML mode: {self.mode}")
+
     def load(self, path: str = None, text: str = None) -> str:
+        if self.mode == "fast":
+            return html_to_text(path, text)
+
+        # imported here so the fast mode never loads bs4
+        from bs4 import BeautifulSoup
+
         if path:
             with open(path, "r", encoding="utf-8") as f:
                 html = f.read()
@@ -17,3 +34,10 @@ class HtmlLoader(BaseLoader):
 
         # get clean text
         return soup.get_text(separator="\n")
+
+    def iter_load(self, path: str = None, text: str = None):
+        if self.mode == "fidelity":
+            yield self.load(path=path, text=text)
+            return
+        for i, line in enumerate(iter_html_lines(path, text)):
+            yield "\n" + line if i else line
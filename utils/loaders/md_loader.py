@@ -1,6 +1,12 @@
 from .base import BaseLoader
+from .txt_loader import BLOCK_SIZE
 
 class MarkdownLoader(BaseLoader):
     def load(self, path: str = None, text: str = None) -> str:
         with open(path, "r", encoding="utf-8") as f:
             return f.read()
+
+    def iter_load(self, path: str = None, text: str = None):
+        with open(path, "r", encoding="utf-8") as f:
+            for block in iter(lambda: f.read(BLOCK_SIZE), ""):
+                yield block
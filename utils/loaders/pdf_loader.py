@@ -1,11 +1,46 @@
 # import pdfplumber
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
 from pypdf import PdfReader
 from .base import BaseLoader
 
+# documents with at least this many pages are extracted in a process pool
+PARALLEL_MIN_PAGES = 64
+PAGES_PER_TASK = 16
+
+
+def extract_pages(path: str, start: int, stop: int) -> list[str]:
+    """text of pages [start, stop) of a PDF (runs in the worker processes)"""
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
 class PdfLoader(BaseLoader):
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def iter_pages(self, path: str):
+        """lazily yield the text of every page, in order"""
+        reader = PdfReader(path)
+        n_pages = len(reader.pages)
+        # no nested pools when we already run in a worker process (e.g. bulk ingestion)
+        if n_pages < PARALLEL_MIN_PAGES or self.max_workers < 2 or multiprocessing.parent_process() is not None:
+            for page in reader.pages:
+                yield page.extract_text() or ""
+            return
+
+        starts = range(0, n_pages, PAGES_PER_TASK)
+        stops = [min(start + PAGES_PER_TASK, n_pages) for start in starts]
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            for pages in executor.map(extract_pages, repeat(path, len(starts)), starts, stops):
+                yield from pages
+
+    def iter_load(self, path: str = None, text: str = None):
+        for i, page in enumerate(self.iter_pages(path)):
+            yield "\n" + page if i else page
+
     def load(self, path: str = None, text: str = None) -> str:
-        result = ""
-        reader = PdfReader("example.pdf")
-        for page in reader.pages:
-            result += page.extract_text()
-        return result
+        return "\n".join(self.iter_pages(path))
@@ -7,16 +7,63 @@ class TextProcessor:
     HEADER_KEYWORDS = {'مقدمه', 'اهداف', 'الزامات', 'تعاریف', 'مسئولیت', 'دامنه', 'فصل', 'بخش', 'پیوست'}
     BULLET_PATTERN = re.compile(r'^\s*([*\-–—•]\s+|\d+[\.\)]\s+)')
     TABLE_PATTERN = re.compile(r'^\s*\|.*\|')
+    SENTENCE_END = ('.', '؟', '!', '؛', ':')
+    BULLET_STARTS = frozenset('*-–—•')
+    # a line whose first non-space character could start a bullet (a superset of BULLET_PATTERN lines),
+    # searched in "\n" + text: a literal first character lets the regex engine skip from newline to newline
+    BULLET_CANDIDATE = re.compile(r'\n\s*[*\-–—•\d]')
+    ARABIC_TO_PERSIAN = {'ي': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'ؤ': 'و', 'إ': 'ا', 'أ': 'ا', 'ء': ''}
+    # characters that are mapped to another character (the rest of ARABIC_TO_PERSIAN is deleted)
+    CHAR_MAP = tuple((a, p) for a, p in ARABIC_TO_PERSIAN.items() if p)
+    DIACRITICS = r'\u064B-\u065F\u0670\u06D6-\u06ED'
+    DIACRITICS_PATTERN = re.compile(r'[\u0621' + DIACRITICS + r']')
+    # one pass deletes diacritics, 'ء' and everything that is not Persian, digit, space or markup
+    FILTER_PATTERN = re.compile(
+        r'[^\u0600-\u0620\u0622-\u064A\u0660-\u066F\u0671-\u06D5\u06EE-\u06FF0-9\s|(){}،#*\-–—•.:]'
+    )
 
-    @staticmethod
-    def clean(text: str) -> str:
-        """Persian Text Cleaning"""
-        arabic_to_persian_map = {'ي': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'ؤ': 'و', 'إ': 'ا', 'أ': 'ا', 'ء': ''}
-        for a, p in arabic_to_persian_map.items():
+    @classmethod
+    def _map_chars(cls, text: str) -> str:
+        # str.replace scans in C and returns the same object when the character is absent;
+        # on Persian text this is several times faster than a single str.translate pass
+        for a, p in cls.CHAR_MAP:
             text = text.replace(a, p)
-        text = re.sub(r'[\u064B-\u065F\u0670\u06D6-\u06ED]', '', text)
-        text = re.sub(r'[^\u0600-\u06FF0-9\s\n|(){}،#*\-–—•.:]', '', text)
-        return text.strip()
+        return text
+
+    @classmethod
+    def fold(cls, text: str) -> str:
+        """Arabic to Persian character folding and diacritics removal (other characters are kept)"""
+        return cls.DIACRITICS_PATTERN.sub('', cls._map_chars(text))
+
+    @classmethod
+    def normalize_key(cls, text: str) -> str:
+        """cache key of a query or address: Persian character folding, lower case and collapsed spaces"""
+        return " ".join(cls.fold(text).lower().split())
+
+    @classmethod
+    def clean(cls, text: str) -> str:
+        """Persian Text Cleaning"""
+        return cls.FILTER_PATTERN.sub('', cls._map_chars(text)).strip()
+
+    @classmethod
+    def clean_stream(cls, blocks):
+        """Persian Text Cleaning of an iterable of text blocks (e.g. pages), yielding cleaned blocks.
+        "".join(clean_stream(blocks)) == clean("".join(blocks))"""
+        pending, started = "", False
+        for block in blocks:
+            text = cls.FILTER_PATTERN.sub('', cls._map_chars(block))
+            if not started:
+                text = text.lstrip()
+                if not text:
+                    continue
+                started = True
+            body = text.rstrip()
+            if not body:
+                # whitespace is held back until we know more text follows it
+                pending += text
+                continue
+            yield pending + body
+            pending = text[len(body):]
 
     @classmethod
     def is_heading(cls, line: str, min_words=1, max_words=5) -> bool:
@@ -26,68 +73,168 @@ class TextProcessor:
             return False
 
         # calculate words
-        words = line.split()
-        n = len(words)
-
+        n = len(line.split(None, max_words))
         if n < min_words or n > max_words:
             return False
 
         # check if this is not a paragraph or sentence
-        if re.search(r'[.؟!؛:]$', line) or re.search(cls.BULLET_PATTERN, line) or re.search(cls.TABLE_PATTERN, line):
-            return False
-
-        return True
+        return not (line.endswith(cls.SENTENCE_END) or cls.BULLET_PATTERN.match(line) or cls.TABLE_PATTERN.match(line))
 
     @classmethod
-    def add_headers(cls, text: str) -> str:
-        """recognition and adding headers to simple texts"""
-        result = []
-        for line in text.split("\n"):
+    def classify_lines(cls, lines):
+        """Yield (kind, stripped line) for every line, as add_headers sees it (chunk_stream inlines the
+        bullet and table tests). kind is 'blank', 'bullet', 'table', 'header' (#), 'heading' (a short line
+        add_headers turns into ##) or 'paragraph'."""
+        bullet, bullet_starts, sentence_end = cls.BULLET_PATTERN.match, cls.BULLET_STARTS, cls.SENTENCE_END
+        for line in lines:
             stripped = line.strip()
             if not stripped:
-                result.append("");
+                yield 'blank', stripped
                 continue
-            if re.match(r'^\s*#{1,6}', stripped) or stripped.count('|') >= 2:
-                result.append(stripped);
+            first = stripped[0]
+            # the bullet regex can only match lines starting with a bullet character or a digit
+            if (first in bullet_starts or first.isdecimal()) and bullet(stripped):
+                yield 'bullet', stripped
+            elif stripped.count('|') >= 2:
+                yield 'table', stripped
+            elif first == '#':
+                yield 'header', stripped
+            elif not stripped.endswith(sentence_end) and len(stripped.split(None, 5)) <= 5:
+                yield 'heading', stripped
+            else:
+                yield 'paragraph', stripped
+
+    @classmethod
+    def classify_line(cls, line: str) -> tuple[str, str]:
+        """(kind, stripped line) of a single line, see classify_lines"""
+        return next(cls.classify_lines((line,)))
+
+    @classmethod
+    def add_headers(cls, text: str) -> str:
+        """recognition and adding headers to simple texts"""
+        return "\n".join(cls.add_headers_stream(text.split("\n")))
+
+    @classmethod
+    def add_headers_stream(cls, lines):
+        """add_headers for an iterable of lines, yielding lines"""
+        for kind, stripped in cls.classify_lines(lines):
+            yield "## " + stripped if kind == 'heading' else stripped
+
+    @staticmethod
+    def iter_lines(blocks):
+        """lines of the concatenated text blocks, same as "".join(blocks).split("\n")"""
+        tail = ""
+        for block in blocks:
+            parts = (tail + block).split("\n")
+            tail = parts.pop()
+            yield from parts
+        yield tail
+
+    @staticmethod
+    def split_headers_stream(lines, headers_to_split_on):
+        """Streaming version of MarkdownHeaderTextSplitter(headers_to_split_on, strip_headers=True).split_text:
+        yields the same Documents, one header section at a time"""
+        headers_to_split_on = sorted(headers_to_split_on, key=lambda split: len(split[0]), reverse=True)
+        content, current_metadata, initial_metadata, header_stack = [], {}, {}, []
+        in_code_block, opening_fence = False, ""
+        pending = None  # last section, kept until we know the next one has other metadata
+
+        def group(text, metadata):
+            nonlocal pending
+            if pending is not None and pending[1] == metadata:
+                pending = (pending[0] + "  \n" + text, metadata)
+                return None
+            done, pending = pending, (text, metadata)
+            return done
+
+        for line in lines:
+            stripped = "".join(filter(str.isprintable, line.strip()))
+            if not in_code_block:
+                if stripped.startswith("```") and stripped.count("```") == 1:
+                    in_code_block, opening_fence = True, "```"
+                elif stripped.startswith("~~~"):
+                    in_code_block, opening_fence = True, "~~~"
+            elif stripped.startswith(opening_fence):
+                in_code_block, opening_fence = False, ""
+
+            if in_code_block:
+                content.append(stripped)
                 continue
-            if cls.is_heading(stripped):
-                result.append("## " + stripped)
+
+            for sep, name in headers_to_split_on:
+                if stripped.startswith(sep) and (len(stripped) == len(sep) or stripped[len(sep)] == " "):
+                    level = sep.count("#")
+                    while header_stack and header_stack[-1][0] >= level:
+                        initial_metadata.pop(header_stack.pop()[1], None)
+                    header_stack.append((level, name))
+                    initial_metadata[name] = stripped[len(sep):].strip()
+                    if content:
+                        done = group("\n".join(content), current_metadata.copy())
+                        if done:
+                            yield Document(page_content=done[0], metadata=done[1])
+                        content = []
+                    break
             else:
-                result.append(stripped)
-        return "\n".join(result)
+                if stripped:
+                    content.append(stripped)
+                elif content:
+                    done = group("\n".join(content), current_metadata.copy())
+                    if done:
+                        yield Document(page_content=done[0], metadata=done[1])
+                    content = []
+
+            current_metadata = initial_metadata.copy()
+
+        if content:
+            done = group("\n".join(content), current_metadata)
+            if done:
+                yield Document(page_content=done[0], metadata=done[1])
+        if pending is not None:
+            yield Document(page_content=pending[0], metadata=pending[1])
 
     @classmethod
     def chunk(cls, split_text: list[Document]) -> list[Document]:
         """chunk heading split texts (by MarkdownHeaderTextSplitter function) to paragraphs/tables/bullets"""
-        result, buffer, curr_type = [], [], None
-
-        def flush(label, split):
-            nonlocal buffer
-            if buffer:
-                metadata = split.metadata.copy()
-                if label != 'paragraph':
-                    metadata['chunk_type'] = label
-                result.append(Document(metadata=metadata, page_content="\n".join(buffer)))
-                buffer = []
+        return list(cls.chunk_stream(split_text))
 
+    @classmethod
+    def chunk_stream(cls, split_text):
+        """chunk for an iterable of header split Documents, yielding chunks"""
+        # only the bullet and table tests of classify_lines: headings do not matter here, and
+        # an inline loop avoids the per-line generator and zip overhead
+        bullet, bullet_starts, candidate = cls.BULLET_PATTERN.match, cls.BULLET_STARTS, cls.BULLET_CANDIDATE.search
         for split in split_text:
-            for line in split.page_content.split("\n"):
-                is_blank = not line.strip()
-                if not is_blank and cls.BULLET_PATTERN.match(line.strip()):
-                    new_type = 'bullet'
-                elif not is_blank and (line.strip().count('|') >= 2 or cls.TABLE_PATTERN.match(line.strip())):
-                    new_type = 'table'
-                else:
-                    new_type = 'paragraph'
+            text = split.page_content
+            if '|' not in text and not candidate("\n" + text):
+                # no bullet or table line: the whole split is one paragraph
+                yield cls._make_chunk([line.rstrip() for line in text.split("\n")], 'paragraph', split.metadata)
+                continue
+            buffer, curr_type = [], 'paragraph'
+            for line in text.split("\n"):
+                stripped = line.strip()
+                new_type = 'paragraph'
+                if stripped:
+                    first = stripped[0]
+                    if (first in bullet_starts or first.isdecimal()) and bullet(stripped):
+                        new_type = 'bullet'
+                    elif stripped.count('|') >= 2:
+                        new_type = 'table'
                 if new_type != curr_type:
-                    flush(curr_type if curr_type else 'paragraph', split)
+                    if buffer:
+                        yield cls._make_chunk(buffer, curr_type, split.metadata)
+                        buffer = []
                     curr_type = new_type
-                if new_type == 'paragraph':
-                    buffer.append(line.rstrip())
-                elif not is_blank:
-                    buffer.append(line.strip())
-            flush(curr_type if curr_type else 'paragraph', split)
-        return result
+                # blank lines are always 'paragraph' lines
+                buffer.append(line.rstrip() if new_type == 'paragraph' else stripped)
+            if buffer:
+                yield cls._make_chunk(buffer, curr_type, split.metadata)
+
+    @staticmethod
+    def _make_chunk(lines: list[str], label: str, metadata: dict) -> Document:
+        metadata = metadata.copy()
+        if label != 'paragraph':
+            metadata['chunk_type'] = label
+        return Document(metadata=metadata, page_content="\n".join(lines))
 
     @staticmethod
     def attach_metadata(chunks: list[Document], doc_id: str, filename: str):